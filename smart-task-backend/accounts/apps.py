@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_save, pre_save
+
+        from .signals import remember_token_flags, revoke_on_flag_change
+
+        user_model = get_user_model()
+        pre_save.connect(remember_token_flags, sender=user_model, dispatch_uid="accounts.signals.remember_token_flags")
+        post_save.connect(revoke_on_flag_change, sender=user_model, dispatch_uid="accounts.signals.revoke_on_flag_change")
@@ -0,0 +1,66 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser, TokenVersion
+
+TOKEN_VERSION_CLAIM = "tv"
+
+
+def _verify_token_version(token, current) -> None:
+    if current is None:
+        raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+    if token.get(TOKEN_VERSION_CLAIM, 0) != current:
+        raise InvalidToken(_("Token has been revoked"))
+
+
+def check_token_version(token) -> None:
+    """Reject tokens issued before the user's last revocation, or for a missing or inactive user."""
+    _verify_token_version(token, TokenVersion.current(token.get(api_settings.USER_ID_CLAIM)))
+
+
+async def acheck_token_version(token) -> None:
+    _verify_token_version(token, await TokenVersion.acurrent(token.get(api_settings.USER_ID_CLAIM)))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that takes the user from the token claims instead of a query per request.
+
+    Claims (username, staff flags) are as of login: a refresh copies them
+    unchanged, and is refused once the staff flags no longer match the user.
+    The token-version check is what revokes access, bumped whenever those flags
+    or ``is_active`` change, and is served from the local auth cache most of
+    the time.
+    """
+
+    def get_user(self, validated_token):
+        user = self._user_from_claims(validated_token)
+        check_token_version(validated_token)
+        return user
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; only a token-version cache miss touches the database."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = self._user_from_claims(validated_token)
+        await acheck_token_version(validated_token)
+        return user, validated_token
+
+    def _user_from_claims(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        return ClaimsUser.from_claims(
+            user_id,
+            validated_token.get("username", ""),
+            bool(validated_token.get("is_staff", False)),
+            bool(validated_token.get("is_superuser", False)),
+        )
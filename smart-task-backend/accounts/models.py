@@ -1,3 +1,117 @@
-from django.db import models
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models import F
 
-# Create your models here.
+# Process-local cache (see CACHES in settings) for token versions and users loaded on demand.
+AUTH_CACHE = "auth"
+
+
+def _auth_cache():
+    return caches[AUTH_CACHE]
+
+
+class TokenVersion(models.Model):
+    """Per-user counter stamped into every JWT; bumping it revokes all tokens issued before."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="token_version",
+    )
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Token version {self.version} for user {self.user_id}"
+
+    @staticmethod
+    def cache_key(user_id) -> str:
+        return f"auth:token-version:{user_id}"
+
+    @classmethod
+    def current(cls, user_id) -> int | None:
+        """The version tokens for ``user_id`` must carry, or ``None`` if the user is gone or inactive.
+
+        Cached for a few seconds, so a revocation made in another process can
+        take that long to apply here.
+        """
+        if user_id is None:
+            return None
+        key = cls.cache_key(user_id)
+        version = _auth_cache().get(key)
+        if version is None:
+            rows = list(
+                User.objects.filter(pk=user_id, is_active=True).values_list("token_version__version", flat=True)[:1]
+            )
+            # -1 marks a missing or inactive user, so that is cached too.
+            version = (rows[0] or 0) if rows else -1
+            _auth_cache().set(key, version)
+        return None if version < 0 else version
+
+    @classmethod
+    async def acurrent(cls, user_id) -> int | None:
+        """Async ``current`` for the ASGI read views."""
+        if user_id is None:
+            return None
+        key = cls.cache_key(user_id)
+        version = await _auth_cache().aget(key)
+        if version is None:
+            rows = [
+                row
+                async for row in User.objects.filter(pk=user_id, is_active=True).values_list(
+                    "token_version__version", flat=True
+                )[:1]
+            ]
+            version = (rows[0] or 0) if rows else -1
+            await _auth_cache().aset(key, version)
+        return None if version < 0 else version
+
+    @classmethod
+    def bump(cls, user_id) -> None:
+        version, created = cls.objects.get_or_create(user_id=user_id, defaults={"version": 1})
+        if not created:
+            cls.objects.filter(pk=version.pk).update(version=F("version") + 1)
+        keys = [cls.cache_key(user_id), ClaimsUser.cache_key(user_id)]
+        _auth_cache().delete_many(keys)
+        # Again once committed, in case a request cached the old version in between.
+        transaction.on_commit(lambda: _auth_cache().delete_many(keys))
+
+
+class ClaimsUser(User):
+    """A user built from access-token claims without touching the database.
+
+    Only the claim fields are loaded. Reading any other field (``email`` for a
+    notification, say) fills it from a short-lived cached copy of the row.
+    """
+
+    CLAIM_FIELDS = ("id", "username", "is_staff", "is_superuser", "is_active")
+
+    class Meta:
+        proxy = True
+
+    @staticmethod
+    def cache_key(user_id) -> str:
+        return f"auth:user:{user_id}"
+
+    @classmethod
+    def from_claims(cls, user_id: int, username: str, is_staff: bool, is_superuser: bool) -> "ClaimsUser":
+        claims = dict(zip(cls.CLAIM_FIELDS, (user_id, username, is_staff, is_superuser, True)))
+        # from_db() takes the loaded values in the model's field order, not in the order they are named.
+        field_names = [f.attname for f in cls._meta.concrete_fields if f.attname in claims]
+        return cls.from_db("default", field_names, [claims[name] for name in field_names])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is None or from_queryset is not None:
+            return super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+        key = self.cache_key(self.pk)
+        row = _auth_cache().get(key)
+        if row is None:
+            row = User.objects.filter(pk=self.pk).values(*(f.attname for f in User._meta.concrete_fields)).first()
+            if row is None:
+                raise User.DoesNotExist("User matching claims does not exist.")
+            _auth_cache().set(key, row)
+        for field in fields:
+            setattr(self, field, row[field])
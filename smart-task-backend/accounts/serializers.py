@@ -1,8 +1,14 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import TOKEN_VERSION_CLAIM, check_token_version
+from .models import TokenVersion
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -28,9 +34,28 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
         token["is_admin"] = bool(user.is_staff or user.is_superuser)
+        # Read by ClaimsJWTAuthentication so requests need no user query.
+        token["username"] = user.username
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        token[TOKEN_VERSION_CLAIM] = TokenVersion.current(user.pk) or 0
         return token
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        check_token_version(refresh)
+        # Refreshing copies the claims as they are, so flags changed since login (even by
+        # QuerySet.update(), which revokes nothing) must end the session here.
+        flags = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM), is_active=True).values_list(
+            "is_staff", "is_superuser"
+        )
+        if list(flags) != [(refresh.get("is_staff", False), refresh.get("is_superuser", False))]:
+            raise InvalidToken(_("Token has been revoked"))
+        return super().validate(attrs)
+
+
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
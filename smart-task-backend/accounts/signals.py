@@ -0,0 +1,28 @@
+"""Revoke a user's tokens when the flags copied into them change.
+
+Access and refresh tokens carry ``is_staff`` and ``is_superuser`` as claims, and
+``ClaimsJWTAuthentication`` trusts them, so demoting or deactivating a user
+through ``save()`` (admin, shell, views) bumps their ``TokenVersion``. Writes
+that skip ``save()``, such as ``QuerySet.update()``, are caught at the next
+refresh by ``CustomTokenRefreshSerializer``.
+"""
+
+from .models import TokenVersion
+
+TOKEN_FLAGS = ("is_staff", "is_superuser", "is_active")
+
+
+def remember_token_flags(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._token_flags_changed = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_FLAGS):
+        # e.g. the last_login update on every login.
+        return
+    saved = sender.objects.filter(pk=instance.pk).values_list(*TOKEN_FLAGS).first()
+    instance._token_flags_changed = saved is not None and saved != tuple(getattr(instance, flag) for flag in TOKEN_FLAGS)
+
+
+def revoke_on_flag_change(sender, instance, created=False, raw=False, **kwargs):
+    if not raw and not created and getattr(instance, "_token_flags_changed", False):
+        TokenVersion.bump(instance.pk)
@@ -1,3 +1,132 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core import mail
+from django.core.cache import caches
 from django.test import TestCase
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from tasks.cache import response_cache
+from tasks.models import OutboxEmail, Task
+
+from .models import AUTH_CACHE, ClaimsUser
+
+
+class ForgotPasswordTests(TestCase):
+    def test_reset_email_goes_through_outbox(self):
+        User.objects.create_user(username="forgetful", email="forgetful@example.com", password="secret-pass-123")
+
+        response = APIClient().post("/api/auth/forgot-password/", {"email": "forgetful@example.com"}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.to_email, "forgetful@example.com")
+        self.assertIn("reset-password?uid=", queued.body)
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        caches[AUTH_CACHE].clear()
+        response_cache().clear()
+        self.user = User.objects.create_user(username="claims", email="claims@example.com", password="secret-pass-123")
+        self.client = APIClient()
+        self.tokens = self.client.post(
+            "/api/auth/login/", {"username": "claims", "password": "secret-pass-123"}, format="json"
+        ).json()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def test_requests_do_not_load_the_user(self):
+        self.client.get("/api/tasks/analytics/")
+
+        # Just the ETag lookup: nothing from auth_user, and the body is cached.
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/tasks/analytics/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_claims_user_keeps_each_claim_in_its_field(self):
+        other = User.objects.create_user(username="someone-else", password="secret-pass-123")
+        Task.objects.create(user=self.user, title="Mine")
+        Task.objects.create(user=other, title="Not mine")
+
+        response = self.client.get("/api/tasks/all/")
+
+        self.assertEqual([task["title"] for task in response.json()], ["Mine"])
+        user = ClaimsUser.from_claims(self.user.pk, "claims", False, False)
+        self.assertEqual((user.pk, user.username, user.is_staff, user.is_superuser), (self.user.pk, "claims", False, False))
+
+    def test_email_fields_are_loaded_on_demand(self):
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        response = self.client.post("/api/tasks/", {"title": "Soon", "due_date": tomorrow}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OutboxEmail.objects.get().to_email, "claims@example.com")
+
+    def test_password_reset_revokes_existing_tokens(self):
+        self.assertEqual(self.client.get("/api/tasks/").status_code, 200)
+
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = PasswordResetTokenGenerator().make_token(self.user)
+        APIClient().post(
+            "/api/auth/reset-password/",
+            {"uid": uid, "token": token, "new_password": "another-pass-456"},
+            format="json",
+        )
+
+        self.assertEqual(self.client.get("/api/tasks/").status_code, 401)
+        refresh = APIClient().post("/api/auth/refresh/", {"refresh": self.tokens["refresh"]}, format="json")
+        self.assertEqual(refresh.status_code, 401)
+
+        fresh = APIClient().post(
+            "/api/auth/login/", {"username": "claims", "password": "another-pass-456"}, format="json"
+        ).json()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {fresh['access']}")
+        self.assertEqual(self.client.get("/api/tasks/").status_code, 200)
+
+    def login(self, username):
+        tokens = APIClient().post(
+            "/api/auth/login/", {"username": username, "password": "secret-pass-123"}, format="json"
+        ).json()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return client, tokens["refresh"]
+
+    def refresh(self, refresh):
+        return APIClient().post("/api/auth/refresh/", {"refresh": refresh}, format="json").status_code
+
+    def test_demoted_admin_loses_access_and_refresh(self):
+        admin = User.objects.create_user(username="admin", password="secret-pass-123", is_staff=True)
+        Task.objects.create(user=self.user, title="Someone else's")
+        client, refresh = self.login("admin")
+        self.assertEqual(len(client.get("/api/tasks/all/").json()), 1)
+
+        admin.is_staff = False
+        admin.save()
+
+        self.assertEqual(client.get("/api/tasks/all/").status_code, 401)
+        self.assertEqual(self.refresh(refresh), 401)
+        client, _ = self.login("admin")
+        self.assertEqual(client.get("/api/tasks/all/").json(), [])
+
+    def test_refresh_is_refused_when_flags_change_without_save(self):
+        User.objects.create_user(username="admin", password="secret-pass-123", is_staff=True)
+        _, refresh = self.login("admin")
+        self.assertEqual(self.refresh(refresh), 200)
+
+        User.objects.filter(username="admin").update(is_staff=False)
+        self.assertEqual(self.refresh(refresh), 401)
+
+    def test_other_saves_keep_tokens(self):
+        self.user.email = "renamed@example.com"
+        self.user.save()
+        self.assertEqual(self.client.get("/api/tasks/").status_code, 200)
+        self.assertEqual(self.refresh(self.tokens["refresh"]), 200)
+
+    def test_deactivated_user_is_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        caches[AUTH_CACHE].clear()
 
-# Create your tests here.
+        self.assertEqual(self.client.get("/api/tasks/").status_code, 401)
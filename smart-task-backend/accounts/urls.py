@@ -1,12 +1,10 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
-
-from .views import CustomTokenObtainPairView, ForgotPasswordView, RegisterView, ResetPasswordView
+from .views import CustomTokenObtainPairView, CustomTokenRefreshView, ForgotPasswordView, RegisterView, ResetPasswordView
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
     path("login/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("refresh/", CustomTokenRefreshView.as_view(), name="token_refresh"),
     path("forgot-password/", ForgotPasswordView.as_view(), name="forgot_password"),
     path("reset-password/", ResetPasswordView.as_view(), name="reset_password"),
 ]
@@ -1,7 +1,6 @@
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
@@ -10,15 +9,28 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .serializers import CustomTokenObtainPairSerializer, ForgotPasswordSerializer, RegisterSerializer, ResetPasswordSerializer
+from tasks.outbox import enqueue_email
+
+from .models import TokenVersion
+from .serializers import (
+    CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer,
+    ForgotPasswordSerializer,
+    RegisterSerializer,
+    ResetPasswordSerializer,
+)
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
 
@@ -49,12 +61,11 @@ class ForgotPasswordView(APIView):
             frontend_reset_url = getattr(settings, "FRONTEND_RESET_URL", "http://localhost:3000/reset-password")
             reset_link = f"{frontend_reset_url}?uid={uid}&token={token}"
 
-            send_mail(
+            enqueue_email(
                 subject="[Smart Task] Password Reset Request",
                 message=f"Hello,\n\nUse this link to reset your password:\n{reset_link}\n\nIf you did not request this, you can ignore this email.\n\nThanks,\nSmart Task Team",
                 from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com"),
-                recipient_list=[email],
-                fail_silently=True,
+                to_email=email,
             )
 
         return Response(
@@ -86,7 +97,7 @@ class ResetPasswordView(APIView):
 
         user.set_password(new_password.strip())
         user.save()
-
-        user.refresh_from_db()
+        # Sign out everywhere: tokens issued with the old password stop working.
+        TokenVersion.bump(user.pk)
 
         return Response({"detail": "Password reset successful."}, status=status.HTTP_200_OK)
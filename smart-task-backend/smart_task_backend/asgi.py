@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_task_backend.settings')
+# Serve task reads with the async views; set TASKS_ASYNC_READS=false to opt out.
+os.environ.setdefault('TASKS_ASYNC_READS', 'true')
 
 application = get_asgi_application()
@@ -0,0 +1,17 @@
+"""
+URL configuration for the ASGI profile.
+
+Same routes as ``smart_task_backend.urls``, except that task reads go to the
+async views in ``tasks.async_views`` first.
+"""
+from django.contrib import admin
+from django.urls import include, path
+
+from tasks.metrics import metrics_view
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/auth/', include('accounts.urls')),
+    path('api/', include('tasks.async_urls')),
+    path('metrics', metrics_view),
+]
@@ -61,7 +61,48 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'smart_task_backend.urls'
+# Prometheus metrics at /metrics (request latency, response size and query count per view and action, email
+# sends, reminder jobs). Set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by all processes so every
+# gunicorn worker and background job is counted. With TASKS_METRICS_TOKEN set, scrapers must send it as a
+# Bearer token.
+TASKS_METRICS = config('TASKS_METRICS', default=False, cast=bool)
+TASKS_METRICS_TOKEN = config('TASKS_METRICS_TOKEN', default='')
+if TASKS_METRICS:
+    MIDDLEWARE.insert(0, 'tasks.metrics.MetricsMiddleware')
+
+# Per-request timings (SQL count and time, serialize, render, mail) as a Server-Timing header and a JSON
+# log line, plus a log of queries slower than TASKS_SLOW_QUERY_MS. Off by default, and then not installed.
+# Installed outside MetricsMiddleware, which then reuses its query count.
+TASKS_REQUEST_TIMING = config('TASKS_REQUEST_TIMING', default=False, cast=bool)
+TASKS_SLOW_QUERY_MS = config('TASKS_SLOW_QUERY_MS', default=100, cast=float)
+if TASKS_REQUEST_TIMING:
+    MIDDLEWARE.insert(0, 'tasks.timing.RequestTimingMiddleware')
+
+# cProfile one in TASKS_PROFILE_EVERY requests (0 = none), and staff requests sent with an X-Profile header,
+# into pstats files under TASKS_PROFILE_DIR; see `manage.py profile_report`. Off unless the directory is set.
+# Outermost, so the other middleware is profiled too.
+TASKS_PROFILE_DIR = config('TASKS_PROFILE_DIR', default='')
+TASKS_PROFILE_EVERY = config('TASKS_PROFILE_EVERY', default=0, cast=int)
+if TASKS_PROFILE_DIR:
+    MIDDLEWARE.insert(0, 'tasks.profiling.RequestProfilingMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'tasks.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# The ASGI profile (asgi.py, the Procfile's opt-in web-asgi process) turns this on:
+# task list/detail/dashboard reads are then served by the async views in
+# tasks.async_views instead of TaskViewSet.
+TASKS_ASYNC_READS = config('TASKS_ASYNC_READS', default=False, cast=bool)
+
+ROOT_URLCONF = 'smart_task_backend.asgi_urls' if TASKS_ASYNC_READS else 'smart_task_backend.urls'
 
 TEMPLATES = [
     {
@@ -125,15 +166,64 @@ USE_TZ = True
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "tasks.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
 }
 
+# Upper bound on rows returned by /api/tasks/all/ without a cursor.
+TASKS_ALL_MAX_RESULTS = config('TASKS_ALL_MAX_RESULTS', default=1000, cast=int)
+
+# Upper bound on creates + updates + deletes in one /api/tasks/bulk/ request.
+TASKS_BULK_MAX_ITEMS = config('TASKS_BULK_MAX_ITEMS', default=5000, cast=int)
+
+# Tasks or change-log rows per /api/tasks/changes/ page, and how old a change must be
+# before the sync cursor moves past it (covers writes that commit out of id order).
+TASKS_SYNC_PAGE_SIZE = config('TASKS_SYNC_PAGE_SIZE', default=500, cast=int)
+TASKS_SYNC_SETTLE_SECONDS = config('TASKS_SYNC_SETTLE_SECONDS', default=5, cast=int)
+
+# Most completions per list from /api/tasks/suggest/, how many users' suggestion
+# indexes (tasks.suggest) each process keeps in memory, and how many of a user's
+# newest tasks one index covers.
+TASKS_SUGGEST_LIMIT = config('TASKS_SUGGEST_LIMIT', default=10, cast=int)
+TASKS_SUGGEST_MAX_USERS = config('TASKS_SUGGEST_MAX_USERS', default=500, cast=int)
+TASKS_SUGGEST_MAX_TASKS = config('TASKS_SUGGEST_MAX_TASKS', default=20000, cast=int)
+
+# How long a process trusts its cached token versions and users; also the
+# longest a revocation (password reset) takes to reach other processes.
+AUTH_CACHE_SECONDS = config('AUTH_CACHE_SECONDS', default=30, cast=int)
+
+# Shared cache for per-user dashboard responses (tasks.cache). Local memory is
+# per process; set REDIS_URL when running more than one worker.
+REDIS_URL = config('REDIS_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'TIMEOUT': AUTH_CACHE_SECONDS,
+    },
+}
+
+# Cache alias and lifetime for insights/analytics/reminders responses; entries are
+# keyed on the user's task change-log position, so every worker misses after a write.
+TASKS_CACHE_ALIAS = config('TASKS_CACHE_ALIAS', default='default')
+TASKS_CACHE_SECONDS = config('TASKS_CACHE_SECONDS', default=86400, cast=int)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -147,7 +237,7 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
     r"^https:\/\/[a-z0-9-]+\.netlify\.app$",
 ]
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = config('EMAIL_BACKEND', default="django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -1,6 +1,9 @@
 from django.contrib import admin
 
+from .categories import assign_categories
+from .changes import record_task_changes
 from .models import Task
+from .stats import task_state
 
 
 @admin.register(Task)
@@ -8,3 +11,23 @@ class TaskAdmin(admin.ModelAdmin):
     list_display = ("id", "title", "user", "is_important", "status", "priority", "due_date", "created_at")
     list_filter = ("status", "priority")
     search_fields = ("title", "description", "user__username")
+    exclude = ("category_ref", "tags")
+
+    def save_model(self, request, obj, form, change):
+        before = None
+        if change:
+            previous = Task.objects.filter(pk=obj.pk).first()
+            before = task_state(previous) if previous else None
+        assign_categories([obj])
+        super().save_model(request, obj, form, change)
+        record_task_changes([(before, task_state(obj))])
+
+    def delete_model(self, request, obj):
+        before = task_state(obj)
+        super().delete_model(request, obj)
+        record_task_changes([(before, None)])
+
+    def delete_queryset(self, request, queryset):
+        changes = [(task_state(task), None) for task in queryset]
+        super().delete_queryset(request, queryset)
+        record_task_changes(changes)
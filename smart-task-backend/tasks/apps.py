@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class TasksConfig(AppConfig):
     name = 'tasks'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from .search import repair_search_triggers
+
+        def repair(using, **kwargs):
+            repair_search_triggers(using)
+
+        post_migrate.connect(repair, sender=self, weak=False, dispatch_uid="tasks.search.repair")
@@ -0,0 +1,27 @@
+from django.urls import include, path
+
+from . import async_views
+from .urls import router
+
+# The viewset views the router builds, by URL name; they keep serving writes.
+sync_views = {}
+for pattern in router.urls:
+    sync_views.setdefault(pattern.name, pattern.callback)
+
+urlpatterns = [
+    path("tasks/", async_views.async_read_view(async_views.task_list, sync_views["task-list"])),
+    path(
+        "tasks/reminders/",
+        async_views.async_read_view(async_views.task_reminders, sync_views["task-reminders"]),
+    ),
+    path(
+        "tasks/insights/",
+        async_views.async_read_view(async_views.task_insights, sync_views["task-insights"]),
+    ),
+    path(
+        "tasks/analytics/",
+        async_views.async_read_view(async_views.task_analytics, sync_views["task-analytics"]),
+    ),
+    path("tasks/<int:pk>/", async_views.async_read_view(async_views.task_detail, sync_views["task-detail"])),
+    path("", include("tasks.urls")),
+]
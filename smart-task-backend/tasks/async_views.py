@@ -0,0 +1,149 @@
+"""Async versions of the read-heavy task endpoints, routed in by the ASGI profile.
+
+They return the same bodies and headers as the ``TaskViewSet`` actions, but
+wait on the database through the async ORM, so one ASGI worker can keep many
+requests in flight. Writes on the same URLs are handed to ``TaskViewSet``.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from accounts.authentication import ClaimsJWTAuthentication
+
+from .cache import acached_response
+from .dashboard import analytics_data, areminders_data, insights_data
+from .etags import adated_task_etag, arequest_task_version, atask_list_etag
+from .pagination import TaskPagination
+from .renderers import FastJSONRenderer
+from .rows import arepresent_tasks, task_values
+from .stats import aget_task_counts
+from .timing import timed
+from .views import task_queryset
+
+authentication = ClaimsJWTAuthentication()
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    with timed("render"):
+        content = FastJSONRenderer().render(data)
+    response = HttpResponse(content, status=status_code, content_type="application/json")
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def _error_response(exc):
+    # Same shape and headers as rest_framework.views.exception_handler.
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound(*exc.args)
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        exc.status_code = status.HTTP_401_UNAUTHORIZED
+        headers["WWW-Authenticate"] = authentication.authenticate_header(None)
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    return json_response(data, exc.status_code, headers)
+
+
+def _allow_header(sync_view) -> str:
+    # What DRF's allowed_methods gives for the viewset view on the same URL.
+    actions = sync_view.actions
+    allowed = [
+        method.upper()
+        for method in sync_view.cls.http_method_names
+        if method in actions or method == "options" or (method == "head" and "get" in actions)
+    ]
+    return ", ".join(allowed)
+
+
+def async_read_view(view, sync_view):
+    """Serve GET/HEAD with ``view`` and everything else with the DRF ``sync_view`` for the same URL.
+
+    Authenticates like ``ClaimsJWTAuthentication`` + ``IsAuthenticated`` and
+    renders errors and headers the way DRF does.
+    """
+    allow = _allow_header(sync_view)
+
+    @csrf_exempt
+    @functools.wraps(view)
+    async def wrapper(http_request, *args, **kwargs):
+        if http_request.method not in ("GET", "HEAD"):
+            return await sync_to_async(sync_view)(http_request, *args, **kwargs)
+
+        request = Request(http_request, authenticators=[])
+        try:
+            result = await authentication.aauthenticate(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+            request.user = result[0]
+            response = await view(request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            response = _error_response(exc)
+        response["Allow"] = allow
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    # Logged and measured under the same view and action names as the DRF view.
+    wrapper.cls = sync_view.cls
+    wrapper.actions = sync_view.actions
+    return wrapper
+
+
+async def _conditional(request, etag_func, build):
+    """Async counterpart of ``etag`` + ``cache_control(private=True, no_cache=True)``."""
+    etag = quote_etag(await etag_func(request))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await build()
+    response.headers.setdefault("ETag", etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+async def _cached(name, request, abuild):
+    user = request.user
+    data, hit = await acached_response(
+        name, user.pk, lambda: abuild(user), version=await arequest_task_version(request)
+    )
+    return json_response(data, headers={"X-Cache": "hit" if hit else "miss"})
+
+
+async def task_list(request):
+    async def build():
+        paginator = TaskPagination()
+        page = await paginator.apaginate_queryset(task_values(task_queryset(request.user, request.query_params)), request)
+        return json_response(paginator.get_paginated_response(await arepresent_tasks(page)).data)
+
+    return await _conditional(request, atask_list_etag, build)
+
+
+async def task_detail(request, pk):
+    row = await task_values(task_queryset(request.user, request.query_params).filter(pk=pk)).afirst()
+    if row is None:
+        raise Http404("No Task matches the given query.")
+    return json_response((await arepresent_tasks([row]))[0])
+
+
+async def task_reminders(request):
+    return await _conditional(request, adated_task_etag, lambda: _cached("reminders", request, areminders_data))
+
+
+async def _ainsights_data(user):
+    return insights_data(await aget_task_counts(user.pk))
+
+
+async def _aanalytics_data(user):
+    return analytics_data(await aget_task_counts(user.pk))
+
+
+async def task_insights(request):
+    return await _conditional(request, adated_task_etag, lambda: _cached("insights", request, _ainsights_data))
+
+
+async def task_analytics(request):
+    return await _conditional(request, adated_task_etag, lambda: _cached("analytics", request, _aanalytics_data))
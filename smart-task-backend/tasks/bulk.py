@@ -0,0 +1,154 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from rest_framework import serializers
+
+from .categories import assign_categories
+from .changes import record_task_changes
+from .models import Task
+from .notifications import high_priority_due_tomorrow_email, task_completed_email
+from .outbox import enqueue_emails
+from .serializers import TaskSerializer, suggest_priority
+from .stats import task_state
+from .tags import set_tags, tags_prefetch
+
+BULK_BATCH_SIZE = 500
+
+
+class BulkTaskSerializer(serializers.Serializer):
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        max_items = self.context.get("max_items")
+        total = len(attrs["create"]) + len(attrs["update"]) + len(attrs["delete"])
+        if max_items is not None and total > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per request.")
+        for item in attrs["update"]:
+            if not isinstance(item.get("id"), int):
+                raise serializers.ValidationError({"update": "Every update needs an integer id."})
+        return attrs
+
+
+def apply_bulk(request, queryset, payload: dict) -> dict:
+    """Validate and apply a batch of creates, partial updates and deletes in one transaction.
+
+    ``queryset`` is the set of tasks the caller may change. Invalid or unknown
+    items are reported and skipped; everything else is written together.
+    """
+    today = date.today()
+    results = {"created": [], "updated": [], "deleted": []}
+    changes = []
+
+    # Creates: one validation pass, one priority pass, then bulk_create.
+    create_serializer = TaskSerializer(data=payload["create"], many=True, context={"request": request})
+    if create_serializer.is_valid():
+        create_items = list(enumerate(create_serializer.validated_data))
+    else:
+        # Fall back to item by item so the valid rows still go through.
+        create_items = []
+        for index, (item, errors) in enumerate(zip(payload["create"], create_serializer.errors)):
+            if errors:
+                results["created"].append({"index": index, "status": 400, "errors": errors})
+            else:
+                create_items.append((index, create_serializer.child.run_validation(item)))
+    new_indexes = [index for index, _ in create_items]
+    new_tags = [data.pop("tags", None) for _, data in create_items]
+    new_tasks = [Task(user=request.user, **data) for _, data in create_items]
+    for task, (_, data) in zip(new_tasks, create_items):
+        if not data.get("priority"):
+            task.priority = suggest_priority(task.due_date, today)
+
+    # Updates: fetch every target in one query, then validate each against its instance.
+    updates = payload["update"]
+    existing = queryset.select_related("user").in_bulk([item["id"] for item in updates])
+    updated_tasks = {}
+    updated_tags = {}
+    update_fields = set()
+    befores = {}
+    now = timezone.now()
+    for item in updates:
+        task = existing.get(item["id"])
+        if task is None:
+            results["updated"].append({"id": item["id"], "status": 404, "errors": {"detail": "Not found."}})
+            continue
+        data = {key: value for key, value in item.items() if key != "id"}
+        serializer = TaskSerializer(task, data=data, partial=True, context={"request": request})
+        if not serializer.is_valid():
+            results["updated"].append({"id": item["id"], "status": 400, "errors": serializer.errors})
+            continue
+        # Filled in with the saved task once everything is written.
+        results["updated"].append({"id": item["id"], "status": 200})
+
+        validated = dict(serializer.validated_data)
+        if "tags" in validated:
+            updated_tags[task.pk] = validated.pop("tags")
+        if "priority" not in validated and "due_date" in validated:
+            validated["priority"] = suggest_priority(validated["due_date"], today)
+        befores.setdefault(task.pk, (task_state(task), task.status))
+        for field, value in validated.items():
+            setattr(task, field, value)
+        task.updated_at = now
+        update_fields.update(validated)
+        updated_tasks[task.pk] = task
+
+    # Deletes: read the rows being removed once, for the change hooks, then one DELETE ... IN.
+    delete_ids = list(dict.fromkeys(payload["delete"]))
+    doomed = {
+        task.pk: task
+        for task in queryset.filter(pk__in=delete_ids).only("id", "user", "status", "priority", "is_important", "due_date")
+    }
+
+    with transaction.atomic():
+        assign_categories(new_tasks + [task for task in updated_tasks.values() if "category" in update_fields])
+        if "category" in update_fields:
+            update_fields.add("category_ref")
+        created = Task.objects.bulk_create(new_tasks, batch_size=BULK_BATCH_SIZE)
+        if updated_tasks:
+            Task.objects.bulk_update(
+                list(updated_tasks.values()), sorted(update_fields | {"updated_at"}), batch_size=BULK_BATCH_SIZE
+            )
+        set_tags(
+            [(task, tags) for task, tags in zip(created, new_tags) if tags]
+            + [(updated_tasks[pk], tags) for pk, tags in updated_tags.items()]
+        )
+        if doomed:
+            Task.objects.filter(pk__in=list(doomed)).delete()
+
+        changes.extend((None, task_state(task)) for task in created)
+        changes.extend((befores[pk][0], task_state(task)) for pk, task in updated_tasks.items())
+        # A task updated and deleted in the same request leaves from its updated state.
+        changes.extend((task_state(updated_tasks.get(pk, task)), None) for pk, task in doomed.items())
+        record_task_changes(changes)
+
+        # Every email in one go, so a batch of tasks due tomorrow is not a query per task.
+        emails = [high_priority_due_tomorrow_email(task, today) for task in created]
+        for pk, task in updated_tasks.items():
+            before, prev_status = befores[pk]
+            if before != task_state(task):
+                emails.append(high_priority_due_tomorrow_email(task, today))
+            if prev_status != Task.Status.COMPLETED and task.status == Task.Status.COMPLETED:
+                emails.append(task_completed_email(task))
+        enqueue_emails(email for email in emails if email is not None)
+
+    # One query for the tags of every task in the response.
+    prefetch_related_objects(created + list(updated_tasks.values()), tags_prefetch())
+    for index, data in zip(new_indexes, TaskSerializer(created, many=True).data):
+        results["created"].append({"index": index, "status": 201, "data": data})
+    results["created"].sort(key=lambda result: result["index"])
+
+    serialized = dict(zip(updated_tasks, TaskSerializer(list(updated_tasks.values()), many=True).data))
+    for result in results["updated"]:
+        if result["status"] == 200:
+            result["data"] = serialized[result["id"]]
+
+    for pk in delete_ids:
+        if pk in doomed:
+            results["deleted"].append({"id": pk, "status": 204})
+        else:
+            results["deleted"].append({"id": pk, "status": 404, "errors": {"detail": "Not found."}})
+
+    return results
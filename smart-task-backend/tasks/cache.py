@@ -0,0 +1,100 @@
+import threading
+from collections import Counter
+from datetime import date
+from typing import Awaitable, Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .etags import auser_task_version, task_versions, user_task_version
+from .metrics import CACHE_REQUESTS
+
+# Every name passed to ``cached_response``, so ``forget_responses`` can find the entries.
+RESPONSE_NAMES = ("insights", "analytics", "reminders")
+
+# Hits and misses per endpoint, for this process.
+CACHE_STATS = Counter()
+_stats_lock = threading.Lock()
+
+
+def response_cache():
+    return caches[getattr(settings, "TASKS_CACHE_ALIAS", "default")]
+
+
+def _forget(user_ids) -> None:
+    versions = task_versions(user_ids)
+    keys = [
+        _response_key(name, user_id, versions.get(user_id, 0), dated)
+        for user_id in user_ids
+        for name in RESPONSE_NAMES
+        for dated in (False, True)
+    ]
+    response_cache().delete_many(keys)
+
+
+def forget_responses(user_ids: Iterable[int]) -> None:
+    """Drop the cached responses for ``user_ids`` at their current task version, once this transaction commits.
+
+    Task writes need not call this: they add to the change log, which moves the
+    version every entry is keyed on. It is for rollup repairs, which leave the
+    version where it was, and for a change logged with a lower id committing
+    after a read that already saw a higher one.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: _forget(user_ids))
+
+
+def _response_key(name, user_id, version, dated) -> str:
+    key = f"tasks:{name}:{user_id}:{version}"
+    if dated:
+        key = f"{key}:{date.today().isoformat()}"
+    return key
+
+
+def _count(name, hit) -> None:
+    result = "hit" if hit else "miss"
+    with _stats_lock:
+        CACHE_STATS[f"{name}:{result}"] += 1
+    CACHE_REQUESTS.labels(name, result).inc()
+
+
+def cached_response(
+    name: str, user_id: int, build: Callable[[], dict], dated: bool = True, version: int | None = None
+) -> tuple[dict, bool]:
+    """Return ``(data, hit)`` for one user's endpoint, building and storing it on a miss.
+
+    Entries are keyed on the user's ``task_version``, read from the database, so
+    a write seen by any worker misses here too. Date-relative results are keyed
+    on today's date as well, so they roll over at midnight. Pass ``version`` when
+    the caller has already read it, e.g. for the ETag.
+    """
+    if version is None:
+        version = user_task_version(user_id)
+    key = _response_key(name, user_id, version, dated)
+    cache = response_cache()
+    data = cache.get(key)
+    hit = data is not None
+    if not hit:
+        data = build()
+        cache.set(key, data, timeout=getattr(settings, "TASKS_CACHE_SECONDS", 86400))
+    _count(name, hit)
+    return data, hit
+
+
+async def acached_response(
+    name: str, user_id: int, build: Callable[[], Awaitable[dict]], dated: bool = True, version: int | None = None
+) -> tuple[dict, bool]:
+    """``cached_response`` for async views; ``build`` is a coroutine function."""
+    if version is None:
+        version = await auser_task_version(user_id)
+    key = _response_key(name, user_id, version, dated)
+    cache = response_cache()
+    data = await cache.aget(key)
+    hit = data is not None
+    if not hit:
+        data = await build()
+        await cache.aset(key, data, timeout=getattr(settings, "TASKS_CACHE_SECONDS", 86400))
+    _count(name, hit)
+    return data, hit
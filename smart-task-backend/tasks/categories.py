@@ -0,0 +1,57 @@
+"""Per-user ``Category`` rows behind the free-text ``Task.category``.
+
+Every write path runs its tasks through ``assign_categories`` before saving,
+so a task's ``category_ref`` points at its user's category with the same
+case-folded key and ``category`` carries that category's spelling: "work" and
+"Work " both become the user's existing "Work". ``?category=`` and the facet
+counts go through the key instead of comparing strings case-insensitively.
+"""
+
+from .models import Category
+
+
+def name_key(name: str) -> str:
+    """Case-folded ``name`` with runs of whitespace collapsed; names with equal keys are one category or tag."""
+    return " ".join(name.casefold().split())
+
+
+def get_named(model, names: dict) -> dict:
+    """The Category or Tag row for each ``(user_id, key)`` in ``names``, creating missing ones with the given name."""
+    if not names:
+        return {}
+    user_ids = {user_id for user_id, _ in names}
+    keys = {key for _, key in names}
+
+    def fetch():
+        return {
+            (row.user_id, row.key): row
+            for row in model.objects.filter(user_id__in=user_ids, key__in=keys)
+            if (row.user_id, row.key) in names
+        }
+
+    rows = fetch()
+    missing = [
+        model(user_id=user_id, key=key, name=name)
+        for (user_id, key), name in names.items()
+        if (user_id, key) not in rows
+    ]
+    if missing:
+        # A concurrent write may create the same row first; either way the rows are read back.
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        rows = fetch()
+    return rows
+
+
+def assign_categories(tasks) -> None:
+    """Set ``category_ref`` and the canonical ``category`` on unsaved changes to ``tasks``; needs ``user_id``."""
+    names = {}
+    for task in tasks:
+        name = " ".join((task.category or "").split())
+        if name:
+            names.setdefault((task.user_id, name_key(name)), name)
+    categories = get_named(Category, names)
+    for task in tasks:
+        name = " ".join((task.category or "").split())
+        category = categories[(task.user_id, name_key(name))] if name else None
+        task.category_ref = category
+        task.category = category.name if category is not None else ""
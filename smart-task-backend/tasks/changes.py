@@ -0,0 +1,27 @@
+from typing import Iterable
+
+from .cache import forget_responses
+from .models import TaskChange
+from .stats import TaskState, apply_task_changes
+
+
+def record_task_changes(changes: Iterable[tuple[TaskState | None, TaskState | None]]) -> None:
+    """Hook for every task write path: API, admin and bulk.
+
+    Takes (before, after) task states, with ``None`` for a create or delete, and
+    must run in the same transaction as the writes it describes.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    apply_task_changes(changes)
+
+    log = []
+    for before, after in changes:
+        if before is not None and (after is None or after.user_id != before.user_id):
+            log.append(TaskChange(user_id=before.user_id, task_id=before.task_id, op=TaskChange.Op.DELETE))
+        if after is not None:
+            log.append(TaskChange(user_id=after.user_id, task_id=after.task_id, op=TaskChange.Op.UPSERT))
+    TaskChange.objects.bulk_create(log)
+    forget_responses({entry.user_id for entry in log})
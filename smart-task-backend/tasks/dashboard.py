@@ -0,0 +1,136 @@
+import asyncio
+from datetime import date, timedelta
+
+from django.db.models import Count
+
+from .models import Task
+from .rows import arepresent_tasks, represent_tasks, task_values
+from .stats import ACTIVE_STATUSES
+
+
+def _reminder_querysets(user, today):
+    qs = Task.objects.filter(user=user, status__in=ACTIVE_STATUSES)
+    overdue = qs.filter(due_date__lt=today).order_by("due_date", "-is_important", "-created_at")
+    due_tomorrow = qs.filter(due_date=today + timedelta(days=1)).order_by("-is_important", "-created_at")
+    return task_values(overdue), task_values(due_tomorrow)
+
+
+def _reminders_payload(today, overdue, due_tomorrow) -> dict:
+    return {
+        "date": {
+            "today": today.isoformat(),
+            "tomorrow": (today + timedelta(days=1)).isoformat(),
+        },
+        "counts": {
+            "overdue": len(overdue),
+            "due_tomorrow": len(due_tomorrow),
+        },
+        "overdue": overdue,
+        "due_tomorrow": due_tomorrow,
+    }
+
+
+def reminders_data(user) -> dict:
+    today = date.today()
+    overdue, due_tomorrow = (list(qs) for qs in _reminder_querysets(user, today))
+    # In place, with one tag query for both lists.
+    represent_tasks(overdue + due_tomorrow)
+    return _reminders_payload(today, overdue, due_tomorrow)
+
+
+async def areminders_data(user) -> dict:
+    today = date.today()
+
+    async def fetch(qs):
+        return [row async for row in qs.aiterator()]
+
+    overdue, due_tomorrow = await asyncio.gather(*(fetch(qs) for qs in _reminder_querysets(user, today)))
+    await arepresent_tasks(overdue + due_tomorrow)
+    return _reminders_payload(today, overdue, due_tomorrow)
+
+
+def insights_data(counts: dict) -> dict:
+    total = counts["total"]
+    completed = counts["completed"]
+    overdue = counts["overdue"]
+    due_tomorrow = counts["due_tomorrow"]
+    high_priority_active = counts["high_active"]
+
+    progress_pct = 0
+    if total:
+        progress_pct = round((completed / total) * 100)
+
+    suggestions = []
+    if overdue:
+        suggestions.append(f"You have {overdue} overdue tasks. Complete them first.")
+    if due_tomorrow:
+        suggestions.append(f"Reminder: {due_tomorrow} tasks are due tomorrow.")
+    if not overdue and high_priority_active:
+        suggestions.append(f"Today's focus: {high_priority_active} high priority tasks.")
+    if total and completed == total:
+        suggestions.append("Great job! All tasks are completed.")
+
+    return {
+        "counts": {
+            "total": total,
+            "completed": completed,
+            "pending": counts["pending"],
+            "in_progress": counts["in_progress"],
+        },
+        "progress_pct": progress_pct,
+        "reminders": {
+            "overdue": overdue,
+            "due_tomorrow": due_tomorrow,
+            "due_soon_7_days": counts["due_soon"],
+        },
+        "suggestions": suggestions,
+    }
+
+
+def analytics_data(counts: dict) -> dict:
+    return {
+        "total": counts["total"],
+        "by_status": {
+            Task.Status.PENDING: counts["pending"],
+            Task.Status.IN_PROGRESS: counts["in_progress"],
+            Task.Status.COMPLETED: counts["completed"],
+        },
+        "by_priority": {
+            Task.Priority.HIGH: counts["high"],
+            Task.Priority.MEDIUM: counts["medium"],
+            Task.Priority.LOW: counts["low"],
+        },
+        "overdue_pending": counts["overdue"],
+        "due_soon_pending": counts["due_soon"],
+    }
+
+
+def facet_counts(qs) -> dict:
+    """Tasks in ``qs`` counted by category, status, priority and importance, from one grouped query."""
+    categories = {}
+    counts = {
+        "total": 0,
+        "uncategorized": 0,
+        "status": dict.fromkeys(Task.Status.values, 0),
+        "priority": dict.fromkeys(Task.Priority.values, 0),
+        "important": {"true": 0, "false": 0},
+    }
+    rows = (
+        qs.order_by()
+        .values_list("category_ref__name", "status", "priority", "is_important")
+        .annotate(n=Count("id"))
+    )
+    for category, task_status, priority, important, n in rows:
+        counts["total"] += n
+        if category is None:
+            counts["uncategorized"] += n
+        else:
+            categories[category] = categories.get(category, 0) + n
+        counts["status"][task_status] = counts["status"].get(task_status, 0) + n
+        counts["priority"][priority] = counts["priority"].get(priority, 0) + n
+        counts["important"]["true" if important else "false"] += n
+    # Most used first, as the filter sidebar lists them.
+    counts["categories"] = [
+        {"name": name, "count": n} for name, n in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+    ]
+    return counts
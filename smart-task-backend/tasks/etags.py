@@ -0,0 +1,79 @@
+import hashlib
+from datetime import date
+
+from django.db.models import Max
+
+from .models import TaskChange
+
+
+def _changes(user_id, all_users):
+    return TaskChange.objects.all() if all_users else TaskChange.objects.filter(user_id=user_id)
+
+
+def task_version(user, all_users: bool = False) -> int:
+    """Latest change-log id visible to ``user``; it moves on every task write."""
+    return user_task_version(user.pk, all_users)
+
+
+async def atask_version(user, all_users: bool = False) -> int:
+    return await auser_task_version(user.pk, all_users)
+
+
+def user_task_version(user_id: int, all_users: bool = False) -> int:
+    return _changes(user_id, all_users).aggregate(last=Max("id"))["last"] or 0
+
+
+async def auser_task_version(user_id: int, all_users: bool = False) -> int:
+    return (await _changes(user_id, all_users).aaggregate(last=Max("id")))["last"] or 0
+
+
+def task_versions(user_ids) -> dict:
+    """``task_version`` for each of ``user_ids`` that has any changes, from one query."""
+    rows = TaskChange.objects.filter(user_id__in=user_ids).order_by().values_list("user_id").annotate(last=Max("id"))
+    return dict(rows)
+
+
+def request_task_version(request) -> int:
+    """``task_version`` of the user's own tasks, read once per request; the ETag and the response cache share it."""
+    if not hasattr(request, "_task_version"):
+        request._task_version = task_version(request.user)
+    return request._task_version
+
+
+async def arequest_task_version(request) -> int:
+    if not hasattr(request, "_task_version"):
+        request._task_version = await atask_version(request.user)
+    return request._task_version
+
+
+def _etag(request, version: int, *extra) -> str:
+    parts = [
+        str(request.user.pk),
+        str(version),
+        request.path,
+        # Same params in a different order are the same response.
+        "&".join(sorted(request.GET.urlencode().split("&"))),
+        request.META.get("HTTP_ACCEPT", ""),
+        *extra,
+    ]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+def task_list_etag(request, *args, **kwargs) -> str:
+    """ETag for reads scoped like ``TaskViewSet.get_queryset``."""
+    user = request.user
+    return _etag(request, task_version(user, all_users=user.is_staff or user.is_superuser))
+
+
+def dated_task_etag(request, *args, **kwargs) -> str:
+    """ETag for the user's own dashboard reads, whose answers also change with the date."""
+    return _etag(request, request_task_version(request), date.today().isoformat())
+
+
+async def atask_list_etag(request) -> str:
+    user = request.user
+    return _etag(request, await atask_version(user, all_users=user.is_staff or user.is_superuser))
+
+
+async def adated_task_etag(request) -> str:
+    return _etag(request, await arequest_task_version(request), date.today().isoformat())
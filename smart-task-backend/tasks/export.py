@@ -0,0 +1,45 @@
+import csv
+import json
+
+from .rows import TASK_FIELDS, aiter_task_rows, iter_task_rows
+
+EXPORT_FIELDS = (*TASK_FIELDS, "tags")
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _ndjson_line(row):
+    return json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def iter_ndjson(queryset):
+    for row in iter_task_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        yield _ndjson_line(row)
+
+
+async def aiter_ndjson(queryset):
+    async for row in aiter_task_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        yield _ndjson_line(row)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_line(writer, row):
+    row["tags"] = ",".join(row["tags"])
+    return writer.writerow(["" if row[name] is None else row[name] for name in EXPORT_FIELDS])
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in iter_task_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        yield _csv_line(writer, row)
+
+
+async def aiter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    async for row in aiter_task_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        yield _csv_line(writer, row)
@@ -0,0 +1,310 @@
+import json
+import platform
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from itertools import count
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from tasks.cache import forget_responses
+from tasks.models import OutboxEmail, Task
+from tasks.seeding import seed_tasks
+
+PASSWORD = "Bench-pass-987!"
+BULK_ITEMS = 10
+
+
+def percentile(sorted_samples: list, q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    return statistics.quantiles(sorted_samples, n=100, method="inclusive")[round(q) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every TaskViewSet action and the auth views through the test client at several data sizes and "
+        "report latency percentiles and query counts per endpoint. Seeds throwaway users in the configured "
+        "database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="100,1000,10000",
+            help="Comma separated tasks-per-user sizes to benchmark.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=4,
+            help="Other users seeded at each size, so the tables hold more than the benchmark user's rows.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=30,
+            help="Timed requests per endpoint, after one warm-up request.",
+        )
+        parser.add_argument(
+            "--slow-requests",
+            type=int,
+            default=5,
+            help="Timed requests for endpoints that hash a password (register, login, reset-password).",
+        )
+        parser.add_argument(
+            "--output",
+            default="bench_api.json",
+            help="File the JSON results are written to.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in (options.get("sizes") or "").split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of integers, e.g. 100,1000.")
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--sizes needs at least one size, all >= 1.")
+        background = max(0, options.get("users") or 0)
+        requests = max(1, options.get("requests") or 30)
+        slow_requests = max(1, options.get("slow_requests") or 5)
+        output = options.get("output") or "bench_api.json"
+
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        results = []
+        try:
+            # Lets the test client through ALLOWED_HOSTS and keeps email in memory.
+            setup_test_environment()
+            owns_environment = True
+        except RuntimeError:
+            owns_environment = False
+        try:
+            for size in sizes:
+                self.stdout.write(f"Seeding {background + 1} user(s) x {size} tasks ...")
+                users = seed_tasks(background + 1, size, prefix=f"{prefix}-{size}", password=PASSWORD)
+                for name, method, samples, queries, statuses in self.run_size(users[0], prefix, requests, slow_requests):
+                    samples.sort()
+                    row = {
+                        "size": size,
+                        "endpoint": name,
+                        "method": method,
+                        "requests": len(samples),
+                        "statuses": dict(Counter(str(status) for status in statuses)),
+                        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                        "p90_ms": round(percentile(samples, 90) * 1000, 3),
+                        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                        "max_ms": round(samples[-1] * 1000, 3),
+                        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+                        "queries_min": min(queries),
+                        "queries_max": max(queries),
+                    }
+                    results.append(row)
+                    self.stdout.write(
+                        f"{size:>7} {name:<24} {method:<6} p50 {row['p50_ms']:8.2f} ms  p90 {row['p90_ms']:8.2f} ms  "
+                        f"p99 {row['p99_ms']:8.2f} ms  queries {row['queries_min']}-{row['queries_max']}  "
+                        f"{' '.join(f'{code}x{n}' for code, n in row['statuses'].items())}"
+                    )
+        finally:
+            get_user_model().objects.filter(username__startswith=prefix).delete()
+            OutboxEmail.objects.filter(to_email__startswith=prefix).delete()
+            if owns_environment:
+                teardown_test_environment()
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "sizes": sizes,
+            "requests": requests,
+            "slow_requests": slow_requests,
+            "results": results,
+        }
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Done. Endpoints: {len(results)}, Results: {output}"))
+
+    def run_size(self, user, prefix, requests, slow_requests):
+        """Yield (name, method, latencies, query counts, statuses) for every endpoint against ``user``'s data."""
+        client = APIClient()
+        login = client.post("/api/auth/login/", {"username": user.username, "password": PASSWORD}, format="json")
+        if login.status_code != 200:
+            raise CommandError(f"Could not log in as {user.username}: {login.status_code} {login.content[:200]!r}")
+        tokens = login.json()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        anonymous = APIClient()
+
+        task_id = Task.objects.filter(user=user).order_by("id").values_list("id", flat=True).first()
+        sample_ids = list(Task.objects.filter(user=user).order_by("-id").values_list("id", flat=True)[:BULK_ITEMS])
+        list_etag = client.get("/api/tasks/")["ETag"]
+        due = (date.today() + timedelta(days=10)).isoformat()
+        created_ids = []
+        bulk_created = []
+        counter = count()
+
+        reset_user = get_user_model().objects.create_user(
+            username=f"{prefix}-reset-{user.pk}", email=f"{prefix}-reset-{user.pk}@example.com", password=PASSWORD
+        )
+
+        def task_body(n):
+            return {"title": f"Bench task {n}", "description": "", "due_date": due, "priority": "low", "category": "Work"}
+
+        def create(n):
+            return client, "post", "/api/tasks/", {"data": task_body(n), "format": "json"}
+
+        def destroy(n):
+            return client, "delete", f"/api/tasks/{created_ids.pop()}/", {}
+
+        def bulk(n):
+            doomed = bulk_created[:]
+            bulk_created.clear()
+            return client, "post", "/api/tasks/bulk/", {
+                "data": {
+                    "create": [task_body(f"{n}.{i}") for i in range(BULK_ITEMS)],
+                    "update": [{"id": pk, "priority": ("high", "medium", "low")[n % 3]} for pk in sample_ids],
+                    "delete": doomed,
+                },
+                "format": "json",
+            }
+
+        def miss(path):
+            def request(n):
+                # Outside a transaction this drops the cached dashboard answer straight away.
+                forget_responses([user.pk])
+                return client, "get", path, {}
+
+            return request
+
+        def reset_password(n):
+            reset_user.refresh_from_db()
+            return anonymous, "post", "/api/auth/reset-password/", {
+                "data": {
+                    "uid": urlsafe_base64_encode(force_bytes(reset_user.pk)),
+                    "token": PasswordResetTokenGenerator().make_token(reset_user),
+                    "new_password": PASSWORD,
+                },
+                "format": "json",
+            }
+
+        def get(path, **extra):
+            return lambda n: (client, "get", path, extra)
+
+        endpoints = [
+            ("list", get("/api/tasks/"), False),
+            ("list 304", get("/api/tasks/", HTTP_IF_NONE_MATCH=list_etag), False),
+            ("list filtered", get("/api/tasks/?status=pending&ordering=due_date"), False),
+            ("list search", get("/api/tasks/?search=report"), False),
+            ("list cursor", get("/api/tasks/?pagination=cursor"), False),
+            ("list category", get("/api/tasks/?category=work"), False),
+            ("facets", get("/api/tasks/facets/"), False),
+            ("suggest", get("/api/tasks/suggest/?q=re"), False),
+            ("all", get("/api/tasks/all/"), False),
+            ("export ndjson", get("/api/tasks/export/"), False),
+            ("export csv", get("/api/tasks/export/?format=csv"), False),
+            ("retrieve", get(f"/api/tasks/{task_id}/"), False),
+            ("changes", get("/api/tasks/changes/"), False),
+            ("reminders", get("/api/tasks/reminders/"), False),
+            ("reminders uncached", miss("/api/tasks/reminders/"), False),
+            ("insights", get("/api/tasks/insights/"), False),
+            ("insights uncached", miss("/api/tasks/insights/"), False),
+            ("analytics", get("/api/tasks/analytics/"), False),
+            ("analytics uncached", miss("/api/tasks/analytics/"), False),
+            ("create", create, False),
+            (
+                "update",
+                lambda n: (client, "put", f"/api/tasks/{task_id}/", {"data": task_body(n), "format": "json"}),
+                False,
+            ),
+            (
+                "partial_update",
+                lambda n: (
+                    client,
+                    "patch",
+                    f"/api/tasks/{task_id}/",
+                    {"data": {"status": ("in_progress", "pending")[n % 2]}, "format": "json"},
+                ),
+                False,
+            ),
+            ("destroy", destroy, False),
+            ("bulk", bulk, False),
+            (
+                "register",
+                lambda n: (
+                    anonymous,
+                    "post",
+                    "/api/auth/register/",
+                    {
+                        "data": {
+                            "username": f"{prefix}-reg-{user.pk}-{n}",
+                            "email": f"{prefix}-reg-{user.pk}-{n}@example.com",
+                            "password": PASSWORD,
+                        },
+                        "format": "json",
+                    },
+                ),
+                True,
+            ),
+            (
+                "login",
+                lambda n: (
+                    anonymous,
+                    "post",
+                    "/api/auth/login/",
+                    {"data": {"username": user.username, "password": PASSWORD}, "format": "json"},
+                ),
+                True,
+            ),
+            (
+                "refresh",
+                lambda n: (anonymous, "post", "/api/auth/refresh/", {"data": {"refresh": tokens["refresh"]}, "format": "json"}),
+                False,
+            ),
+            (
+                "forgot-password",
+                lambda n: (
+                    anonymous,
+                    "post",
+                    "/api/auth/forgot-password/",
+                    {"data": {"email": reset_user.email}, "format": "json"},
+                ),
+                False,
+            ),
+            ("reset-password", reset_password, True),
+        ]
+
+        for name, request, slow in endpoints:
+            samples = []
+            queries = []
+            statuses = []
+            # The first request is a warm-up and is not recorded.
+            for i in range(-1, slow_requests if slow else requests):
+                n = next(counter)
+                api, method, path, kwargs = request(n)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(api, method)(path, **kwargs)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                if name == "create" and response.status_code == 201:
+                    created_ids.append(response.json()["id"])
+                elif name == "bulk" and response.status_code == 200:
+                    bulk_created.extend(item["data"]["id"] for item in response.json()["created"] if "data" in item)
+                if i < 0:
+                    continue
+                samples.append(elapsed)
+                queries.append(len(captured.captured_queries))
+                statuses.append(response.status_code)
+            yield name, method.upper(), samples, queries, statuses
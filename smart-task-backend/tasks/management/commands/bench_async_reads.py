@@ -0,0 +1,183 @@
+import asyncio
+import time
+import uuid
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from accounts.serializers import CustomTokenObtainPairSerializer
+from tasks.cache import response_cache
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/second for one worker: a sync WSGI worker serving TaskViewSet one request at a "
+        "time vs one ASGI event loop serving the async read views concurrently."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default="/api/tasks/?page_size=20",
+            help="Read endpoint to request.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Requests per variant.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Requests in flight at once on the ASGI worker.",
+        )
+        parser.add_argument(
+            "--tasks",
+            type=int,
+            default=200,
+            help="Number of throwaway tasks for the benchmark user (deleted afterwards).",
+        )
+        parser.add_argument(
+            "--db-latency-ms",
+            type=float,
+            default=0.0,
+            help="Extra delay added to every query, to stand in for a database across the network.",
+        )
+
+    def handle(self, *args, **options):
+        path = options.get("path") or "/api/tasks/"
+        total = max(1, options.get("requests") or 200)
+        concurrency = max(1, options.get("concurrency") or 20)
+        latency = max(0.0, options.get("db_latency_ms") or 0.0) / 1000
+
+        user = get_user_model().objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        today = date.today()
+        Task.objects.bulk_create(
+            [
+                Task(user=user, title=f"Benchmark task {i}", due_date=today + timedelta(days=i % 30 - 5))
+                for i in range(max(0, options.get("tasks") or 0))
+            ],
+            batch_size=1000,
+        )
+        token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+        path, _, query = path.partition("?")
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow_query)
+
+        if latency:
+            connection_created.connect(add_latency)
+            for connection in connections.all(initialized_only=True):
+                connection.execute_wrappers.append(slow_query)
+        try:
+            with override_settings(ROOT_URLCONF="smart_task_backend.urls"):
+                response_cache().clear()
+                wsgi = self.run_wsgi(path, query, token, total)
+            with override_settings(ROOT_URLCONF="smart_task_backend.asgi_urls"):
+                response_cache().clear()
+                asgi = self.run_asgi(path, query, token, total, concurrency)
+        finally:
+            if latency:
+                connection_created.disconnect(add_latency)
+                for connection in connections.all(initialized_only=True):
+                    if slow_query in connection.execute_wrappers:
+                        connection.execute_wrappers.remove(slow_query)
+            user.delete()
+
+        self.stdout.write(f"WSGI, 1 sync worker:            {total / wsgi:,.1f} req/s ({wsgi:.2f}s)")
+        self.stdout.write(f"ASGI, 1 worker, {concurrency} in flight: {total / asgi:,.1f} req/s ({asgi:.2f}s)")
+        self.stdout.write(self.style.SUCCESS(f"Done. Requests: {total}, Speedup: {wsgi / asgi:.1f}x"))
+
+    def run_wsgi(self, path, query, token, total):
+        handler = WSGIHandler()
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(status)
+
+        started = time.perf_counter()
+        for _ in range(total):
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": query,
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "HTTP_AUTHORIZATION": f"Bearer {token}",
+                "wsgi.input": BytesIO(),
+                "wsgi.url_scheme": "http",
+            }
+            response = handler(environ, start_response)
+            b"".join(response)
+            response.close()
+        elapsed = time.perf_counter() - started
+        self.check_statuses("WSGI", [int(status.split()[0]) for status in statuses])
+        return elapsed
+
+    def run_asgi(self, path, query, token, total, concurrency):
+        handler = ASGIHandler()
+        statuses = []
+
+        async def one():
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query.encode(),
+                "headers": [(b"host", b"localhost"), (b"authorization", f"Bearer {token}".encode())],
+                "server": ("localhost", 80),
+                "client": ("127.0.0.1", 50000),
+            }
+
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # Like a server, only say anything more once the client goes away; that never happens here.
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+
+            await handler(scope, receive, send)
+
+        async def run():
+            gate = asyncio.Semaphore(concurrency)
+
+            async def limited():
+                async with gate:
+                    await one()
+
+            await asyncio.gather(*(limited() for _ in range(total)))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        self.check_statuses("ASGI", statuses)
+        return elapsed
+
+    def check_statuses(self, label, statuses):
+        bad = [status for status in statuses if status != 200]
+        if bad:
+            self.stderr.write(f"{label}: {len(bad)} request(s) did not return 200, e.g. {bad[0]}")
@@ -0,0 +1,87 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from tasks.models import Task
+from tasks.rows import represent_tasks, task_values
+from tasks.serializers import TaskSerializer
+from tasks.tags import set_tags, tags_prefetch
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize pages of tagged tasks at growing page sizes and report queries and time per page: "
+        "TaskSerializer without and with the tags Prefetch, and the values() rows the list endpoints use."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-sizes",
+            default="10,50,100,500",
+            help="Comma separated page sizes.",
+        )
+        parser.add_argument(
+            "--tags",
+            type=int,
+            default=3,
+            help="Tags on every throwaway task (created and rolled back).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per variant and size; the best time is reported.",
+        )
+
+    def measure(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return len(captured.captured_queries), best
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({max(1, int(size)) for size in options.get("page_sizes", "").split(",") if size.strip()})
+        except ValueError:
+            raise CommandError("--page-sizes must be comma separated integers.")
+        if not sizes:
+            raise CommandError("--page-sizes must name at least one size.")
+        tag_count = max(0, options.get("tags") or 0)
+        repeat = max(1, options.get("repeat") or 5)
+
+        variants = {
+            "serializer": lambda page: TaskSerializer(list(page), many=True).data,
+            "serializer + Prefetch": lambda page: TaskSerializer(
+                list(page.prefetch_related(tags_prefetch())), many=True
+            ).data,
+            "values rows": lambda page: represent_tasks(task_values(page)),
+        }
+        queries = {name: [] for name in variants}
+
+        with transaction.atomic():
+            user = get_user_model().objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+            tasks = Task.objects.bulk_create(
+                [Task(user=user, title=f"Tagged task {i}") for i in range(sizes[-1])], batch_size=1000
+            )
+            set_tags((task, [f"tag-{(task.pk + j) % (tag_count * 4)}" for j in range(tag_count)]) for task in tasks)
+            qs = Task.objects.filter(user=user).order_by("id")
+
+            for size in sizes:
+                for name, run in variants.items():
+                    count, elapsed = self.measure(repeat, lambda: run(qs[:size]))
+                    queries[name].append(count)
+                    self.stdout.write(f"{size:>7} {name:<24} queries {count:>5}  {elapsed * 1000:9.2f} ms")
+            transaction.set_rollback(True)
+
+        constant = [name for name, counts in queries.items() if len(set(counts)) == 1]
+        self.stdout.write(
+            self.style.SUCCESS(f"Done. Page sizes: {len(sizes)}, Constant query count: {', '.join(constant) or 'none'}")
+        )
@@ -0,0 +1,81 @@
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from tasks.models import Task
+from tasks.renderers import FastJSONRenderer, orjson
+from tasks.rows import represent_tasks, task_values
+from tasks.serializers import TaskSerializer
+from tasks.tags import tags_prefetch
+
+
+class Command(BaseCommand):
+    help = "Measure rows/second for task list reads: TaskSerializer + JSONRenderer vs values() + FastJSONRenderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=5000,
+            help="Number of throwaway tasks to read (created and rolled back).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per variant; the best one is reported.",
+        )
+
+    def best_of(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        rows = max(1, options.get("rows") or 5000)
+        repeat = max(1, options.get("repeat") or 5)
+
+        with transaction.atomic():
+            user = get_user_model().objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+            today = date.today()
+            Task.objects.bulk_create(
+                [
+                    Task(
+                        user=user,
+                        title=f"Benchmark task {i}",
+                        description="Read benchmark row",
+                        due_date=today + timedelta(days=i % 30) if i % 4 else None,
+                        priority=Task.Priority.values[i % 3],
+                        status=Task.Status.values[i % 3],
+                        is_important=not i % 5,
+                        category="Work" if i % 2 else "",
+                    )
+                    for i in range(rows)
+                ],
+                batch_size=1000,
+            )
+            qs = Task.objects.filter(user=user).order_by("id")
+
+            def serializer_path():
+                JSONRenderer().render(TaskSerializer(qs.prefetch_related(tags_prefetch()), many=True).data)
+
+            def fast_path():
+                FastJSONRenderer().render(represent_tasks(task_values(qs)))
+
+            before = self.best_of(repeat, serializer_path)
+            after = self.best_of(repeat, fast_path)
+            transaction.set_rollback(True)
+
+        renderer = "orjson" if orjson is not None else "json (orjson not installed)"
+        self.stdout.write(f"TaskSerializer + JSONRenderer: {rows / before:,.0f} rows/s ({before * 1000:.1f} ms)")
+        self.stdout.write(f"values() + FastJSONRenderer [{renderer}]: {rows / after:,.0f} rows/s ({after * 1000:.1f} ms)")
+        self.stdout.write(self.style.SUCCESS(f"Done. Rows: {rows}, Speedup: {before / after:.1f}x"))
@@ -0,0 +1,73 @@
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the request profiles saved by RequestProfilingMiddleware for one endpoint and print the top "
+        "functions. Without --endpoint, list the endpoints that have profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--endpoint",
+            default=None,
+            help="View and action to report on, e.g. TaskViewSet.list or CustomTokenObtainPairView.token_obtain_pair.",
+        )
+        parser.add_argument(
+            "--dir",
+            default=None,
+            help="Profile directory (default: TASKS_PROFILE_DIR).",
+        )
+        parser.add_argument(
+            "--sort",
+            default="cumulative",
+            choices=["cumulative", "tottime", "ncalls"],
+            help="Column to rank functions by.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=30,
+            help="Number of functions to show.",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Also write the merged profile to this pstats file, for snakeviz or gprof2dot.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options.get("dir") or getattr(settings, "TASKS_PROFILE_DIR", "")
+        if not directory or not os.path.isdir(directory):
+            raise CommandError("No profile directory; set TASKS_PROFILE_DIR or pass --dir.")
+
+        endpoint = options.get("endpoint")
+        if not endpoint:
+            endpoints = sorted(
+                (name, len(self.profiles(os.path.join(directory, name))))
+                for name in os.listdir(directory)
+                if os.path.isdir(os.path.join(directory, name))
+            )
+            for name, profiles in endpoints:
+                self.stdout.write(f"{name:<60} {profiles} profile(s)")
+            self.stdout.write(self.style.SUCCESS(f"Done. Endpoints: {len(endpoints)}"))
+            return
+
+        files = self.profiles(os.path.join(directory, endpoint))
+        if not files:
+            raise CommandError(f"No profiles for {endpoint} in {directory}.")
+
+        stats = pstats.Stats(*files, stream=self.stdout)
+        if options.get("output"):
+            stats.dump_stats(options["output"])
+        stats.strip_dirs().sort_stats(options.get("sort") or "cumulative").print_stats(max(1, options.get("limit") or 30))
+        self.stdout.write(self.style.SUCCESS(f"Done. Profiles: {len(files)}, Endpoint: {endpoint}"))
+
+    def profiles(self, path) -> list:
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".prof"))
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tasks.stats import rebuild_task_stats
+
+
+class Command(BaseCommand):
+    help = "Recount per-user task stats from the tasks table and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only rebuild stats for this user id (can be repeated).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users to recount per batch.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options.get("user_ids")
+        batch_size = max(1, options.get("batch_size") or 500)
+
+        if not user_ids:
+            User = get_user_model()
+            user_ids = User.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=batch_size)
+
+        checked = 0
+        repaired = 0
+        batch = []
+        for user_id in user_ids:
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                repaired += rebuild_task_stats(batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            repaired += rebuild_task_stats(batch)
+            checked += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Checked: {checked}, Repaired: {repaired}"))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches over a reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of emails to send per connection.",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=5,
+            help="Give up on an email after this many failed attempts.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            default=False,
+            help="Drain the emails that are due now, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options.get("batch_size") or 100)
+        max_attempts = max(1, options.get("max_attempts") or 5)
+        interval = options.get("interval") or 5.0
+        once = bool(options.get("once"))
+
+        totals = {"sent": 0, "retried": 0, "failed": 0}
+        try:
+            while True:
+                result = deliver_outbox(batch_size=batch_size, max_attempts=max_attempts)
+                for key, value in result.items():
+                    totals[key] += value
+
+                if sum(result.values()) < batch_size:
+                    if once:
+                        break
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Done. Sent: {totals['sent']}, Retried: {totals['retried']}, Failed: {totals['failed']}")
+        )
@@ -0,0 +1,83 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tasks.scheduler import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "Run a long-lived scheduler that queues due-tomorrow reminders as they come due."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window-days",
+            type=int,
+            default=2,
+            help="Only keep tasks due within this many days in memory.",
+        )
+        parser.add_argument(
+            "--remind-at",
+            default="09:00",
+            help="Local time (HH:MM) on the day before the due date to send the reminder.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds between checks of the task change log.",
+        )
+        parser.add_argument(
+            "--resync-interval",
+            type=float,
+            default=3600.0,
+            help="Seconds between full reloads of the window, to catch anything the change log missed.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            default=False,
+            help="Load the window, queue whatever is due now, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            remind_at = datetime.strptime(options.get("remind_at") or "09:00", "%H:%M").time()
+        except ValueError:
+            raise CommandError("--remind-at must look like HH:MM.")
+
+        window_days = max(1, options.get("window_days") or 2)
+        poll_interval = options.get("poll_interval") or 5.0
+        resync_interval = options.get("resync_interval") or 3600.0
+        once = bool(options.get("once"))
+
+        scheduler = ReminderScheduler(window_days=window_days, remind_at=remind_at)
+        now = timezone.now()
+        scheduler.resync(now)
+        last_resync = time.monotonic()
+        self.stdout.write(f"Scheduler started with {len(scheduler.scheduled)} reminder(s) in the window.")
+
+        queued = 0
+        try:
+            while True:
+                now = timezone.now()
+                if time.monotonic() - last_resync >= resync_interval:
+                    scheduler.resync(now)
+                    last_resync = time.monotonic()
+                else:
+                    scheduler.advance_window(now)
+                    scheduler.poll_changes(now)
+
+                fired = scheduler.fire_due(now)
+                if fired:
+                    queued += fired
+                    self.stdout.write(f"Queued {fired} reminder(s).")
+
+                if once:
+                    break
+                time.sleep(scheduler.seconds_until_next(timezone.now(), poll_interval))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Queued: {queued}"))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.seeding import seed_tasks
+
+
+class Command(BaseCommand):
+    help = "Create N users with M tasks each, with realistic status, priority, due date and category mixes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=10,
+            help="Number of users to create.",
+        )
+        parser.add_argument(
+            "--tasks",
+            type=int,
+            default=100,
+            help="Number of tasks per user.",
+        )
+        parser.add_argument(
+            "--prefix",
+            default=None,
+            help="Username prefix; users are named <prefix>-0, <prefix>-1, ... (default: a random one).",
+        )
+        parser.add_argument(
+            "--password",
+            default="seed-pass-123",
+            help="Password for every seeded user.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Random seed, for repeatable data.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per INSERT.",
+        )
+
+    def handle(self, *args, **options):
+        users = max(0, options.get("users") or 0)
+        tasks = max(0, options.get("tasks") or 0)
+
+        started = time.monotonic()
+        created = seed_tasks(
+            users,
+            tasks,
+            prefix=options.get("prefix"),
+            password=options.get("password"),
+            seed=options.get("seed"),
+            batch_size=max(1, options.get("batch_size") or 1000),
+        )
+        elapsed = time.monotonic() - started
+
+        if created:
+            self.stdout.write(f"Users: {created[0].username} .. {created[-1].username}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Done. Users: {len(created)}, Tasks: {len(created) * tasks}, Elapsed: {elapsed:.2f}s")
+        )
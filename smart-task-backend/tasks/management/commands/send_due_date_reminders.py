@@ -1,11 +1,90 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Mod
+from django.utils import timezone
 
-from tasks.models import Task
+from tasks.metrics import EMAIL_SEND_FAILURES, EMAIL_SEND_SECONDS, REMINDERS
+from tasks.models import ReminderCheckpoint, ReminderDelivery, Task
+
+ROW_FIELDS = ("user_id", "user__username", "user__email", "title", "priority", "status", "due_date")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise CommandError("--shard must look like i/N, e.g. 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise CommandError("--shard i/N needs N >= 1 and 0 <= i < N.")
+    return index, count
+
+
+class SenderPool:
+    """Sends batches of messages on worker threads, each with its own reused mail connection.
+
+    ``on_done(user_ids, error)`` is called on the submitting thread, in submission order.
+    """
+
+    def __init__(self, workers: int, on_done):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminder-sender")
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.max_pending = workers * 2
+        self.on_done = on_done
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def _send(self, messages, user_ids):
+        try:
+            connection = self._connection()
+            for message in messages:
+                message.connection = connection
+            with EMAIL_SEND_SECONDS.labels("due_date_reminders").time():
+                connection.send_messages(messages)
+        except Exception as exc:
+            EMAIL_SEND_FAILURES.labels("due_date_reminders").inc(len(messages))
+            # Drop the connection so the next batch on this thread reconnects.
+            self.local.connection = None
+            return user_ids, exc
+        return user_ids, None
+
+    def _finish_oldest(self):
+        self.on_done(*self.pending.popleft().result())
+
+    def submit(self, messages, user_ids):
+        # Keep only a few batches in flight so memory stays flat however many users there are.
+        while len(self.pending) >= self.max_pending:
+            self._finish_oldest()
+        self.pending.append(self.executor.submit(self._send, messages, user_ids))
+
+    def close(self):
+        try:
+            while self.pending:
+                self._finish_oldest()
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            for connection in self.connections:
+                connection.close()
 
 
 class Command(BaseCommand):
@@ -24,100 +103,195 @@ class Command(BaseCommand):
             default=False,
             help="Do not send emails; just print what would be sent.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of sender threads, each with its own mail connection.",
+        )
+        parser.add_argument(
+            "--shard",
+            default="0/1",
+            help="Only handle users with user_id %% N == i, given as i/N, to split a run across processes.",
+        )
+        parser.add_argument(
+            "--since-checkpoint",
+            action="store_true",
+            default=False,
+            help="Resume after the last user id this shard finished today instead of rescanning from the start.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of emails handed to a mail connection at once.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of task rows fetched from the database per round trip.",
+        )
+
+    def get_rows(self, today, tomorrow, include_overdue, shard, after_user_id=0):
+        due = Q(due_date__in=[today, tomorrow])
+        if include_overdue:
+            due |= Q(due_date__lt=today)
+
+        already_sent = ReminderDelivery.objects.filter(
+            user_id=OuterRef("user_id"),
+            date=today,
+            kind=ReminderDelivery.Kind.DUE_DATE,
+        )
+        qs = (
+            Task.objects.filter(due, status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS], user__is_active=True)
+            .exclude(user__email="")
+            .filter(~Exists(already_sent))
+        )
+        if after_user_id:
+            qs = qs.filter(user_id__gt=after_user_id)
+
+        shard_index, shard_count = shard
+        if shard_count > 1:
+            qs = qs.annotate(shard=Mod("user_id", shard_count)).filter(shard=shard_index)
+
+        # One pass, grouped by user; within a user overdue tasks come first by date, then today, then tomorrow.
+        return qs.order_by("user_id", "due_date", "-is_important", "-created_at").values_list(*ROW_FIELDS)
+
+    def build_message(self, username, rows, today, tomorrow, include_overdue):
+        overdue = [r for r in rows if r[6] < today]
+        due_today = [r for r in rows if r[6] == today]
+        due_tomorrow = [r for r in rows if r[6] == tomorrow]
+
+        lines = []
+        lines.append(f"Hello {username},")
+        lines.append("")
+
+        if due_today:
+            lines.append(f"Due today ({today.isoformat()}): {len(due_today)} task(s)")
+            for _, _, _, title, priority, status, _ in due_today:
+                lines.append(f"- {title} [priority: {priority}, status: {status}]")
+            lines.append("")
+
+        if due_tomorrow:
+            lines.append(f"Reminder: You have {len(due_tomorrow)} task(s) due tomorrow ({tomorrow.isoformat()}).")
+            for _, _, _, title, priority, status, _ in due_tomorrow:
+                if priority == Task.Priority.HIGH:
+                    lines.append(f"- {title} [HIGH priority] (Recommended: complete today)")
+                else:
+                    lines.append(f"- {title} [priority: {priority}, status: {status}]")
+            lines.append("")
+
+        if include_overdue and overdue:
+            lines.append(f"Overdue: You have {len(overdue)} overdue task(s).")
+            for _, _, _, title, priority, status, due_date in overdue:
+                lines.append(f"- {title} (due: {due_date.isoformat()}) [priority: {priority}, status: {status}]")
+            lines.append("")
+
+        lines.append("Thanks,")
+        lines.append("Smart Task Team")
+        return "\n".join(lines)
 
     def handle(self, *args, **options):
         include_overdue = bool(options.get("include_overdue"))
         dry_run = bool(options.get("dry_run"))
+        since_checkpoint = bool(options.get("since_checkpoint"))
+        workers = max(1, options.get("workers") or 1)
+        batch_size = max(1, options.get("batch_size") or 100)
+        chunk_size = max(1, options.get("chunk_size") or 2000)
+        shard = parse_shard(options.get("shard") or "0/1")
 
         today = date.today()
         tomorrow = today + timedelta(days=1)
 
-        active_statuses = [Task.Status.PENDING, Task.Status.IN_PROGRESS]
+        subject = "[Smart Task] Due Date Reminder"
+        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None)
+
+        checkpoint = None
+        after_user_id = 0
+        if not dry_run:
+            checkpoint, _ = ReminderCheckpoint.objects.get_or_create(
+                date=today,
+                kind=ReminderDelivery.Kind.DUE_DATE,
+                shard=f"{shard[0]}/{shard[1]}",
+            )
+            if since_checkpoint:
+                after_user_id = checkpoint.last_user_id
+
+        started = time.monotonic()
+        progress = {"sent": 0, "failed": 0}
 
-        User = get_user_model()
+        def on_done(user_ids, error):
+            if error is not None:
+                progress["failed"] += len(user_ids)
+                REMINDERS.labels("due_date", "failed").inc(len(user_ids))
+                self.stderr.write(f"Failed to send {len(user_ids)} reminder(s): {type(error).__name__}: {error}")
+                return
+
+            ReminderDelivery.objects.bulk_create(
+                [ReminderDelivery(user_id=user_id, date=today, kind=ReminderDelivery.Kind.DUE_DATE) for user_id in user_ids],
+                ignore_conflicts=True,
+            )
+            progress["sent"] += len(user_ids)
+            REMINDERS.labels("due_date", "sent").inc(len(user_ids))
+            # Only move the checkpoint over users that all got their email.
+            if not progress["failed"]:
+                checkpoint.last_user_id = max(checkpoint.last_user_id, user_ids[-1])
+                checkpoint.save(update_fields=["last_user_id", "updated_at"])
 
-        users = User.objects.all().only("id", "email", "username", "is_active")
-        sent = 0
+        users = 0
+        tasks = 0
         skipped = 0
+        queued = 0
+        batch = []
+        batch_user_ids = []
+        pool = None if dry_run else SenderPool(workers, on_done)
 
-        for user in users:
-            if not getattr(user, "is_active", True):
-                skipped += 1
-                continue
-
-            email = (getattr(user, "email", "") or "").strip()
-            if not email:
-                skipped += 1
-                continue
-
-            due_today_qs = Task.objects.filter(
-                user=user,
-                status__in=active_statuses,
-                due_date=today,
-            ).order_by("-is_important", "-created_at")
-
-            due_tomorrow_qs = Task.objects.filter(
-                user=user,
-                status__in=active_statuses,
-                due_date=tomorrow,
-            ).order_by("-is_important", "-created_at")
-
-            overdue_qs = Task.objects.none()
-            if include_overdue:
-                overdue_qs = Task.objects.filter(
-                    user=user,
-                    status__in=active_statuses,
-                    due_date__lt=today,
-                ).order_by("due_date", "-is_important", "-created_at")
-
-            if due_today_qs.count() == 0 and due_tomorrow_qs.count() == 0 and overdue_qs.count() == 0:
-                skipped += 1
-                continue
-
-            lines = []
-            lines.append(f"Hello {getattr(user, 'username', '')},")
-            lines.append("")
+        try:
+            rows = self.get_rows(today, tomorrow, include_overdue, shard, after_user_id).iterator(chunk_size=chunk_size)
+            for user_id, group in groupby(rows, key=itemgetter(0)):
+                group = list(group)
+                users += 1
+                tasks += len(group)
 
-            if due_today_qs.exists():
-                lines.append(f"Due today ({today.isoformat()}): {due_today_qs.count()} task(s)")
-                for t in due_today_qs:
-                    lines.append(f"- {t.title} [priority: {t.priority}, status: {t.status}]")
-                lines.append("")
-
-            if due_tomorrow_qs.exists():
-                lines.append(f"Reminder: You have {due_tomorrow_qs.count()} task(s) due tomorrow ({tomorrow.isoformat()}).")
-                for t in due_tomorrow_qs:
-                    if t.priority == Task.Priority.HIGH:
-                        lines.append(f"- {t.title} [HIGH priority] (Recommended: complete today)")
-                    else:
-                        lines.append(f"- {t.title} [priority: {t.priority}, status: {t.status}]")
-                lines.append("")
-
-            if include_overdue and overdue_qs.exists():
-                lines.append(f"Overdue: You have {overdue_qs.count()} overdue task(s).")
-                for t in overdue_qs:
-                    dd = t.due_date.isoformat() if t.due_date else "N/A"
-                    lines.append(f"- {t.title} (due: {dd}) [priority: {t.priority}, status: {t.status}]")
-                lines.append("")
-
-            lines.append("Thanks,")
-            lines.append("Smart Task Team")
-
-            subject = "[Smart Task] Due Date Reminder"
-            message = "\n".join(lines)
-
-            if dry_run:
-                self.stdout.write(self.style.WARNING(f"DRY RUN: would send to {email}\n{message}\n"))
-                sent += 1
-                continue
-
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                recipient_list=[email],
-                fail_silently=False,
-            )
-            sent += 1
+                _, username, email, *_ = group[0]
+                email = (email or "").strip()
+                if not email:
+                    skipped += 1
+                    REMINDERS.labels("due_date", "skipped").inc()
+                    continue
+
+                message = self.build_message(username or "", group, today, tomorrow, include_overdue)
 
-        self.stdout.write(self.style.SUCCESS(f"Done. Sent: {sent}, Skipped: {skipped}"))
+                if dry_run:
+                    self.stdout.write(self.style.WARNING(f"DRY RUN: would send to {email}\n{message}\n"))
+                    queued += 1
+                    continue
+
+                batch.append(EmailMessage(subject=subject, body=message, from_email=from_email, to=[email]))
+                batch_user_ids.append(user_id)
+                queued += 1
+                if len(batch) >= batch_size:
+                    pool.submit(batch, batch_user_ids)
+                    batch = []
+                    batch_user_ids = []
+
+            if batch:
+                pool.submit(batch, batch_user_ids)
+        finally:
+            if pool is not None:
+                pool.close()
+
+        if checkpoint is not None and not progress["failed"]:
+            checkpoint.completed_at = timezone.now()
+            checkpoint.save(update_fields=["completed_at", "updated_at"])
+
+        sent = queued if dry_run else progress["sent"]
+        elapsed = time.monotonic() - started
+        rate = sent / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done. Sent: {sent}, Failed: {progress['failed']}, Skipped: {skipped}, Users: {users}, Tasks: {tasks}, "
+                f"Elapsed: {elapsed:.2f}s, Throughput: {rate:.1f} emails/s"
+            )
+        )
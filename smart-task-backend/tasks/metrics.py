@@ -0,0 +1,160 @@
+"""Prometheus metrics for the API and the background jobs, served at ``/metrics``.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set in the environment of every process
+(gunicorn workers, the outbox worker, the reminder jobs), each process writes
+its samples to mmap'd files in that directory and ``/metrics`` adds them up.
+The directory must exist and be emptied before the processes start. Without
+it, ``/metrics`` reports the serving process only.
+"""
+
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .timing import current_timings, install_query_hook, start_timings, stop_timings, view_action
+
+REQUEST_SECONDS = Histogram(
+    "tasks_http_request_duration_seconds",
+    "Time to produce a response, by view and action.",
+    ["view", "action", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSE_BYTES = Histogram(
+    "tasks_http_response_size_bytes",
+    "Response body size, by view and action.",
+    ["view", "action"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+REQUEST_QUERIES = Histogram(
+    "tasks_http_db_queries",
+    "Database queries per request, by view and action.",
+    ["view", "action"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "tasks_email_send_duration_seconds",
+    "Time to hand a batch of emails to the mail server, by sender.",
+    ["sender"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+EMAIL_SEND_FAILURES = Counter(
+    "tasks_email_send_failures",
+    "Emails the mail server did not accept, by sender.",
+    ["sender"],
+)
+REMINDERS = Counter(
+    "tasks_reminders",
+    "Reminder emails handled by the reminder jobs, by job and outcome.",
+    ["job", "outcome"],
+)
+CACHE_REQUESTS = Counter(
+    "tasks_response_cache_requests",
+    "Cached dashboard responses looked up, by endpoint and result.",
+    ["endpoint", "result"],
+)
+
+
+def metrics_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    if not getattr(settings, "TASKS_METRICS", False):
+        raise Http404
+    token = getattr(settings, "TASKS_METRICS_TOKEN", "")
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def _observe_streamed_size(response, observe):
+    # Streamed bodies are only sized once they have been sent.
+    content = response.streaming_content
+    if response.is_async:
+
+        async def counted():
+            size = 0
+            try:
+                async for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                observe(size)
+
+    else:
+
+        def counted():
+            size = 0
+            try:
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                observe(size)
+
+    response.streaming_content = counted()
+
+
+class MetricsMiddleware:
+    """Records latency, response size and query count for every request when ``TASKS_METRICS`` is on."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "TASKS_METRICS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_hook()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Shares the query count with RequestTimingMiddleware when that runs outside this one.
+        token = None if current_timings() is not None else start_timings(request.path)
+        timings = current_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                stop_timings(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        token = None if current_timings() is not None else start_timings(request.path)
+        timings = current_timings()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                stop_timings(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        view, action = view_action(request)
+        view = view or "unresolved"
+        action = action or ""
+        REQUEST_SECONDS.labels(view, action, request.method, str(response.status_code)).observe(
+            time.perf_counter() - timings.started
+        )
+        REQUEST_QUERIES.labels(view, action).observe(timings.queries)
+        size = RESPONSE_BYTES.labels(view, action)
+        if response.streaming:
+            _observe_streamed_size(response, size.observe)
+        else:
+            size.observe(len(response.content))
+        return response
@@ -0,0 +1,89 @@
+# Generated by Django 6.0.2 on 2026-10-18 05:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+ACTIVE_STATUSES = ("pending", "in_progress")
+
+
+def backfill_task_stats(apps, schema_editor):
+    """Count every existing user's rollups, so reads never have to build them on first use."""
+    Task = apps.get_model("tasks", "Task")
+    UserTaskStats = apps.get_model("tasks", "UserTaskStats")
+    TaskDueBucket = apps.get_model("tasks", "TaskDueBucket")
+
+    active = Q(status__in=ACTIVE_STATUSES)
+    rows = (
+        Task.objects.order_by()
+        .values("user_id")
+        .annotate(
+            total=Count("id"),
+            pending=Count("id", filter=Q(status="pending")),
+            in_progress=Count("id", filter=Q(status="in_progress")),
+            completed=Count("id", filter=Q(status="completed")),
+            high=Count("id", filter=Q(priority="high")),
+            medium=Count("id", filter=Q(priority="medium")),
+            low=Count("id", filter=Q(priority="low")),
+            important=Count("id", filter=Q(is_important=True)),
+            high_active=Count("id", filter=active & Q(priority="high")),
+            dated_active=Count("id", filter=active & Q(due_date__isnull=False)),
+        )
+    )
+    UserTaskStats.objects.bulk_create((UserTaskStats(**row) for row in rows.iterator()), batch_size=1000)
+
+    buckets = (
+        Task.objects.filter(active, due_date__isnull=False)
+        .order_by()
+        .values_list("user_id", "due_date")
+        .annotate(count=Count("id"))
+    )
+    TaskDueBucket.objects.bulk_create(
+        (
+            TaskDueBucket(user_id=user_id, due_date=due_date, count=count)
+            for user_id, due_date, count in buckets.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0004_task_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('high', models.IntegerField(default=0)),
+                ('medium', models.IntegerField(default=0)),
+                ('low', models.IntegerField(default=0)),
+                ('important', models.IntegerField(default=0)),
+                ('high_active', models.IntegerField(default=0)),
+                ('dated_active', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskDueBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_due_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'due_date'), name='task_due_bucket_user_date_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_task_stats, migrations.RunPython.noop),
+    ]
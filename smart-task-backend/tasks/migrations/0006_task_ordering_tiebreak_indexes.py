@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 05:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_user_task_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_default_order_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_status_order_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_due_order_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', '-is_important', 'status', 'due_date', '-created_at', 'id'], name='task_user_default_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', '-is_important', 'due_date', '-created_at', 'id'], name='task_user_status_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date', '-is_important', '-created_at', 'id'], name='task_user_due_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='task_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_categories(apps, schema_editor):
+    """One Category per user and case-folded name, spelled the way most of that user's tasks spell it."""
+    Task = apps.get_model("tasks", "Task")
+    Category = apps.get_model("tasks", "Category")
+    TaskChange = apps.get_model("tasks", "TaskChange")
+
+    spellings = {}
+    rows = Task.objects.exclude(category="").values_list("user_id", "category").annotate(n=Count("id")).order_by()
+    for user_id, category, n in rows.iterator():
+        name = " ".join(category.split())
+        key = " ".join(name.casefold().split())
+        spellings.setdefault((user_id, key), []).append((category, name, n))
+
+    categories = [
+        Category(user_id=user_id, key=key, name=min(found, key=lambda spelling: (-spelling[2], spelling[1]))[1])
+        for (user_id, key), found in spellings.items()
+        if key
+    ]
+    Category.objects.bulk_create(categories, batch_size=1000)
+    by_key = {(category.user_id, category.key): category for category in Category.objects.all()}
+
+    for (user_id, key), found in spellings.items():
+        category = by_key.get((user_id, key))
+        name = category.name if category is not None else ""
+        for spelling, _, _ in found:
+            tasks = Task.objects.filter(user_id=user_id, category=spelling)
+            if spelling != name:
+                # Respelled tasks go through the change log, so synced clients and ETags see the new name.
+                TaskChange.objects.bulk_create(
+                    [TaskChange(user_id=user_id, task_id=task_id, op="upsert") for task_id in tasks.values_list("id", flat=True)],
+                    batch_size=1000,
+                )
+            tasks.update(category=name, category_ref=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=150)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_categories', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='tasks.category'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['category_ref', '-is_important', 'status', 'due_date', '-created_at', 'id'], name='task_category_order_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='category_user_key_uniq'),
+        ),
+        migrations.RunPython(backfill_categories, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,49 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+class Category(models.Model):
+    """One of a user's task categories. ``key`` is the case-folded name, so "Work" and "work " are one category."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_categories",
+    )
+    name = models.CharField(max_length=50)
+    # Case folding can lengthen a name ("ß" -> "ss"), hence the extra room.
+    key = models.CharField(max_length=150)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="category_user_key_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class Tag(models.Model):
+    """A label a user puts on any number of tasks; ``key`` is the case-folded name, as for Category."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_tags",
+    )
+    name = models.CharField(max_length=50)
+    key = models.CharField(max_length=150)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="tag_user_key_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
 
 
 class Task(models.Model):
@@ -33,11 +77,216 @@ class Task(models.Model):
     )
     is_important = models.BooleanField(default=False)
     category = models.CharField(max_length=50, blank=True)
+    # The Category row for ``category``, kept in step by ``tasks.categories.assign_categories``.
+    category_ref = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name="tasks",
+    )
+    # Written through ``tasks.tags.set_tags``.
+    tags = models.ManyToManyField(Tag, through="TaskTag", related_name="tasks", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-is_important", "status", "due_date", "-created_at"]
+        indexes = [
+            # Default list ordering for a single user's tasks.
+            models.Index(
+                fields=["user", "-is_important", "status", "due_date", "-created_at", "id"],
+                name="task_user_default_order_idx",
+            ),
+            # Same order within one status, for ?status= filters; its (user, status, ...) prefix
+            # also serves the per-status counts.
+            models.Index(
+                fields=["user", "status", "-is_important", "due_date", "-created_at", "id"],
+                name="task_user_status_order_idx",
+            ),
+            models.Index(fields=["user", "priority", "status"], name="task_user_priority_status_idx"),
+            # ?ordering=due_date, and the reminder lists (due_date, -is_important, -created_at).
+            models.Index(
+                fields=["user", "due_date", "-is_important", "-created_at", "id"],
+                name="task_user_due_order_idx",
+            ),
+            models.Index(fields=["user", "created_at", "id"], name="task_user_created_idx"),
+            # ?category= in the default order; categories are per user, so it also covers the foreign key.
+            models.Index(
+                fields=["category_ref", "-is_important", "status", "due_date", "-created_at", "id"],
+                name="task_category_order_idx",
+            ),
+            # Reminders and dashboard counts only look at active tasks with a due date.
+            models.Index(
+                fields=["user", "due_date"],
+                name="task_user_active_due_idx",
+                condition=models.Q(status__in=["pending", "in_progress"], due_date__isnull=False),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} ({self.status})"
+
+
+class TaskTag(models.Model):
+    """One tag on one task."""
+
+    # The unique (task, tag) pair serves a task's tags, the (tag, task) index a tag's tasks.
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, db_index=False)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["task", "tag"], name="task_tag_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["tag", "task"], name="task_tag_tag_task_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Tag {self.tag_id} on task {self.task_id}"
+
+
+class UserTaskStats(models.Model):
+    """Per-user task counters, kept in step with every task write by ``tasks.stats``."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="task_stats",
+    )
+    total = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    high = models.IntegerField(default=0)
+    medium = models.IntegerField(default=0)
+    low = models.IntegerField(default=0)
+    important = models.IntegerField(default=0)
+    high_active = models.IntegerField(default=0)
+    dated_active = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Task stats for user {self.user_id}"
+
+
+class TaskDueBucket(models.Model):
+    """Number of active (pending or in progress) tasks a user has due on one date."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_due_buckets",
+    )
+    due_date = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "due_date"], name="task_due_bucket_user_date_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.count} task(s) due {self.due_date} for user {self.user_id}"
+
+
+class OutboxEmail(models.Model):
+    """An email queued by a request and delivered later by ``run_outbox_worker``."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to_email = models.EmailField()
+    # Only one email is ever queued per key, e.g. one "completed" notice per task.
+    dedupe_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_next_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class ReminderDelivery(models.Model):
+    """Records that a user was sent a given kind of reminder for a given day."""
+
+    class Kind(models.TextChoices):
+        DUE_DATE = "due_date", "Due date reminder"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="reminder_deliveries",
+    )
+    date = models.DateField()
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date", "kind"], name="reminder_delivery_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} reminder for user {self.user_id} on {self.date}"
+
+
+class ReminderCheckpoint(models.Model):
+    """Highest user id a reminder run has fully handled, per day, kind and shard."""
+
+    date = models.DateField()
+    kind = models.CharField(max_length=20, choices=ReminderDelivery.Kind.choices)
+    shard = models.CharField(max_length=20, default="0/1")
+    last_user_id = models.BigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "kind", "shard"], name="reminder_checkpoint_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} reminders on {self.date} ({self.shard}): up to user {self.last_user_id}"
+
+
+class TaskChange(models.Model):
+    """Append-only log of task writes; ``id`` is the position other processes read from."""
+
+    class Op(models.TextChoices):
+        UPSERT = "upsert", "Created or updated"
+        DELETE = "delete", "Deleted"
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_changes",
+    )
+    # Not a foreign key: the row has to outlive the task it describes.
+    task_id = models.BigIntegerField()
+    op = models.CharField(max_length=10, choices=Op.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="task_change_user_id_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.id} {self.op} task {self.task_id}"
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+from .models import Task
+from .outbox import enqueue_email
+
+
+def is_high_priority_due_tomorrow(task: Task, today: date | None = None) -> bool:
+    if task.due_date is None:
+        return False
+
+    if task.priority != Task.Priority.HIGH:
+        return False
+
+    if task.status not in {Task.Status.PENDING, Task.Status.IN_PROGRESS}:
+        return False
+
+    tomorrow = (today or date.today()) + timedelta(days=1)
+    return task.due_date == tomorrow
+
+
+def high_priority_due_tomorrow_email(task: Task, today: date | None = None) -> dict | None:
+    """``enqueue_email`` arguments for the "due tomorrow" email, or ``None`` if the task does not get one."""
+    if not is_high_priority_due_tomorrow(task, today):
+        return None
+
+    email = (getattr(task.user, "email", "") or "").strip()
+    if not email:
+        return None
+
+    tomorrow = task.due_date
+    return {
+        "subject": "[Smart Task] High Priority Task Due Tomorrow",
+        "message": (
+            f"Hello {getattr(task.user, 'username', '')},\n\n"
+            f"High priority reminder: this task is due tomorrow ({tomorrow.isoformat()}).\n"
+            f"Recommended: complete it today.\n\n"
+            f"- {task.title}\n\n"
+            "Thanks,\nSmart Task Team"
+        ),
+        "to_email": email,
+        "dedupe_key": f"task:{task.pk}:due-tomorrow:{tomorrow.isoformat()}",
+    }
+
+
+def task_completed_email(task: Task) -> dict | None:
+    """Build the "completed" email, deduplicated per completion so a reopened task emails again."""
+    email = (getattr(task.user, "email", "") or "").strip()
+    if not email:
+        return None
+
+    return {
+        "subject": "[Smart Task] Task Completed",
+        "message": f"Hello {getattr(task.user, 'username', '')},\n\nYour task is completed:\n- {task.title}\n\nThanks,\nSmart Task Team",
+        "to_email": email,
+        "dedupe_key": f"task:{task.pk}:completed:{task.updated_at.isoformat()}",
+    }
+
+
+def queue_high_priority_due_tomorrow_email(task: Task, today: date | None = None) -> bool:
+    """Queue the "due tomorrow" email for a high priority task, at most once per task and due date."""
+    email = high_priority_due_tomorrow_email(task, today)
+    return email is not None and enqueue_email(**email) is not None
+
+
+def queue_task_completed_email(task: Task) -> bool:
+    email = task_completed_email(task)
+    return email is not None and enqueue_email(**email) is not None
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import EMAIL_SEND_FAILURES, EMAIL_SEND_SECONDS
+from .models import OutboxEmail
+from .timing import timed
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# How long a claimed batch is hidden from other workers; a worker that dies mid-batch releases it this way.
+LEASE_SECONDS = 10 * 60
+
+
+def enqueue_email(subject: str, message: str, to_email: str, from_email: str | None = None, dedupe_key: str | None = None):
+    """Queue an email for the outbox worker.
+
+    Call this inside the transaction that makes the change the email is about, so
+    the email is only queued if that change commits. Returns ``None`` when an
+    email with the same ``dedupe_key`` has already been queued.
+    """
+    fields = {
+        "subject": subject,
+        "body": message,
+        "to_email": to_email,
+        "from_email": from_email if from_email is not None else (getattr(settings, "DEFAULT_FROM_EMAIL", "") or ""),
+    }
+    with timed("mail"):
+        if dedupe_key is None:
+            return OutboxEmail.objects.create(**fields)
+
+        email, created = OutboxEmail.objects.get_or_create(dedupe_key=dedupe_key, defaults=fields)
+        return email if created else None
+
+
+def enqueue_emails(emails: Iterable[dict]) -> int:
+    """Queue many emails, given as ``enqueue_email`` keyword arguments, in a couple of queries.
+
+    Emails whose ``dedupe_key`` is already queued are skipped. Returns how many were queued.
+    """
+    default_from = getattr(settings, "DEFAULT_FROM_EMAIL", "") or ""
+    rows = []
+    keys = set()
+    for email in emails:
+        key = email.get("dedupe_key")
+        if key is not None:
+            if key in keys:
+                continue
+            keys.add(key)
+        from_email = email.get("from_email")
+        rows.append(
+            OutboxEmail(
+                subject=email["subject"],
+                body=email["message"],
+                to_email=email["to_email"],
+                from_email=from_email if from_email is not None else default_from,
+                dedupe_key=key,
+            )
+        )
+    with timed("mail"):
+        if keys:
+            queued = set(OutboxEmail.objects.filter(dedupe_key__in=keys).values_list("dedupe_key", flat=True))
+            rows = [row for row in rows if row.dedupe_key not in queued]
+        # A concurrent writer can still win the race for a key; the unique constraint keeps its row.
+        OutboxEmail.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def deliver_outbox(batch_size: int = 100, max_attempts: int = 5, connection=None) -> dict:
+    """Send one batch of due emails over a single mail connection.
+
+    The batch is claimed and its results recorded in two short transactions; no
+    row lock or transaction is held while talking to the mail server. Claiming
+    counts the attempt and pushes ``next_attempt_at`` out by ``LEASE_SECONDS``,
+    so other workers skip the batch until it is recorded or the lease runs out.
+
+    Returns counts of sent, retried and failed emails.
+    """
+    result = {"sent": 0, "retried": 0, "failed": 0}
+    now = timezone.now()
+    emails = _claim(batch_size, now)
+    if not emails:
+        return result
+
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        EMAIL_SEND_FAILURES.labels("outbox").inc(len(emails))
+        for email in emails:
+            _record_failure(email, exc, now, max_attempts)
+    else:
+        try:
+            for email in emails:
+                _send(email, connection, now, max_attempts)
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        # A lease that ran out mid-send may have been claimed again, which counted another attempt;
+        # that worker records the outcome instead.
+        held = dict(
+            OutboxEmail.objects.select_for_update()
+            .filter(pk__in=[email.pk for email in emails], status=OutboxEmail.Status.PENDING)
+            .values_list("pk", "attempts")
+        )
+        emails = [email for email in emails if held.get(email.pk) == email.attempts]
+        OutboxEmail.objects.bulk_update(emails, ["status", "next_attempt_at", "last_error", "sent_at"])
+
+    for email in emails:
+        if email.status == OutboxEmail.Status.SENT:
+            result["sent"] += 1
+        elif email.status == OutboxEmail.Status.FAILED:
+            result["failed"] += 1
+        else:
+            result["retried"] += 1
+    return result
+
+
+def _claim(batch_size, now):
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + timedelta(seconds=LEASE_SECONDS)
+        OutboxEmail.objects.bulk_update(emails, ["attempts", "next_attempt_at"])
+    return emails
+
+
+def _send(email, connection, now, max_attempts):
+    message = EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or None,
+        to=[email.to_email],
+        connection=connection,
+    )
+    try:
+        with timed("mail"), EMAIL_SEND_SECONDS.labels("outbox").time():
+            connection.send_messages([message])
+    except Exception as exc:
+        EMAIL_SEND_FAILURES.labels("outbox").inc()
+        _record_failure(email, exc, now, max_attempts)
+        return
+
+    email.status = OutboxEmail.Status.SENT
+    email.sent_at = timezone.now()
+    email.last_error = ""
+
+
+def _record_failure(email, exc, now, max_attempts):
+    # The attempt was already counted when the email was claimed.
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.Status.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
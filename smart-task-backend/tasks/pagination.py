@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(BasePagination):
+    """Keyset pagination over whatever ``order_by`` the queryset carries.
+
+    The ordering must end in a unique field (``id``). The cursor holds the
+    ordering values of the last row on the page, so each page is one indexed
+    range query with no ``COUNT(*)`` and no ``OFFSET``.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        return self._set_page([row async for row in queryset])
+
+    def _page_queryset(self, queryset, request):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = list(queryset.query.order_by)
+        self.fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(queryset, position))
+        return queryset[: self.page_size + 1]
+
+    def _set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        # Taken now, before the caller turns the rows into output.
+        self.next_position = self._position(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            # Rows from .values(): borrow the model's own conversions for the cursor text.
+            row = self.model(**{field.attname: row[field.attname] for field in self.fields})
+        return [None if getattr(row, field.attname) is None else field.value_to_string(row) for field in self.fields]
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def encode_cursor(self, values):
+        payload = json.dumps({"o": self.ordering, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if payload["o"] != self.ordering or len(payload["v"]) != len(self.fields):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for field, value in zip(self.fields, payload["v"])
+            ]
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, queryset, position):
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+
+        # Rows after the cursor: for some k, the first k-1 keys are equal and key k is past it.
+        condition = Q(pk__in=[])
+        for k in reversed(range(len(self.ordering))):
+            condition = self._past(k, position[k], nulls_largest) | (self._equal(k, position[k]) & condition)
+
+        # A plain range on the leading key lets the database seek into its index.
+        first = self.fields[0]
+        if position[0] is not None and not first.null:
+            lookup = "lte" if self.ordering[0].startswith("-") else "gte"
+            condition &= Q(**{f"{first.name}__{lookup}": position[0]})
+        return condition
+
+    def _equal(self, k, value):
+        name = self.fields[k].name
+        if value is None:
+            return Q(**{f"{name}__isnull": True})
+        return Q(**{name: value})
+
+    def _past(self, k, value, nulls_largest):
+        field = self.fields[k]
+        descending = self.ordering[k].startswith("-")
+        nulls_first = descending == nulls_largest
+
+        if value is None:
+            return Q(**{f"{field.name}__isnull": False}) if nulls_first else Q(pk__in=[])
+
+        past = Q(**{f"{field.name}__{'lt' if descending else 'gt'}": value})
+        if field.null and not nulls_first:
+            past |= Q(**{f"{field.name}__isnull": True})
+        return past
+
+
+class TaskPagination(PageNumberPagination):
+    """Page numbers by default; keyset cursors with ``?pagination=cursor`` or a ``cursor`` param."""
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    mode_query_param = "pagination"
+
+    @classmethod
+    def wants_cursor(cls, request) -> bool:
+        return cls.cursor_requested(request.query_params)
+
+    @classmethod
+    def cursor_requested(cls, params) -> bool:
+        return params.get(cls.mode_query_param) == "cursor" or TaskCursorPagination.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.wants_cursor(request):
+            self.cursor_paginator = TaskCursorPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` on the async ORM: ``acount()`` for the total, then one page fetch."""
+        self.cursor_paginator = None
+        if self.wants_cursor(request):
+            self.cursor_paginator = TaskCursorPagination()
+            return await self.cursor_paginator.apaginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached property; filling it in keeps the sync COUNT(*) from running.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,104 @@
+"""Opt-in cProfile of sampled requests, saved as pstats files per view and action.
+
+With ``TASKS_PROFILE_DIR`` set, ``RequestProfilingMiddleware`` profiles one in
+``TASKS_PROFILE_EVERY`` requests, plus any request that carries an
+``X-Profile`` header and turns out to come from a staff user. The header is
+ignored on requests without an ``Authorization`` header, so anonymous clients
+cannot make the server profile their requests. Each profile is
+written to ``<TASKS_PROFILE_DIR>/<view>.<action>/`` and the ``profile_report``
+command merges them. Only the thread that calls the middleware is profiled.
+Under ASGI, when the middleware inside it is async-capable too, that is the
+event loop: a profile then covers the async views, may pick up other requests
+running on the loop meanwhile, and misses sync views run in worker threads.
+"""
+
+import cProfile
+import os
+import random
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .timing import view_action
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def endpoint_key(view: str | None, action: str | None) -> str:
+    """Directory name for an endpoint's profiles, e.g. ``TaskViewSet.list``."""
+    return _UNSAFE.sub("_", f"{view or 'unresolved'}.{action or 'none'}")
+
+
+def save_profile(profile: cProfile.Profile, key: str, directory: str) -> str:
+    target = os.path.join(directory, key)
+    os.makedirs(target, exist_ok=True)
+    path = os.path.join(target, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.prof")
+    profile.dump_stats(path)
+    return path
+
+
+class RequestProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "TASKS_PROFILE_DIR", ""):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def should_sample(self) -> bool:
+        every = getattr(settings, "TASKS_PROFILE_EVERY", 0)
+        return every > 0 and random.randrange(every) == 0
+
+    def start(self, request):
+        """``(profile, sampled, requested)`` for a request to profile, or ``None`` to pass it straight through."""
+        sampled = self.should_sample()
+        # The JWT user is only known once DRF has authenticated, so a requested profile is kept or dropped afterwards;
+        # without credentials it can only be dropped, so it is not started.
+        requested = "X-Profile" in request.headers and "Authorization" in request.headers
+        if not (sampled or requested):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already running on this thread.
+            return None
+        return profile, sampled, requested
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = self.start(request)
+        if started is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            started[0].disable()
+        return self.finish(request, response, *started)
+
+    async def __acall__(self, request):
+        started = self.start(request)
+        if started is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            started[0].disable()
+        return self.finish(request, response, *started)
+
+    def finish(self, request, response, profile, sampled, requested):
+        user = getattr(request, "user", None)
+        if sampled or (user is not None and user.is_staff):
+            path = save_profile(profile, endpoint_key(*view_action(request)), settings.TASKS_PROFILE_DIR)
+            if requested and user is not None and user.is_staff:
+                response["X-Profile-Saved"] = os.path.relpath(path, settings.TASKS_PROFILE_DIR)
+        return response
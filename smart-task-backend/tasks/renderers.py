@@ -0,0 +1,60 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional: FastJSONRenderer falls back to the standard encoder
+    orjson = None
+
+
+class ExportRenderer(BaseRenderer):
+    """Lets ``?format=`` select an export format.
+
+    Export rows are streamed by the view, so this only ever renders error
+    bodies, which are written as a single JSON line.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data).encode() + b"\n"
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` backed by orjson when it is installed, with byte-identical output.
+
+    Indented (browsable or ``; indent=``) responses, and data orjson cannot
+    encode the same way, go through the standard encoder.
+    """
+
+    # Dates and times go through DRF's encoder, whose format differs from orjson's.
+    orjson_options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._default, option=self.orjson_options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, which keeps the output valid JavaScript.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+    def _default(self, value):
+        # Decimals, lazy strings and the like: whatever DRF's encoder would write.
+        return self.encoder_class().default(value)
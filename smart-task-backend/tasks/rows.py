@@ -0,0 +1,91 @@
+from itertools import islice
+
+from django.utils import timezone
+
+from .serializers import TaskSerializer
+from .tags import atag_names, tag_names
+from .timing import timed
+
+# Tags are many per task, so they are read separately; they come last in the serializer's output too.
+TASK_FIELDS = tuple(field for field in TaskSerializer.Meta.fields if field != "tags")
+
+
+def _converters():
+    """Per-field functions giving the same values ``TaskSerializer`` puts in its output."""
+    tz = timezone.get_current_timezone()
+
+    def to_datetime(value):
+        # DRF's DateTimeField: local time, ISO 8601, "Z" for UTC.
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    def to_date(value):
+        return value.isoformat() if value is not None else None
+
+    # Choice fields and the plain text, integer and boolean fields need no conversion.
+    return {
+        "due_date": to_date,
+        "created_at": to_datetime,
+        "updated_at": to_datetime,
+    }
+
+
+def task_values(queryset):
+    """The queryset as ``TaskSerializer`` field dicts, less tags, without model instances."""
+    return queryset.prefetch_related(None).values(*TASK_FIELDS)
+
+
+def _represent(rows, names):
+    converters = list(_converters().items())
+    with timed("serialize"):
+        for row in rows:
+            for name, convert in converters:
+                row[name] = convert(row[name])
+            row["tags"] = names.get(row["id"], [])
+    return rows
+
+
+def represent_tasks(rows):
+    """Turn rows from ``task_values`` into ``TaskSerializer(..., many=True).data``, in place; one query for the tags."""
+    rows = list(rows)
+    return _represent(rows, tag_names([row["id"] for row in rows]))
+
+
+async def arepresent_tasks(rows):
+    rows = list(rows)
+    return _represent(rows, await atag_names([row["id"] for row in rows]))
+
+
+def _export_rows(chunk, names, converters):
+    for row in chunk:
+        row = list(row)
+        for i, convert in converters:
+            row[i] = convert(row[i])
+        yield {**dict(zip(TASK_FIELDS, row)), "tags": names.get(row[0], [])}
+
+
+def iter_task_rows(queryset, chunk_size=2000):
+    """Like ``represent_tasks``, streamed in chunks for exports of any size."""
+    converters = [(TASK_FIELDS.index(name), convert) for name, convert in _converters().items()]
+    rows = queryset.prefetch_related(None).values_list(*TASK_FIELDS).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield from _export_rows(chunk, tag_names([row[0] for row in chunk]), converters)
+
+
+async def aiter_task_rows(queryset, chunk_size=2000):
+    converters = [(TASK_FIELDS.index(name), convert) for name, convert in _converters().items()]
+    chunk = []
+    # values(), not values_list(): Django's aiterator() over values_list() runs its query on the event loop.
+    async for row in queryset.prefetch_related(None).values(*TASK_FIELDS).aiterator(chunk_size=chunk_size):
+        chunk.append(tuple(row.values()))
+        if len(chunk) == chunk_size:
+            for item in _export_rows(chunk, await atag_names([row[0] for row in chunk]), converters):
+                yield item
+            chunk = []
+    if chunk:
+        for item in _export_rows(chunk, await atag_names([row[0] for row in chunk]), converters):
+            yield item
@@ -0,0 +1,118 @@
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .metrics import REMINDERS
+from .models import Task, TaskChange
+from .notifications import high_priority_due_tomorrow_email
+from .outbox import enqueue_emails
+from .stats import ACTIVE_STATUSES
+
+
+class ReminderScheduler:
+    """Keeps a heap of upcoming "due tomorrow" reminder times for high priority tasks.
+
+    Only tasks due within ``window_days`` are held in memory. Task writes are
+    picked up from the ``TaskChange`` log, so the work per tick depends on how
+    many tasks changed or came due, not on how many tasks exist.
+    """
+
+    def __init__(self, window_days: int = 2, remind_at: time = time(9, 0)):
+        self.window_days = window_days
+        self.remind_at = remind_at
+        self.heap = []
+        # The current fire time per task; heap entries that no longer match are stale.
+        self.scheduled = {}
+        self.last_change_id = 0
+        self.window_end = None
+
+    def fire_time(self, due_date) -> datetime:
+        return timezone.make_aware(datetime.combine(due_date - timedelta(days=1), self.remind_at))
+
+    def _candidates(self):
+        return Task.objects.filter(
+            priority=Task.Priority.HIGH,
+            status__in=ACTIVE_STATUSES,
+            due_date__isnull=False,
+        )
+
+    def _schedule(self, task_id, due_date):
+        fire_at = self.fire_time(due_date)
+        if self.scheduled.get(task_id) == fire_at:
+            return
+        self.scheduled[task_id] = fire_at
+        heapq.heappush(self.heap, (fire_at, task_id))
+
+    def _load(self, start, end):
+        # Tasks due in (start, end].
+        rows = self._candidates().filter(due_date__gt=start, due_date__lte=end).values_list("id", "due_date")
+        for task_id, due_date in rows.iterator(chunk_size=2000):
+            self._schedule(task_id, due_date)
+
+    def resync(self, now):
+        """Reload the whole window from the tasks table, discarding the in-memory state."""
+        # Read the log position first so no change made during the reload is skipped.
+        self.last_change_id = TaskChange.objects.aggregate(last=Max("id"))["last"] or 0
+        self.heap = []
+        self.scheduled = {}
+        today = timezone.localdate(now)
+        self.window_end = today + timedelta(days=self.window_days)
+        self._load(today, self.window_end)
+
+    def advance_window(self, now):
+        window_end = timezone.localdate(now) + timedelta(days=self.window_days)
+        if window_end > self.window_end:
+            self._load(self.window_end, window_end)
+            self.window_end = window_end
+
+    def poll_changes(self, now, limit: int = 1000) -> int:
+        changes = list(
+            TaskChange.objects.filter(id__gt=self.last_change_id).order_by("id").values_list("id", "task_id")[:limit]
+        )
+        if not changes:
+            return 0
+        self.last_change_id = changes[-1][0]
+
+        task_ids = {task_id for _, task_id in changes}
+        today = timezone.localdate(now)
+        current = dict(
+            self._candidates()
+            .filter(id__in=task_ids, due_date__gt=today, due_date__lte=self.window_end)
+            .values_list("id", "due_date")
+        )
+        for task_id in task_ids:
+            if task_id in current:
+                self._schedule(task_id, current[task_id])
+            else:
+                self.scheduled.pop(task_id, None)
+        return len(changes)
+
+    def fire_due(self, now) -> int:
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            fire_at, task_id = heapq.heappop(self.heap)
+            if self.scheduled.get(task_id) != fire_at:
+                continue
+            del self.scheduled[task_id]
+            due_ids.append(task_id)
+        if not due_ids:
+            return 0
+
+        today = timezone.localdate(now)
+        emails = (
+            high_priority_due_tomorrow_email(task, today)
+            for task in Task.objects.select_related("user").filter(id__in=due_ids)
+        )
+        queued = enqueue_emails(email for email in emails if email is not None)
+        REMINDERS.labels("scheduler", "queued").inc(queued)
+        return queued
+
+    def seconds_until_next(self, now, poll_interval: float) -> float:
+        # Skip past stale entries so an old fire time does not wake us up early.
+        while self.heap and self.scheduled.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return poll_interval
+        return max(0.0, min(poll_interval, (self.heap[0][0] - now).total_seconds()))
@@ -0,0 +1,114 @@
+"""Full-text search over task titles and descriptions.
+
+PostgreSQL keeps a generated ``search_vector`` tsvector column on
+``tasks_task`` with a GIN index. SQLite keeps an FTS5 table,
+``tasks_task_fts``, that indexes the task rows and is updated by triggers, so
+``bulk_create``, ``bulk_update`` and ``QuerySet.update`` stay in sync as well.
+Neither is a model field; migration 0010 installs the DDL from its own copy,
+and the triggers here are only used to restore lost ones. Other databases
+fall back to ``icontains``.
+
+Every word of the query must match, as a prefix, so results narrow as the
+user types. Titles weigh more than descriptions in the rank.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+
+FTS_TABLE = "tasks_task_fts"
+MAX_TERMS = 16
+
+_WORD = re.compile(r"\w+")
+
+# Dropped with the table whenever SQLite's schema editor rebuilds tasks_task, so post_migrate puts them back.
+_SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {Task._meta.db_table} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    """,
+    f"{FTS_TABLE}_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {Task._meta.db_table} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    f"{FTS_TABLE}_update": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+        AFTER UPDATE OF title, description ON {Task._meta.db_table} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+_SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def repair_search_triggers(using: str = "default") -> bool:
+    """Recreate SQLite triggers lost to a table rebuild and reindex; True if any were missing."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE (type = 'table' AND name = %s) OR type = 'trigger'", [FTS_TABLE]
+        )
+        names = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in names or names.issuperset(_SQLITE_TRIGGERS):
+            return False
+        for name, sql in _SQLITE_TRIGGERS.items():
+            if name not in names:
+                cursor.execute(sql)
+        cursor.execute(_SQLITE_REBUILD)
+    return True
+
+
+def search_terms(query: str) -> list[str]:
+    return _WORD.findall(query)[:MAX_TERMS]
+
+
+def _word_hits(terms):
+    # Ten for each query word in the title, one for each in the description. bm25() would need the
+    # FTS5 cursor, i.e. a join the SQLite planner sometimes runs the wrong way round (seconds, not ms).
+    score = Value(0.0)
+    for term in terms:
+        score = score + Case(When(title__icontains=term, then=Value(10.0)), default=Value(0.0))
+        score = score + Case(When(description__icontains=term, then=Value(1.0)), default=Value(0.0))
+    return score
+
+
+def search_tasks(qs, query: str, rank: bool = False):
+    """Tasks in ``qs`` matching every word of ``query``; with ``rank``, annotated with ``search_rank`` (higher is better)."""
+    terms = search_terms(query)
+    if not terms:
+        qs = qs.none()
+        return qs.annotate(search_rank=Value(0.0, output_field=FloatField())) if rank else qs
+
+    vendor = connections[qs.db].vendor
+    table = Task._meta.db_table
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        qs = qs.filter(
+            RawSQL(f"{table}.search_vector @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField())
+        )
+        if rank:
+            qs = qs.annotate(
+                search_rank=RawSQL(
+                    f"ts_rank({table}.search_vector, to_tsquery('english', %s))", [tsquery], output_field=FloatField()
+                )
+            )
+        return qs
+
+    if vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        qs = qs.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+    else:
+        for term in terms:
+            qs = qs.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return qs.annotate(search_rank=_word_hits(terms)) if rank else qs
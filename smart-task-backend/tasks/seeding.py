@@ -0,0 +1,95 @@
+import random
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .categories import assign_categories
+from .models import Task, TaskChange
+from .stats import rebuild_task_stats
+
+# Rough shape of a real task list: most work is open, a third is done, few tasks are urgent.
+STATUS_WEIGHTS = {Task.Status.PENDING: 45, Task.Status.IN_PROGRESS: 20, Task.Status.COMPLETED: 35}
+PRIORITY_WEIGHTS = {Task.Priority.HIGH: 20, Task.Priority.MEDIUM: 50, Task.Priority.LOW: 30}
+CATEGORY_WEIGHTS = {
+    "Work": 35,
+    "Personal": 25,
+    "Shopping": 10,
+    "Health": 10,
+    "Finance": 8,
+    "Learning": 7,
+    "": 5,
+}
+UNDATED_SHARE = 0.2
+IMPORTANT_SHARE = 0.15
+TITLE_VERBS = ("Review", "Write", "Plan", "Call", "Buy", "Fix", "Prepare", "Send", "Book", "Read")
+TITLE_NOUNS = ("report", "budget", "slides", "groceries", "invoice", "dentist", "notes", "release", "trip", "course")
+
+
+def _pick(rng: random.Random, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def random_task(rng: random.Random, user, today: date) -> Task:
+    status = _pick(rng, STATUS_WEIGHTS)
+    due_date = None
+    if rng.random() >= UNDATED_SHARE:
+        # Clustered around the next few days; finished work leans towards the past.
+        mode = -5 if status == Task.Status.COMPLETED else 3
+        due_date = today + timedelta(days=round(rng.triangular(-30, 60, mode)))
+    title = f"{rng.choice(TITLE_VERBS)} {rng.choice(TITLE_NOUNS)}"
+    return Task(
+        user=user,
+        title=title,
+        description=f"{title} #{rng.randrange(10_000)}" if rng.random() < 0.6 else "",
+        due_date=due_date,
+        priority=_pick(rng, PRIORITY_WEIGHTS),
+        status=status,
+        is_important=rng.random() < IMPORTANT_SHARE,
+        category=_pick(rng, CATEGORY_WEIGHTS),
+    )
+
+
+def seed_tasks(
+    users: int,
+    tasks_per_user: int,
+    prefix: str | None = None,
+    password: str = "seed-pass-123",
+    seed: int | None = None,
+    batch_size: int = 1000,
+) -> list:
+    """Create ``users`` users with ``tasks_per_user`` random tasks each and return the users.
+
+    Rows go in with ``bulk_create``. The users are new, so their rollups are
+    counted once by ``rebuild_task_stats`` instead of task by task.
+    """
+    User = get_user_model()
+    rng = random.Random(seed)
+    prefix = prefix or f"seed-{uuid.uuid4().hex[:8]}"
+    # Hashing is deliberately slow; every seeded user shares one hash.
+    password_hash = make_password(password)
+    today = date.today()
+
+    created = User.objects.bulk_create(
+        [User(username=f"{prefix}-{i}", email=f"{prefix}-{i}@example.com", password=password_hash) for i in range(users)],
+        batch_size=batch_size,
+    )
+    if not all(user.pk for user in created):
+        # Backends that cannot return ids from bulk inserts.
+        created = list(User.objects.filter(username__startswith=f"{prefix}-").order_by("pk"))
+
+    per_batch = max(1, batch_size // max(1, tasks_per_user))
+    for start in range(0, len(created), per_batch):
+        chunk = created[start : start + per_batch]
+        tasks = [random_task(rng, user, today) for user in chunk for _ in range(tasks_per_user)]
+        with transaction.atomic():
+            assign_categories(tasks)
+            tasks = Task.objects.bulk_create(tasks, batch_size=batch_size)
+            TaskChange.objects.bulk_create(
+                [TaskChange(user_id=task.user_id, task_id=task.pk, op=TaskChange.Op.UPSERT) for task in tasks if task.pk],
+                batch_size=batch_size,
+            )
+            rebuild_task_stats([user.pk for user in chunk])
+    return created
@@ -1,15 +1,22 @@
 from datetime import date
 
+from django.core.validators import RegexValidator
+from django.db import transaction
 from rest_framework import serializers
 
+from .categories import assign_categories
+from .changes import record_task_changes
 from .models import Task
+from .stats import task_state
+from .tags import MAX_TAGS_PER_TASK, set_tags
+from .timing import timed
 
 
-def suggest_priority(due_date: date | None) -> str:
+def suggest_priority(due_date: date | None, today: date | None = None) -> str:
     if due_date is None:
         return Task.Priority.MEDIUM
 
-    delta_days = (due_date - date.today()).days
+    delta_days = (due_date - (today or date.today())).days
 
     if delta_days <= 1:
         return Task.Priority.HIGH
@@ -18,9 +25,31 @@ def suggest_priority(due_date: date | None) -> str:
     return Task.Priority.LOW
 
 
+class TaskListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed("serialize"):
+            return super().data
+
+
+class TagNamesField(serializers.ListField):
+    """Tag names in, tag names out; reads ``Task.tags``, so querysets should use ``tags_prefetch``."""
+
+    # ?tags= is comma separated.
+    child = serializers.CharField(
+        max_length=50, allow_blank=True, validators=[RegexValidator(r"^[^,]*$", "Tags cannot contain commas.")]
+    )
+
+    def to_representation(self, data):
+        return sorted(tag.name for tag in data.all())
+
+
 class TaskSerializer(serializers.ModelSerializer):
+    tags = TagNamesField(required=False, max_length=MAX_TAGS_PER_TASK)
+
     class Meta:
         model = Task
+        list_serializer_class = TaskListSerializer
         fields = [
             "id",
             "title",
@@ -32,9 +61,15 @@ class TaskSerializer(serializers.ModelSerializer):
             "category",
             "created_at",
             "updated_at",
+            "tags",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
 
+    @property
+    def data(self):
+        with timed("serialize"):
+            return super().data
+
     def validate_title(self, value: str) -> str:
         value = (value or "").strip()
         if not value:
@@ -49,9 +84,30 @@ class TaskSerializer(serializers.ModelSerializer):
         if not validated_data.get("priority"):
             validated_data["priority"] = suggest_priority(validated_data.get("due_date"))
 
-        return Task.objects.create(user=request.user, **validated_data)
+        tags = validated_data.pop("tags", None)
+        task = Task(user=request.user, **validated_data)
+        with transaction.atomic():
+            assign_categories([task])
+            task.save(force_insert=True)
+            if tags:
+                set_tags([(task, tags)])
+            record_task_changes([(None, task_state(task))])
+        return task
 
     def update(self, instance, validated_data):
         if "priority" not in validated_data and "due_date" in validated_data:
             validated_data["priority"] = suggest_priority(validated_data.get("due_date"))
-        return super().update(instance, validated_data)
+
+        tags = validated_data.pop("tags", None)
+        before = task_state(instance)
+        with transaction.atomic():
+            if "category" in validated_data:
+                instance.category = validated_data["category"]
+                assign_categories([instance])
+                validated_data["category"] = instance.category
+                validated_data["category_ref"] = instance.category_ref
+            task = super().update(instance, validated_data)
+            if tags is not None:
+                set_tags([(task, tags)])
+            record_task_changes([(before, task_state(task))])
+        return task
@@ -0,0 +1,266 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .cache import forget_responses
+from .models import Task, TaskDueBucket, UserTaskStats
+
+ACTIVE_STATUSES = (Task.Status.PENDING, Task.Status.IN_PROGRESS)
+
+COUNTER_FIELDS = (
+    "total",
+    "pending",
+    "in_progress",
+    "completed",
+    "high",
+    "medium",
+    "low",
+    "important",
+    "high_active",
+    "dated_active",
+)
+
+
+class TaskState(NamedTuple):
+    """The parts of a task that the rollups and change hooks depend on."""
+
+    task_id: int
+    user_id: int
+    status: str
+    priority: str
+    is_important: bool
+    due_date: date | None
+
+
+def task_state(task: Task) -> TaskState:
+    return TaskState(task.pk, task.user_id, task.status, task.priority, task.is_important, task.due_date)
+
+
+def _contribution(state: TaskState) -> dict:
+    # Counter fields for status and priority are named after the choice values.
+    counters = {"total": 1, str(state.status): 1, str(state.priority): 1}
+    if state.is_important:
+        counters["important"] = 1
+    if state.status in ACTIVE_STATUSES:
+        if state.priority == Task.Priority.HIGH:
+            counters["high_active"] = 1
+        if state.due_date is not None:
+            counters["dated_active"] = 1
+    return counters
+
+
+def apply_task_changes(changes: Iterable[tuple[TaskState | None, TaskState | None]]) -> None:
+    """Apply (before, after) task states to the rollups; ``None`` means created or deleted.
+
+    Must run in the same transaction as the task writes it describes.
+    """
+    stat_deltas = defaultdict(lambda: defaultdict(int))
+    bucket_deltas = defaultdict(int)
+
+    for before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            for field, n in _contribution(state).items():
+                stat_deltas[state.user_id][field] += sign * n
+            if state.status in ACTIVE_STATUSES and state.due_date is not None:
+                bucket_deltas[(state.user_id, state.due_date)] += sign
+
+    with transaction.atomic():
+        bucket_users = {user_id for (user_id, _), n in bucket_deltas.items() if n}
+        if bucket_users:
+            # Serializes bucket writes per user, so two first tasks on one date cannot both insert its bucket;
+            # user_id order keeps concurrent multi-user writes from deadlocking.
+            locked = UserTaskStats.objects.select_for_update().filter(user_id__in={*stat_deltas, *bucket_users})
+            list(locked.order_by("user_id").values_list("pk"))
+
+        rebuilt = set()
+        for user_id, deltas in stat_deltas.items():
+            updates = {field: F(field) + n for field, n in deltas.items() if n}
+            if not updates:
+                continue
+            if UserTaskStats.objects.filter(user_id=user_id).update(**updates):
+                continue
+            if create_task_stats(user_id):
+                # Counted from the tasks table, which already holds this change.
+                rebuilt.add(user_id)
+            else:
+                # A concurrent first read created the row from committed tasks, without this change.
+                UserTaskStats.objects.filter(user_id=user_id).update(**updates)
+
+        bucket_deltas = {key: n for key, n in bucket_deltas.items() if n and key[0] not in rebuilt}
+        if not bucket_deltas:
+            return
+
+        # One read, one UPDATE and one INSERT however many dates changed, so bulk writes stay cheap.
+        touched = {user_id for user_id, _ in bucket_deltas}
+        existing = TaskDueBucket.objects.filter(
+            user_id__in=touched, due_date__in={due_date for _, due_date in bucket_deltas}
+        ).only("id", "user_id", "due_date")
+        to_update = []
+        for bucket in existing:
+            n = bucket_deltas.pop((bucket.user_id, bucket.due_date), None)
+            if n is not None:
+                bucket.count = F("count") + n
+                to_update.append(bucket)
+        if to_update:
+            TaskDueBucket.objects.bulk_update(to_update, ["count"])
+        TaskDueBucket.objects.bulk_create(
+            [
+                TaskDueBucket(user_id=user_id, due_date=due_date, count=n)
+                for (user_id, due_date), n in bucket_deltas.items()
+                if n > 0
+            ]
+        )
+
+        TaskDueBucket.objects.filter(user_id__in=touched, count__lte=0).delete()
+
+
+def _count_rollups(user_ids: list[int]) -> tuple[dict, dict]:
+    """Stats counters and due-date bucket counts for ``user_ids``, counted from the tasks table."""
+    active = Q(status__in=ACTIVE_STATUSES)
+    rows = (
+        Task.objects.filter(user_id__in=user_ids)
+        .order_by()
+        .values("user_id")
+        .annotate(
+            total=Count("id"),
+            pending=Count("id", filter=Q(status=Task.Status.PENDING)),
+            in_progress=Count("id", filter=Q(status=Task.Status.IN_PROGRESS)),
+            completed=Count("id", filter=Q(status=Task.Status.COMPLETED)),
+            high=Count("id", filter=Q(priority=Task.Priority.HIGH)),
+            medium=Count("id", filter=Q(priority=Task.Priority.MEDIUM)),
+            low=Count("id", filter=Q(priority=Task.Priority.LOW)),
+            important=Count("id", filter=Q(is_important=True)),
+            high_active=Count("id", filter=active & Q(priority=Task.Priority.HIGH)),
+            dated_active=Count("id", filter=active & Q(due_date__isnull=False)),
+        )
+    )
+    expected_stats = {user_id: {field: 0 for field in COUNTER_FIELDS} for user_id in user_ids}
+    for row in rows:
+        expected_stats[row.pop("user_id")] = row
+
+    expected_buckets = defaultdict(dict)
+    bucket_rows = (
+        Task.objects.filter(user_id__in=user_ids, status__in=ACTIVE_STATUSES, due_date__isnull=False)
+        .order_by()
+        .values_list("user_id", "due_date")
+        .annotate(count=Count("id"))
+    )
+    for user_id, due_date, count in bucket_rows:
+        expected_buckets[user_id][due_date] = count
+    return expected_stats, expected_buckets
+
+
+def create_task_stats(user_id: int) -> bool:
+    """Create the missing rollups for ``user_id``; ``False`` if a concurrent request created them first.
+
+    Never deletes, so racing first reads cannot collide on the stats primary key:
+    the loser's insert fails inside a savepoint and it reads the winner's rows.
+    """
+    expected_stats, expected_buckets = _count_rollups([user_id])
+    try:
+        with transaction.atomic():
+            UserTaskStats.objects.create(user_id=user_id, **expected_stats[user_id])
+            TaskDueBucket.objects.bulk_create(
+                [
+                    TaskDueBucket(user_id=user_id, due_date=due_date, count=count)
+                    for due_date, count in expected_buckets.get(user_id, {}).items()
+                ]
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def rebuild_task_stats(user_ids: Iterable[int]) -> int:
+    """Recount the rollups for ``user_ids`` from the tasks table.
+
+    Returns how many of those users had stats or buckets that did not match.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+
+    expected_stats, expected_buckets = _count_rollups(user_ids)
+    with transaction.atomic():
+        current_stats = {
+            row.pop("user_id"): row
+            for row in UserTaskStats.objects.filter(user_id__in=user_ids).values("user_id", *COUNTER_FIELDS)
+        }
+        current_buckets = defaultdict(dict)
+        for user_id, due_date, count in TaskDueBucket.objects.filter(user_id__in=user_ids).values_list(
+            "user_id", "due_date", "count"
+        ):
+            current_buckets[user_id][due_date] = count
+
+        drifted = [
+            user_id
+            for user_id in user_ids
+            if current_stats.get(user_id) != expected_stats[user_id]
+            or current_buckets.get(user_id, {}) != expected_buckets.get(user_id, {})
+        ]
+        if not drifted:
+            return 0
+
+        UserTaskStats.objects.filter(user_id__in=drifted).delete()
+        TaskDueBucket.objects.filter(user_id__in=drifted).delete()
+        UserTaskStats.objects.bulk_create(
+            [UserTaskStats(user_id=user_id, **expected_stats[user_id]) for user_id in drifted]
+        )
+        TaskDueBucket.objects.bulk_create(
+            [
+                TaskDueBucket(user_id=user_id, due_date=due_date, count=count)
+                for user_id in drifted
+                for due_date, count in expected_buckets.get(user_id, {}).items()
+            ]
+        )
+        # Answers cached from the drifted rollups are wrong too; a first build has none.
+        forget_responses(user_id for user_id in drifted if user_id in current_stats)
+
+    return len(drifted)
+
+
+def _stats_row(user_id: int):
+    return UserTaskStats.objects.filter(user_id=user_id).values(*COUNTER_FIELDS)
+
+
+def _due_buckets(user_id: int, today: date):
+    """Bucket queryset and aggregates for the overdue / due tomorrow / due this week counts."""
+    tomorrow = today + timedelta(days=1)
+    next_7 = today + timedelta(days=7)
+    buckets = TaskDueBucket.objects.filter(user_id=user_id, due_date__lte=next_7)
+    return buckets, {
+        "overdue": Sum("count", filter=Q(due_date__lt=today), default=0),
+        "due_tomorrow": Sum("count", filter=Q(due_date=tomorrow), default=0),
+        "due_soon": Sum("count", filter=Q(due_date__gte=today), default=0),
+    }
+
+
+def get_task_counts(user_id: int) -> dict:
+    """Dashboard counts for one user, read from the rollups instead of the tasks table."""
+    stats = _stats_row(user_id).first()
+    if stats is None:
+        # Only users created since the 0005 backfill get here; first reads may race, so insert-if-missing.
+        create_task_stats(user_id)
+        stats = _stats_row(user_id).get()
+
+    buckets, sums = _due_buckets(user_id, date.today())
+    return {**stats, **buckets.aggregate(**sums)}
+
+
+async def aget_task_counts(user_id: int) -> dict:
+    """Async ``get_task_counts``; the stats row and the bucket sums are fetched concurrently."""
+    buckets, sums = _due_buckets(user_id, date.today())
+    stats, by_date = await asyncio.gather(_stats_row(user_id).afirst(), buckets.aaggregate(**sums))
+    if stats is None:
+        await sync_to_async(create_task_stats)(user_id)
+        stats = await _stats_row(user_id).aget()
+        # The bucket sums were read before the buckets existed.
+        by_date = await buckets.aaggregate(**sums)
+    return {**stats, **by_date}
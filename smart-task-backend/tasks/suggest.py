@@ -0,0 +1,229 @@
+"""In-process typeahead over a user's task titles and categories.
+
+Each process keeps a ``SuggestionIndex`` per recently active user, built once
+from the tasks table and then brought up to date from the ``TaskChange`` log
+on every lookup, so a request costs one indexed query on the log plus a binary
+search, however many tasks the user has. An index covers at most
+``TASKS_SUGGEST_MAX_TASKS`` of the user's newest tasks, which bounds both its
+memory and the request that builds it.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import timedelta
+from heapq import nsmallest
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task, TaskChange
+
+# Past this many matching entries the rest are not ranked; only very short prefixes get there.
+MAX_SCAN = 5000
+# More pending log rows than this and the index is rebuilt instead.
+MAX_CHANGES = 2000
+
+_END = "\U0010ffff"
+
+
+def _key(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class SuggestionIndex:
+    """Distinct titles and categories of one user's tasks, with how many tasks use each.
+
+    Titles are found by the start of any of their words, categories by their
+    start. Both ignore case and repeated whitespace.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def load(self) -> None:
+        # Read the log position first so no write made during the load is skipped. Every row read here is
+        # covered by the load; rows that are still unsettled may yet be joined by lower ids, so keep them apart.
+        recent = list(
+            TaskChange.objects.filter(user_id=self.user_id).order_by("-id").values_list("id", "created_at")[:MAX_CHANGES]
+        )
+        recent.reverse()
+        self.settled_id = _settled_id(recent, recent[0][0] - 1 if recent else 0)
+        self.seen = {change_id for change_id, _ in recent if change_id > self.settled_id}
+        self.tasks = {}
+        self.titles = {}
+        self.categories = {}
+        # Sorted for prefix range scans: title keys, and (word, offset in title key, title key) for later words.
+        self.starts = []
+        self.words = []
+        newest = Task.objects.filter(user_id=self.user_id).order_by("-id").values_list("id", "title", "category")
+        # Added in id order, so the oldest spelling of a title is the one shown.
+        for task_id, title, category in reversed(list(newest[: _max_tasks()])):
+            self._add(task_id, title, category, sort=False)
+        self.starts.sort()
+        self.words.sort()
+        self.loaded = True
+
+    def refresh(self) -> None:
+        """Apply log rows written since the last refresh, re-reading rows too recent to be settled."""
+        rows = list(
+            TaskChange.objects.filter(user_id=self.user_id, id__gt=self.settled_id)
+            .order_by("id")
+            .values_list("id", "task_id", "created_at")[: MAX_CHANGES + 1]
+        )
+        if len(rows) > MAX_CHANGES:
+            self.load()
+            return
+
+        changed = {task_id for change_id, task_id, _ in rows if change_id not in self.seen}
+        if changed:
+            tasks = Task.objects.filter(user_id=self.user_id, id__in=changed).values_list("id", "title", "category")
+            current = {task_id: (title, category) for task_id, title, category in tasks}
+            for task_id in changed:
+                self._remove(task_id)
+                if task_id in current:
+                    self._add(task_id, *current[task_id])
+            # New tasks push the oldest ones out, so the index stays within its cap.
+            for task_id in nsmallest(len(self.tasks) - _max_tasks(), self.tasks):
+                self._remove(task_id)
+
+        self.settled_id = _settled_id([(change_id, created_at) for change_id, _, created_at in rows], self.settled_id)
+        self.seen = {change_id for change_id, _, _ in rows if change_id > self.settled_id}
+
+    def _add(self, task_id, title, category, sort=True):
+        title_key = _key(title)
+        category_key = _key(category)
+        self.tasks[task_id] = (title_key, category_key)
+        if _bump(self.titles, title_key, " ".join(title.split()), 1) and title_key:
+            if sort:
+                insort(self.starts, title_key)
+            else:
+                self.starts.append(title_key)
+            for entry in _word_entries(title_key):
+                if sort:
+                    insort(self.words, entry)
+                else:
+                    self.words.append(entry)
+        if category_key:
+            _bump(self.categories, category_key, category.strip(), 1)
+
+    def _remove(self, task_id):
+        keys = self.tasks.pop(task_id, None)
+        if keys is None:
+            return
+        title_key, category_key = keys
+        if _bump(self.titles, title_key, None, -1) and title_key:
+            _discard(self.starts, title_key)
+            for entry in _word_entries(title_key):
+                _discard(self.words, entry)
+        if category_key:
+            _bump(self.categories, category_key, None, -1)
+
+    def suggest(self, query: str, limit: int) -> dict:
+        prefix = _key(query)
+        return {
+            "titles": self._titles(prefix, limit) if prefix else [],
+            "categories": _top(
+                (key for key in self.categories if key.startswith(prefix)), self.categories, prefix, limit
+            ),
+        }
+
+    def _titles(self, prefix, limit):
+        # Titles that start with the prefix rank first, so they are gathered on their own.
+        matches = set(_prefix_range(self.starts, prefix, prefix + _END))
+        if len(matches) < limit:
+            first = prefix.split(" ", 1)[0]
+            matches.update(
+                title_key
+                for _, offset, title_key in _prefix_range(self.words, (first,), (first + _END,))
+                if title_key.startswith(prefix, offset)
+            )
+        return _top(matches, self.titles, prefix, limit)
+
+
+def _settled_id(rows, settled_id):
+    """The last of the (id, created_at) ``rows`` old enough that no write can still commit below it."""
+    # Log ids are handed out before commit, so a write can appear with an id lower than one already read.
+    settled_before = timezone.now() - timedelta(seconds=getattr(settings, "TASKS_SYNC_SETTLE_SECONDS", 5))
+    for change_id, created_at in rows:
+        if created_at > settled_before:
+            break
+        settled_id = change_id
+    return settled_id
+
+
+def _prefix_range(entries, low, high):
+    start = bisect_left(entries, low)
+    end = bisect_left(entries, high, lo=start)
+    return entries[start : min(end, start + MAX_SCAN)]
+
+
+def _discard(entries, entry):
+    i = bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+def _word_entries(title_key):
+    # Every word but the first, with where it starts; the whole title is in ``starts``.
+    entries = set()
+    offset = title_key.find(" ") + 1
+    while offset:
+        end = title_key.find(" ", offset)
+        entries.add((title_key[offset : end if end >= 0 else None], offset, title_key))
+        offset = end + 1
+    return entries
+
+
+def _max_tasks() -> int:
+    return max(1, getattr(settings, "TASKS_SUGGEST_MAX_TASKS", 20000))
+
+
+def _bump(counts, key, display, delta) -> bool:
+    """Change ``key``'s count; True when the key appeared or disappeared."""
+    entry = counts.get(key)
+    if entry is None:
+        counts[key] = [delta, display]
+        return True
+    entry[0] += delta
+    if entry[0] <= 0:
+        del counts[key]
+        return True
+    return False
+
+
+def _top(keys, counts, prefix, limit):
+    # Whole-text prefix matches first, then the most used, then alphabetical.
+    best = nsmallest(limit, keys, key=lambda key: (not key.startswith(prefix), -counts[key][0], key))
+    return [counts[key][1] for key in best]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def suggestion_index(user_id: int) -> SuggestionIndex:
+    with _indexes_lock:
+        index = _indexes.pop(user_id, None) or SuggestionIndex(user_id)
+        _indexes[user_id] = index
+        while len(_indexes) > max(1, getattr(settings, "TASKS_SUGGEST_MAX_USERS", 500)):
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_suggestion_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def suggestions(user_id: int, query: str, limit: int) -> dict:
+    """Top ``limit`` title and category completions of ``query`` among the user's own tasks."""
+    index = suggestion_index(user_id)
+    with index.lock:
+        if index.loaded:
+            index.refresh()
+        else:
+            index.load()
+        return index.suggest(query, limit)
@@ -0,0 +1,87 @@
+"""Task tags: writing them, reading them for a page of tasks, and ``?tags=`` filtering.
+
+Tags are per-user ``Tag`` rows matched by case-folded key, like categories,
+joined to tasks through ``TaskTag``. Serialized model instances get them from
+``tags_prefetch``; the ``.values()`` read paths in ``tasks.rows`` read them
+with one query per page through ``tag_names``.
+"""
+
+from django.db.models import Exists, OuterRef, Prefetch
+
+from .categories import get_named, name_key
+from .models import Tag, TaskTag
+
+MAX_TAGS_PER_TASK = 20
+MAX_FILTER_TAGS = 20
+
+TAG_MATCH_ANY = "any"
+TAG_MATCH_ALL = "all"
+
+
+def tags_prefetch() -> Prefetch:
+    """``Task.tags`` with only what ``TaskSerializer`` shows."""
+    return Prefetch("tags", queryset=Tag.objects.only("id", "name"))
+
+
+def tag_names(task_ids) -> dict:
+    """Sorted tag names for each of ``task_ids`` that has any, from one query."""
+    names = {}
+    if task_ids:
+        # Sorted here rather than in SQL: a few names per task, and the same order on every database.
+        for task_id, name in TaskTag.objects.filter(task_id__in=task_ids).values_list("task_id", "tag__name"):
+            names.setdefault(task_id, []).append(name)
+        for task_names in names.values():
+            task_names.sort()
+    return names
+
+
+async def atag_names(task_ids) -> dict:
+    names = {}
+    if task_ids:
+        async for task_id, name in TaskTag.objects.filter(task_id__in=task_ids).values_list("task_id", "tag__name"):
+            names.setdefault(task_id, []).append(name)
+        for task_names in names.values():
+            task_names.sort()
+    return names
+
+
+def set_tags(assignments) -> None:
+    """Replace the tags of each saved task in ``assignments``, (task, names) pairs, creating missing Tag rows."""
+    assignments = list(assignments)
+    if not assignments:
+        return
+    wanted = {}
+    task_keys = []
+    for task, names in assignments:
+        keys = {}
+        for name in names:
+            name = " ".join(name.split())
+            if name:
+                keys.setdefault(name_key(name))
+                wanted.setdefault((task.user_id, name_key(name)), name)
+        task_keys.append((task, keys))
+    tags = get_named(Tag, wanted)
+
+    TaskTag.objects.filter(task_id__in=[task.pk for task, _ in task_keys]).delete()
+    TaskTag.objects.bulk_create(
+        [TaskTag(task_id=task.pk, tag=tags[(task.user_id, key)]) for task, keys in task_keys for key in keys],
+        batch_size=1000,
+    )
+
+
+def filter_by_tags(qs, names, match: str = TAG_MATCH_ANY, user=None):
+    """Tasks in ``qs`` with any (or, with ``match="all"``, every) one of the named tags; ``user`` limits the tags."""
+    keys = list(dict.fromkeys(name_key(name) for name in names if name.strip()))[:MAX_FILTER_TAGS]
+    if not keys:
+        return qs
+    tags = Tag.objects.all() if user is None else Tag.objects.filter(user=user)
+
+    def tagged(keys):
+        # A probe of the (task, tag) key per task, so the list keeps walking its ordering index up to the page end.
+        return Exists(TaskTag.objects.filter(task=OuterRef("pk"), tag__in=tags.filter(key__in=keys).values("pk")))
+
+    if match == TAG_MATCH_ALL:
+        for key in keys:
+            qs = qs.filter(tagged([key]))
+        return qs
+    return qs.filter(tagged(keys))
@@ -1,3 +1,1891 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
 
-# Create your tests here.
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import AUTH_CACHE
+from accounts.serializers import CustomTokenObtainPairSerializer
+
+from .cache import CACHE_STATS, cached_response, response_cache
+from .categories import assign_categories
+from .models import (
+    Category,
+    OutboxEmail,
+    ReminderCheckpoint,
+    ReminderDelivery,
+    Task,
+    TaskChange,
+    TaskDueBucket,
+    Tag,
+    UserTaskStats,
+)
+from .notifications import queue_task_completed_email
+from .outbox import deliver_outbox
+from .profiling import RequestProfilingMiddleware
+from .renderers import FastJSONRenderer
+from .rows import represent_tasks, task_values
+from .scheduler import ReminderScheduler
+from .search import FTS_TABLE, repair_search_triggers
+from .serializers import TaskSerializer
+from .stats import create_task_stats, get_task_counts, rebuild_task_stats
+from .suggest import clear_suggestion_indexes, suggestion_index
+from .tags import set_tags, tags_prefetch
+from .timing import normalize_sql
+
+
+class QueryPlanRecorder:
+    """Collects (sql, params) for every query that touches the task table."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if "tasks_task" in sql and not many:
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+class TaskQueryPlanTests(TestCase):
+    """Every per-user TaskViewSet read must be served by an index, in index order."""
+
+    SQLITE_FULL_SCAN = re.compile(r"\bSCAN tasks_task\b")
+    SQLITE_FILESORT = re.compile(r"USE TEMP B-TREE")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="planner", password="secret-pass-123")
+        other = User.objects.create_user(username="other", password="secret-pass-123")
+
+        today = date.today()
+        statuses = [Task.Status.PENDING, Task.Status.IN_PROGRESS, Task.Status.COMPLETED]
+        priorities = [Task.Priority.HIGH, Task.Priority.MEDIUM, Task.Priority.LOW]
+        tasks = []
+        for owner in (cls.user, other):
+            for i in range(300):
+                tasks.append(
+                    Task(
+                        user=owner,
+                        title=f"Task {i}",
+                        status=statuses[i % 3],
+                        priority=priorities[i % 3],
+                        is_important=i % 5 == 0,
+                        category=f"cat-{i % 4}",
+                        due_date=None if i % 7 == 0 else today + timedelta(days=(i % 30) - 10),
+                    )
+                )
+        assign_categories(tasks)
+        Task.objects.bulk_create(tasks)
+        set_tags((task, [f"tag-{task.pk % 5}", f"tag-{task.pk % 7}"]) for task in tasks)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        # Cached dashboard responses outlive the test transaction; user ids are reused.
+        response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _explain(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                return [row[-1] for row in cursor.fetchall()]
+            if connection.vendor == "postgresql":
+                # Disabled plan nodes are still chosen when nothing else can answer the query,
+                # so a Seq Scan or Sort in the output means no index covers this shape.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+                cursor.execute(f"EXPLAIN {sql}", params)
+                return [row[0] for row in cursor.fetchall()]
+        self.skipTest(f"No query plan checks for {connection.vendor}.")
+
+    def _assert_indexed(self, url):
+        recorder = QueryPlanRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(recorder.queries, f"{url} ran no task queries")
+
+        for sql, params in recorder.queries:
+            plan = "\n".join(self._explain(sql, params))
+            if connection.vendor == "sqlite":
+                self.assertNotRegex(plan, self.SQLITE_FULL_SCAN, f"{url}: full scan\n{sql}")
+                self.assertNotRegex(plan, self.SQLITE_FILESORT, f"{url}: filesort\n{sql}")
+            else:
+                self.assertNotIn("Seq Scan", plan, f"{url}: full scan\n{sql}")
+                self.assertNotRegex(plan, r"(?m)^\s*(->\s*)?Sort\b", f"{url}: filesort\n{sql}")
+
+    def test_list_default_ordering(self):
+        self._assert_indexed("/api/tasks/")
+
+    def test_list_ordering_by_due_date(self):
+        self._assert_indexed("/api/tasks/?ordering=due_date")
+        self._assert_indexed("/api/tasks/?ordering=-due_date")
+
+    def test_list_ordering_by_created_at(self):
+        self._assert_indexed("/api/tasks/?ordering=created_at")
+        self._assert_indexed("/api/tasks/?ordering=-created_at")
+
+    def test_list_filtered(self):
+        self._assert_indexed("/api/tasks/?status=pending")
+        self._assert_indexed("/api/tasks/?priority=high")
+        self._assert_indexed("/api/tasks/?important=true")
+        self._assert_indexed("/api/tasks/?category=CAT-1")
+        self._assert_indexed("/api/tasks/?tags=tag-1,tag-2")
+        self._assert_indexed("/api/tasks/?tags=tag-1,tag-2&tags_match=all")
+
+    def test_list_cursor_pages(self):
+        for ordering in ["", "due_date", "-created_at"]:
+            first = self.client.get(f"/api/tasks/?pagination=cursor&ordering={ordering}").json()
+            self._assert_indexed(first["next"])
+
+    def test_search(self):
+        # The matches come from the full-text index and are then sorted; no pass over the user's tasks.
+        for url in ["/api/tasks/?search=12", "/api/tasks/?search=12&ordering=due_date&status=pending"]:
+            recorder = QueryPlanRecorder()
+            with connection.execute_wrapper(recorder):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            page_query = [query for query in recorder.queries if "tasks_tasktag" not in query[0]][-1]
+            plan = "\n".join(self._explain(*page_query))
+            if connection.vendor == "sqlite":
+                self.assertIn("VIRTUAL TABLE INDEX", plan, url)
+                self.assertNotRegex(plan, self.SQLITE_FULL_SCAN, url)
+            else:
+                self.assertIn("task_search_vector_idx", plan, url)
+
+    def test_all(self):
+        self._assert_indexed("/api/tasks/all/")
+
+    def test_reminders(self):
+        self._assert_indexed("/api/tasks/reminders/")
+
+    def test_insights(self):
+        self._assert_indexed("/api/tasks/insights/")
+
+    def test_analytics(self):
+        self._assert_indexed("/api/tasks/analytics/")
+
+
+class TaskDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="dash", password="secret-pass-123")
+        today = date.today()
+        Task.objects.bulk_create(
+            [
+                Task(user=cls.user, title="Overdue", priority=Task.Priority.HIGH, due_date=today - timedelta(days=2)),
+                Task(user=cls.user, title="Tomorrow", priority=Task.Priority.HIGH, due_date=today + timedelta(days=1)),
+                Task(
+                    user=cls.user,
+                    title="Soon",
+                    priority=Task.Priority.LOW,
+                    status=Task.Status.IN_PROGRESS,
+                    due_date=today + timedelta(days=5),
+                ),
+                Task(user=cls.user, title="Later", due_date=today + timedelta(days=20)),
+                Task(
+                    user=cls.user,
+                    title="Done",
+                    status=Task.Status.COMPLETED,
+                    due_date=today - timedelta(days=1),
+                ),
+            ]
+        )
+        rebuild_task_stats([cls.user.pk])
+
+    def setUp(self):
+        # Cached dashboard responses outlive the test transaction; user ids are reused.
+        response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_insights(self):
+        # ETag lookup, stats row, due-date buckets.
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/tasks/insights/")
+        self.assertEqual(
+            response.json(),
+            {
+                "counts": {"total": 5, "completed": 1, "pending": 3, "in_progress": 1},
+                "progress_pct": 20,
+                "reminders": {"overdue": 1, "due_tomorrow": 1, "due_soon_7_days": 2},
+                "suggestions": [
+                    "You have 1 overdue tasks. Complete them first.",
+                    "Reminder: 1 tasks are due tomorrow.",
+                ],
+            },
+        )
+
+    def test_analytics(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/tasks/analytics/")
+        self.assertEqual(
+            response.json(),
+            {
+                "total": 5,
+                "by_status": {"pending": 3, "in_progress": 1, "completed": 1},
+                "by_priority": {"high": 2, "medium": 2, "low": 1},
+                "overdue_pending": 1,
+                "due_soon_pending": 2,
+            },
+        )
+
+
+class TaskStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="stats", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertStatsInSync(self):
+        self.assertEqual(rebuild_task_stats([self.user.pk]), 0)
+
+    def test_writes_keep_stats_in_sync(self):
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        created = self.client.post("/api/tasks/", {"title": "Write report", "due_date": tomorrow}, format="json")
+        self.assertEqual(created.status_code, 201)
+        self.client.post("/api/tasks/", {"title": "Read book", "is_important": True}, format="json")
+        self.assertStatsInSync()
+
+        stats = UserTaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.total, stats.pending, stats.high, stats.important), (2, 2, 1, 1))
+        self.assertEqual(TaskDueBucket.objects.get(user=self.user).count, 1)
+
+        task_id = created.json()["id"]
+        self.client.patch(f"/api/tasks/{task_id}/", {"status": "completed"}, format="json")
+        self.assertStatsInSync()
+        self.assertFalse(TaskDueBucket.objects.filter(user=self.user).exists())
+
+        self.client.delete(f"/api/tasks/{task_id}/")
+        self.assertStatsInSync()
+        self.assertEqual(UserTaskStats.objects.get(user=self.user).total, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        Task.objects.create(user=self.user, title="Imported", due_date=date.today())
+        UserTaskStats.objects.update_or_create(user=self.user, defaults={"total": 42})
+
+        out = StringIO()
+        call_command("rebuild_task_stats", stdout=out)
+
+        self.assertIn("Repaired: 1", out.getvalue())
+        self.assertEqual(UserTaskStats.objects.get(user=self.user).total, 1)
+        self.assertStatsInSync()
+
+    def test_first_reads_insert_missing_rollups_once(self):
+        Task.objects.create(user=self.user, title="Imported", due_date=date.today())
+        self.assertEqual(get_task_counts(self.user.pk)["due_soon"], 1)
+
+        # A racing first read finds the rows already there instead of failing on the primary key.
+        self.assertFalse(create_task_stats(self.user.pk))
+        self.assertEqual(get_task_counts(self.user.pk)["total"], 1)
+        self.assertStatsInSync()
+
+
+class TaskPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="pager", password="secret-pass-123")
+        today = date.today()
+        statuses = [Task.Status.PENDING, Task.Status.IN_PROGRESS, Task.Status.COMPLETED]
+        Task.objects.bulk_create(
+            [
+                Task(
+                    user=cls.user,
+                    title=f"Task {i}",
+                    status=statuses[i % 3],
+                    is_important=i % 4 == 0,
+                    # Plenty of ties and NULLs to exercise the tiebreaker.
+                    due_date=None if i % 5 == 0 else today + timedelta(days=i % 3),
+                )
+                for i in range(40)
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            self.assertNotIn("count", body)
+            ids.extend(task["id"] for task in body["results"])
+            url = body["next"]
+        return ids
+
+    def test_cursor_pages_match_full_ordering(self):
+        for ordering in ["", "due_date", "-due_date", "created_at", "-created_at"]:
+            with self.subTest(ordering=ordering):
+                expected = [task["id"] for task in self.client.get(f"/api/tasks/all/?ordering={ordering}").json()]
+                walked = self._walk(f"/api/tasks/?pagination=cursor&page_size=7&ordering={ordering}")
+                self.assertEqual(walked, expected)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get("/api/tasks/?pagination=cursor&page_size=1000")
+        self.assertEqual(len(response.json()["results"]), 40)
+        response = self.client.get("/api/tasks/?page_size=5")
+        self.assertEqual(len(response.json()["results"]), 5)
+        self.assertEqual(response.json()["count"], 40)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/tasks/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+    def test_all_is_bounded(self):
+        with self.settings(TASKS_ALL_MAX_RESULTS=10):
+            response = self.client.get("/api/tasks/all/")
+        self.assertEqual(len(response.json()), 10)
+        self.assertEqual(response["X-Results-Truncated"], "true")
+
+        walked = self._walk("/api/tasks/all/?pagination=cursor&page_size=100")
+        self.assertEqual(len(walked), 40)
+
+
+class TaskExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="exporter", password="secret-pass-123")
+        other = User.objects.create_user(username="someone", password="secret-pass-123")
+        Task.objects.create(user=cls.user, title="Plan, then ship", due_date=date.today(), priority=Task.Priority.HIGH)
+        Task.objects.create(user=cls.user, title="Tidy up", status=Task.Status.COMPLETED)
+        Task.objects.create(user=other, title="Not mine")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_matches_serializer(self):
+        response = self.client.get("/api/tasks/export/?format=ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        exported = [json.loads(line) for line in lines]
+        expected = self.client.get("/api/tasks/all/").json()
+        self.assertEqual(exported, expected)
+
+    def test_csv_applies_filters(self):
+        response = self.client.get("/api/tasks/export/?format=csv&status=pending")
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], list(TaskSerializer.Meta.fields))
+        self.assertEqual([row[1] for row in rows[1:]], ["Plan, then ship"])
+
+    def test_unknown_format(self):
+        response = self.client.get("/api/tasks/export/?format=xml")
+        self.assertEqual(response.status_code, 404)
+
+    def test_asgi_export_streams_from_an_async_iterator(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+        async def export(query):
+            headers = {"Authorization": f"Bearer {token}"}
+            response = await AsyncClient().get(f"/api/tasks/export/?{query}", headers=headers)
+            return response.is_async, b"".join([chunk async for chunk in response.streaming_content])
+
+        for query in ["format=ndjson", "format=csv"]:
+            expected = b"".join(self.client.get(f"/api/tasks/export/?{query}").streaming_content)
+            self.assertEqual(async_to_sync(export)(query), (True, expected))
+
+
+class FastTaskReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", password="secret-pass-123")
+        today = date.today()
+        overdue = Task.objects.create(user=cls.user, title="Überfällig \u2028 \"quoted\"\n\t\x01",
+                                      due_date=today - timedelta(days=3))
+        tomorrow = Task.objects.create(user=cls.user, title="Tomorrow", description="日本語", due_date=today + timedelta(days=1),
+                                       priority=Task.Priority.HIGH, is_important=True, category="Work")
+        set_tags([(overdue, ["Äpfel", "urgent", "home"]), (tomorrow, ["home"])])
+        Task.objects.create(user=cls.user, title="Undated", status=Task.Status.IN_PROGRESS)
+        Task.objects.create(user=cls.user, title="Done", status=Task.Status.COMPLETED, due_date=today)
+
+    def setUp(self):
+        # Cached dashboard responses outlive the test transaction; user ids are reused.
+        response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, queryset):
+        return JSONRenderer().render(TaskSerializer(queryset.prefetch_related(tags_prefetch()), many=True).data)
+
+    def test_rows_render_like_the_serializer(self):
+        qs = Task.objects.filter(user=self.user).order_by("id")
+        for tz in ["UTC", "America/New_York", "Asia/Kolkata"]:
+            with timezone.override(tz):
+                self.assertEqual(FastJSONRenderer().render(represent_tasks(task_values(qs))), self.expected(qs))
+
+    def test_endpoints_match_serializer_output(self):
+        qs = Task.objects.filter(user=self.user).order_by("-is_important", "status", "due_date", "-created_at", "id")
+        self.assertEqual(self.client.get("/api/tasks/all/").content, self.expected(qs))
+
+        page = self.client.get("/api/tasks/?page_size=2").json()
+        self.assertEqual(page["results"], json.loads(self.expected(qs[:2])))
+
+        cursor_page = self.client.get("/api/tasks/?pagination=cursor&page_size=2").json()
+        self.assertEqual(cursor_page["results"], json.loads(self.expected(qs[:2])))
+        rest = self.client.get(cursor_page["next"]).json()
+        self.assertEqual(rest["results"], json.loads(self.expected(qs[2:])))
+
+        reminders = self.client.get("/api/tasks/reminders/").json()
+        overdue = Task.objects.filter(user=self.user, status=Task.Status.PENDING, due_date__lt=date.today())
+        self.assertEqual(reminders["overdue"], json.loads(self.expected(overdue)))
+
+    def test_renderer_is_byte_identical(self):
+        for url in ["/api/tasks/", "/api/tasks/analytics/", "/api/tasks/insights/", "/api/tasks/reminders/"]:
+            response = self.client.get(url)
+            self.assertEqual(response.content, JSONRenderer().render(response.data), url)
+
+    def test_renderer_without_orjson(self):
+        with mock.patch("tasks.renderers.orjson", None):
+            response = self.client.get("/api/tasks/all/")
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class FailingConnection:
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP unavailable")
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="mailer", email="mailer@example.com", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_task_emails_are_queued_not_sent(self):
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        task_id = self.client.post(
+            "/api/tasks/", {"title": "Urgent", "due_date": tomorrow, "priority": "high"}, format="json"
+        ).json()["id"]
+        self.client.patch(f"/api/tasks/{task_id}/", {"status": "completed"}, format="json")
+        self.client.patch(f"/api/tasks/{task_id}/", {"status": "pending"}, format="json")
+        self.client.patch(f"/api/tasks/{task_id}/", {"status": "completed"}, format="json")
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(OutboxEmail.objects.values_list("subject", flat=True)),
+            [
+                "[Smart Task] High Priority Task Due Tomorrow",
+                "[Smart Task] Task Completed",
+                "[Smart Task] Task Completed",
+            ],
+        )
+
+        # Queueing the same completion again is a retry and is dropped.
+        self.assertFalse(queue_task_completed_email(Task.objects.get(pk=task_id)))
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+        out = StringIO()
+        call_command("run_outbox_worker", "--once", stdout=out)
+        self.assertIn("Sent: 3", out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ["mailer@example.com"])
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists())
+
+    def test_failed_sends_back_off_then_give_up(self):
+        email = OutboxEmail.objects.create(subject="Hi", body="Hello", to_email="mailer@example.com")
+
+        result = deliver_outbox(max_attempts=2, connection=FailingConnection())
+        self.assertEqual(result, {"sent": 0, "retried": 1, "failed": 0})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+        self.assertGreater(email.next_attempt_at, email.created_at)
+        self.assertIn("SMTP unavailable", email.last_error)
+
+        # Not due yet, so nothing is picked up.
+        self.assertEqual(deliver_outbox(max_attempts=2, connection=FailingConnection())["retried"], 0)
+
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=email.created_at)
+        result = deliver_outbox(max_attempts=2, connection=FailingConnection())
+        self.assertEqual(result["failed"], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+
+    def test_claimed_batch_is_leased_while_it_is_sent(self):
+        email = OutboxEmail.objects.create(subject="Hi", body="Hello", to_email="mailer@example.com")
+        seen = []
+
+        class WorkerRacingBackend(LocMemEmailBackend):
+            def send_messages(self, messages):
+                # Another worker polling mid-send finds the batch claimed, not locked.
+                seen.append(deliver_outbox(connection=LocMemEmailBackend()))
+                return super().send_messages(messages)
+
+        self.assertEqual(deliver_outbox(connection=WorkerRacingBackend())["sent"], 1)
+        self.assertEqual(seen, [{"sent": 0, "retried": 0, "failed": 0}])
+        self.assertEqual(len(mail.outbox), 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.Status.SENT, 1))
+
+    def test_expired_lease_is_reclaimed_and_stale_result_dropped(self):
+        email = OutboxEmail.objects.create(subject="Hi", body="Hello", to_email="mailer@example.com")
+
+        class ReclaimingBackend(LocMemEmailBackend):
+            def send_messages(self, messages):
+                # The lease runs out and a second worker sends and records the email first.
+                OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+                deliver_outbox(connection=LocMemEmailBackend())
+                raise OSError("timed out")
+
+        self.assertEqual(deliver_outbox(connection=ReclaimingBackend()), {"sent": 0, "retried": 0, "failed": 0})
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), (OutboxEmail.Status.SENT, 2, ""))
+
+
+class FlakyEmailBackend(LocMemEmailBackend):
+    fail_for = set()
+
+    def send_messages(self, messages):
+        if any(set(message.to) & self.fail_for for message in messages):
+            raise ConnectionError("SMTP down")
+        return super().send_messages(messages)
+
+
+class DueDateReminderCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.users = [
+            User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com", password="secret-pass-123")
+            for i in range(4)
+        ]
+        for user in cls.users:
+            Task.objects.create(user=user, title="Today", due_date=today)
+            Task.objects.create(user=user, title="Tomorrow", due_date=today + timedelta(days=1), priority=Task.Priority.HIGH)
+            Task.objects.create(user=user, title="Late", due_date=today - timedelta(days=3))
+            Task.objects.create(user=user, title="Done", due_date=today, status=Task.Status.COMPLETED)
+        User.objects.create_user(username="nomail", password="secret-pass-123").tasks.create(title="x", due_date=today)
+        User.objects.create_user(username="idle", email="idle@example.com", password="secret-pass-123")
+
+    def test_sends_one_email_per_user(self):
+        out = StringIO()
+        call_command("send_due_date_reminders", "--include-overdue", "--workers", "2", "--batch-size", "3", stdout=out)
+
+        self.assertIn("Sent: 4,", out.getvalue())
+        self.assertIn("Throughput:", out.getvalue())
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"user{i}@example.com" for i in range(4)])
+
+        body = mail.outbox[0].body
+        self.assertIn("Due today", body)
+        self.assertIn("- Tomorrow [HIGH priority] (Recommended: complete today)", body)
+        self.assertIn("Overdue: You have 1 overdue task(s).", body)
+
+    def test_overdue_is_opt_in(self):
+        call_command("send_due_date_reminders", stdout=StringIO())
+        self.assertNotIn("Overdue", mail.outbox[0].body)
+
+    def test_shards_partition_users(self):
+        recipients = []
+        for shard in ("0/2", "1/2"):
+            mail.outbox = []
+            call_command("send_due_date_reminders", "--shard", shard, stdout=StringIO())
+            recipients.extend(m.to[0] for m in mail.outbox)
+        self.assertEqual(sorted(recipients), [f"user{i}@example.com" for i in range(4)])
+
+    def test_rerun_skips_users_already_notified(self):
+        call_command("send_due_date_reminders", stdout=StringIO())
+        self.assertEqual(ReminderDelivery.objects.count(), 4)
+
+        mail.outbox = []
+        out = StringIO()
+        call_command("send_due_date_reminders", stdout=out)
+        self.assertIn("Sent: 0,", out.getvalue())
+        self.assertEqual(mail.outbox, [])
+
+    def test_resumes_after_a_failed_batch(self):
+        FlakyEmailBackend.fail_for = {"user2@example.com"}
+        try:
+            with self.settings(EMAIL_BACKEND="tasks.tests.FlakyEmailBackend"):
+                out, err = StringIO(), StringIO()
+                call_command("send_due_date_reminders", "--batch-size", "1", stdout=out, stderr=err)
+        finally:
+            FlakyEmailBackend.fail_for = set()
+
+        self.assertIn("Sent: 3, Failed: 1", out.getvalue())
+        self.assertIn("SMTP down", err.getvalue())
+        checkpoint = ReminderCheckpoint.objects.get()
+        self.assertEqual(checkpoint.last_user_id, self.users[1].pk)
+        self.assertIsNone(checkpoint.completed_at)
+
+        mail.outbox = []
+        call_command("send_due_date_reminders", "--since-checkpoint", stdout=StringIO())
+        self.assertEqual([m.to[0] for m in mail.outbox], ["user2@example.com"])
+        checkpoint.refresh_from_db()
+        self.assertIsNotNone(checkpoint.completed_at)
+
+    def test_query_count_does_not_grow_with_users(self):
+        with self.assertNumQueries(1):
+            call_command("send_due_date_reminders", "--include-overdue", "--dry-run", stdout=StringIO())
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="sched", email="sched@example.com", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        self.in_two_days = self.today + timedelta(days=2)
+
+    def create(self, **data):
+        data = {"title": "Task", "priority": "high", "due_date": self.in_two_days.isoformat(), **data}
+        return self.client.post("/api/tasks/", data, format="json").json()["id"]
+
+    def test_loads_only_the_window(self):
+        soon = self.create()
+        self.create(due_date=(self.today + timedelta(days=10)).isoformat())
+        self.create(priority="low")
+
+        scheduler = ReminderScheduler(window_days=2)
+        scheduler.resync(timezone.now())
+
+        self.assertEqual(set(scheduler.scheduled), {soon})
+
+    def test_follows_task_changes_and_fires_on_time(self):
+        scheduler = ReminderScheduler(window_days=2)
+        scheduler.resync(timezone.now())
+
+        kept = self.create(title="Kept")
+        dropped = self.create(title="Dropped")
+        moved = self.create(title="Moved")
+        self.client.delete(f"/api/tasks/{dropped}/")
+        self.client.patch(f"/api/tasks/{moved}/", {"priority": "low"}, format="json")
+
+        self.assertEqual(scheduler.poll_changes(timezone.now()), 5)
+        self.assertEqual(set(scheduler.scheduled), {kept})
+
+        fire_at = scheduler.fire_time(self.in_two_days)
+        self.assertEqual(scheduler.fire_due(fire_at - timedelta(seconds=1)), 0)
+        self.assertEqual(scheduler.fire_due(fire_at), 1)
+        self.assertEqual(scheduler.scheduled, {})
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.dedupe_key, f"task:{kept}:due-tomorrow:{self.in_two_days.isoformat()}")
+        self.assertIn("- Kept", email.body)
+
+
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.user = User.objects.create_user(username="seeker", password="secret-pass-123")
+        other = User.objects.create_user(username="hidden", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.in_body = self.task("Call the bank", "ask about the quarterly report", status=Task.Status.COMPLETED)
+        self.in_title = self.task("Quarterly report draft", "")
+        self.plural = self.task("Print reports", "for the board")
+        self.task("Buy groceries", "milk, eggs")
+        Task.objects.create(user=other, title="Quarterly report for someone else")
+
+    def task(self, title, description, **fields):
+        return Task.objects.create(user=self.user, title=title, description=description, **fields).pk
+
+    def search(self, query, **params):
+        response = self.client.get("/api/tasks/", {"search": query, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [task["id"] for task in response.json()["results"]]
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search("quarterly report"), [self.in_title, self.in_body])
+
+    def test_matches_word_prefixes_and_stems(self):
+        self.assertEqual(self.search("quart"), [self.in_title, self.in_body])
+        self.assertCountEqual(self.search("report"), [self.in_title, self.in_body, self.plural])
+
+    def test_combines_with_filters_ordering_and_cursors(self):
+        self.assertEqual(self.search("report", status="completed"), [self.in_body])
+        self.assertEqual(self.search("report", ordering="created_at"), [self.in_body, self.in_title, self.plural])
+
+        first = self.client.get("/api/tasks/", {"search": "report", "pagination": "cursor", "page_size": 2}).json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(len(first["results"]) + len(second["results"]), 3)
+        self.assertIsNone(second["next"])
+
+    def test_odd_queries_do_not_error(self):
+        self.assertEqual(self.search('"'), [])
+        self.assertEqual(self.search("report AND NOT (* -"), [])
+        self.assertEqual(self.search("report*"), self.search("report"))
+
+    def test_index_follows_every_kind_of_write(self):
+        self.client.patch(f"/api/tasks/{self.in_title}/", {"title": "Annual summary"}, format="json")
+        Task.objects.filter(pk=self.plural).update(description="stapled summary")
+        Task.objects.bulk_create([Task(user=self.user, title="Summary slides")])
+        Task.objects.filter(title="Buy groceries").delete()
+
+        self.assertEqual(self.search("quarterly"), [self.in_body])
+        self.assertEqual(len(self.search("summary")), 3)
+        self.assertEqual(self.search("groceries"), [])
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 triggers are SQLite only")
+    def test_triggers_dropped_by_a_table_rebuild_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_insert")
+        missed = self.task("Renew passport", "")
+
+        self.assertTrue(repair_search_triggers())
+        self.assertFalse(repair_search_triggers())
+        self.assertEqual(self.search("passport"), [missed])
+        self.assertEqual(self.search("passport", ordering="created_at"), [missed])
+
+
+class TaskSuggestTests(TestCase):
+    def setUp(self):
+        # Indexes live for the whole process, and user ids come back after each test's rollback.
+        clear_suggestion_indexes()
+        self.user = User.objects.create_user(username="typist", password="secret-pass-123")
+        other = User.objects.create_user(username="bystander", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for title, category in [
+            ("Review report", "Work"),
+            ("review  REPORT", "Work"),
+            ("Read notes", "Workout"),
+            ("Quarterly review", "Home"),
+            ("Buy milk", ""),
+        ]:
+            Task.objects.create(user=self.user, title=title, category=category)
+        Task.objects.create(user=other, title="Rent flat", category="Wonders")
+
+    def suggest(self, q, **params):
+        response = self.client.get("/api/tasks/suggest/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_title_starts_rank_first_then_most_used(self):
+        self.assertEqual(self.suggest("re")["titles"], ["Review report", "Read notes", "Quarterly review"])
+        self.assertEqual(self.suggest("REVIEW  r")["titles"], ["Review report"])
+        self.assertEqual(self.suggest("re", limit=1)["titles"], ["Review report"])
+        self.assertEqual(self.suggest("x")["titles"], [])
+
+    def test_categories(self):
+        self.assertEqual(self.suggest("wo")["categories"], ["Work", "Workout"])
+        self.assertEqual(self.suggest(""), {"titles": [], "categories": ["Work", "Home", "Workout"]})
+
+    def test_follows_writes_through_the_change_log(self):
+        self.suggest("re")
+        created = self.client.post("/api/tasks/", {"title": "Renew passport", "category": "Errands"}, format="json")
+        quarterly = Task.objects.get(title="Quarterly review").pk
+        self.client.patch(f"/api/tasks/{quarterly}/", {"title": "Annual summary"}, format="json")
+        self.client.delete(f"/api/tasks/{Task.objects.get(title='Read notes').pk}/")
+
+        self.assertEqual(self.suggest("re")["titles"], ["Review report", "Renew passport"])
+        self.assertEqual(self.suggest("er")["categories"], ["Errands"])
+        self.assertEqual(self.suggest("wo")["categories"], ["Work"])
+        self.assertEqual(created.status_code, 201)
+
+    def test_warm_lookups_read_only_the_change_log(self):
+        self.suggest("re")
+        self.client.post("/api/tasks/", {"title": "Renew passport"}, format="json")
+
+        with self.assertNumQueries(2):
+            self.assertIn("Renew passport", self.suggest("re")["titles"])
+        # The new log row is not settled yet; it is read again but its task is not.
+        with self.assertNumQueries(1):
+            self.suggest("ren")
+
+    def test_picks_up_writes_that_commit_out_of_log_order(self):
+        self.suggest("re")
+        TaskChange.objects.create(id=1000, user=self.user, task_id=0, op=TaskChange.Op.UPSERT)
+        self.suggest("re")
+
+        # Its log id was taken before id 1000's, but it commits afterwards.
+        late = Task.objects.create(user=self.user, title="Repaint fence")
+        TaskChange.objects.create(id=999, user=self.user, task_id=late.pk, op=TaskChange.Op.UPSERT)
+        self.assertIn("Repaint fence", self.suggest("re")["titles"])
+
+    def test_later_words_match_across_spaces(self):
+        self.assertEqual(self.suggest("review r")["titles"], ["Review report"])
+        self.assertEqual(self.suggest("report")["titles"], ["Review report"])
+        self.assertEqual(self.suggest("milk x")["titles"], [])
+
+    @override_settings(TASKS_SUGGEST_MAX_TASKS=3)
+    def test_index_covers_only_the_newest_tasks(self):
+        self.assertEqual(self.suggest("re")["titles"], ["Read notes", "Quarterly review"])
+        self.client.post("/api/tasks/", {"title": "Renew passport"}, format="json")
+        self.assertEqual(self.suggest("re")["titles"], ["Renew passport", "Quarterly review"])
+        self.assertEqual(len(suggestion_index(self.user.pk).tasks), 3)
+
+
+class TaskCategoryTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.user = User.objects.create_user(username="sorter", password="secret-pass-123")
+        self.other = User.objects.create_user(username="neighbour", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, client=None, **fields):
+        response = (client or self.client).post("/api/tasks/", {"title": "Task", **fields}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_spellings_of_a_name_share_one_category(self):
+        self.assertEqual(self.create(category="Work")["category"], "Work")
+        self.assertEqual(self.create(category="  work ")["category"], "Work")
+        self.assertEqual(self.create(category=" ")["category"], "")
+        bulk = self.client.post(
+            "/api/tasks/bulk/",
+            {"create": [{"title": "A", "category": "WORK"}, {"title": "B", "category": "Home"}]},
+            format="json",
+        ).json()
+        self.assertEqual([item["data"]["category"] for item in bulk["created"]], ["Work", "Home"])
+        home = bulk["created"][1]["data"]["id"]
+        self.assertEqual(
+            self.client.patch(f"/api/tasks/{home}/", {"category": "wORK"}, format="json").json()["category"], "Work"
+        )
+
+        other = APIClient()
+        other.force_authenticate(self.other)
+        self.assertEqual(self.create(client=other, category="work")["category"], "work")
+
+        self.assertEqual(sorted(Category.objects.filter(user=self.user).values_list("name", flat=True)), ["Home", "Work"])
+        self.assertEqual(Task.objects.filter(user=self.user, category_ref__key="work").count(), 4)
+        self.assertFalse(Task.objects.filter(user=self.user, category="", category_ref__isnull=False).exists())
+
+    def test_category_filter_ignores_case_and_spacing(self):
+        work = self.create(category="Work")["id"]
+        self.create(category="Home")
+        theirs = Task(user=self.other, title="Theirs", category="work")
+        assign_categories([theirs])
+        theirs.save()
+
+        for param in ["Work", "WORK", " work  "]:
+            results = self.client.get("/api/tasks/", {"category": param}).json()["results"]
+            self.assertEqual([task["id"] for task in results], [work], param)
+        self.assertEqual(self.client.get("/api/tasks/", {"category": "Wor"}).json()["results"], [])
+
+    def test_facets(self):
+        self.create(category="Work", priority="high", is_important=True)
+        self.create(category="work", status="completed")
+        self.create(category="Home", title="Groceries")
+        self.create()
+        theirs = Task(user=self.other, title="Theirs", category="Work")
+        assign_categories([theirs])
+        theirs.save()
+
+        response = self.client.get("/api/tasks/facets/")
+        self.assertEqual(
+            response.json(),
+            {
+                "total": 4,
+                "uncategorized": 1,
+                "categories": [{"name": "Work", "count": 2}, {"name": "Home", "count": 1}],
+                "status": {"pending": 3, "in_progress": 0, "completed": 1},
+                "priority": {"high": 1, "medium": 3, "low": 0},
+                "important": {"true": 1, "false": 3},
+            },
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/tasks/facets/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        # Counts follow the list filters, search included.
+        self.assertEqual(self.client.get("/api/tasks/facets/?status=pending").json()["categories"][0]["count"], 1)
+        searched = self.client.get("/api/tasks/facets/?search=grocer").json()
+        self.assertEqual((searched["total"], searched["categories"]), (1, [{"name": "Home", "count": 1}]))
+
+
+class TaskTagTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.user = User.objects.create_user(username="tagger", password="secret-pass-123")
+        self.other = User.objects.create_user(username="onlooker", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title, tags):
+        response = self.client.post("/api/tasks/", {"title": title, "tags": tags}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_tags_are_normalized_and_written_by_every_path(self):
+        trip = self.create("Plan trip", ["travel", " Urgent ", "urgent", ""])
+        self.assertEqual(trip["tags"], ["Urgent", "travel"])
+        pack = self.create("Pack", ["URGENT"])
+        self.assertEqual(pack["tags"], ["Urgent"])
+
+        self.assertEqual(self.client.patch(f"/api/tasks/{trip['id']}/", {"tags": ["home"]}, format="json").json()["tags"], ["home"])
+        self.assertEqual(self.client.patch(f"/api/tasks/{trip['id']}/", {"title": "Plan"}, format="json").json()["tags"], ["home"])
+        self.assertEqual(self.client.get(f"/api/tasks/{trip['id']}/").json()["tags"], ["home"])
+
+        bulk = self.client.post(
+            "/api/tasks/bulk/",
+            {"create": [{"title": "Weed", "tags": ["home", "garden"]}], "update": [{"id": pack["id"], "tags": []}]},
+            format="json",
+        ).json()
+        self.assertEqual(bulk["created"][0]["data"]["tags"], ["garden", "home"])
+        self.assertEqual(bulk["updated"][0]["data"]["tags"], [])
+
+        self.assertEqual(sorted(Tag.objects.filter(user=self.user).values_list("key", flat=True)), ["garden", "home", "travel", "urgent"])
+        self.assertEqual(self.client.post("/api/tasks/", {"title": "Bad", "tags": ["a,b"]}, format="json").status_code, 400)
+        exported = map(json.loads, b"".join(self.client.get("/api/tasks/export/").streaming_content).splitlines())
+        self.assertEqual({row["title"]: row["tags"] for row in exported}, {"Plan": ["home"], "Pack": [], "Weed": ["garden", "home"]})
+
+    def test_filter_by_any_or_all_tags(self):
+        both = self.create("Both", ["work", "urgent"])["id"]
+        work = self.create("Work only", ["Work"])["id"]
+        self.create("Untagged", [])
+        theirs = Task.objects.create(user=self.other, title="Theirs")
+        set_tags([(theirs, ["work", "urgent"])])
+
+        def ids(**params):
+            return sorted(task["id"] for task in self.client.get("/api/tasks/", params).json()["results"])
+
+        self.assertEqual(ids(tags="WORK"), [both, work])
+        self.assertEqual(ids(tags="work,urgent"), [both, work])
+        self.assertEqual(ids(tags="work,urgent", tags_match="all"), [both])
+        self.assertEqual(ids(tags="urgent, Urgent", tags_match="all"), [both])
+        self.assertEqual(ids(tags="work,missing", tags_match="all"), [])
+        self.assertEqual(ids(tags="missing"), [])
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        tasks = Task.objects.bulk_create([Task(user=self.user, title=f"Task {i}") for i in range(30)])
+        set_tags((task, [f"tag-{task.pk % 4}", "all"]) for task in tasks)
+        qs = Task.objects.filter(user=self.user).order_by("id").prefetch_related(tags_prefetch())
+
+        for size in (1, 5, 30):
+            with self.assertNumQueries(2):
+                data = TaskSerializer(qs[:size], many=True).data
+            self.assertEqual(len(data), size)
+            self.assertTrue(all("all" in task["tags"] for task in data))
+            # ETag version, count, page, tags.
+            with self.assertNumQueries(4):
+                self.client.get("/api/tasks/", {"page_size": size})
+
+
+class BulkTaskTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulk", email="bulk@example.com", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_uses_a_handful_of_queries(self):
+        today = date.today()
+        creates = [{"title": f"Imported {i}", "due_date": (today + timedelta(days=2 + i % 10)).isoformat()} for i in range(500)]
+        rebuild_task_stats([self.user.pk])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/tasks/bulk/", {"create": creates}, format="json")
+
+        # Inserts go out in chunks sized by the backend's parameter limit; nothing else is per row.
+        self.assertLessEqual(len(queries), 20)
+
+        self.assertEqual(response.status_code, 200)
+        created = response.json()["created"]
+        self.assertEqual([item["status"] for item in created], [201] * 500)
+        self.assertEqual(created[0]["data"]["priority"], "medium")
+        self.assertEqual(created[9]["data"]["priority"], "low")
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 500)
+        self.assertEqual(rebuild_task_stats([self.user.pk]), 0)
+
+    def test_mixed_batch_reports_each_item(self):
+        keep = Task.objects.create(user=self.user, title="Keep")
+        drop = Task.objects.create(user=self.user, title="Drop")
+        foreign = Task.objects.create(user=User.objects.create_user(username="x", password="secret-pass-123"), title="No")
+        rebuild_task_stats([self.user.pk])
+
+        response = self.client.post(
+            "/api/tasks/bulk/",
+            {
+                "create": [{"title": "New"}, {"title": "   "}],
+                "update": [{"id": keep.pk, "status": "completed"}, {"id": foreign.pk, "title": "Mine now"}],
+                "delete": [drop.pk, foreign.pk],
+            },
+            format="json",
+        )
+
+        body = response.json()
+        self.assertEqual([item["status"] for item in body["created"]], [201, 400])
+        self.assertEqual([item["status"] for item in body["updated"]], [200, 404])
+        self.assertEqual(body["updated"][0]["data"]["status"], "completed")
+        self.assertEqual([item["status"] for item in body["deleted"]], [204, 404])
+
+        self.assertFalse(Task.objects.filter(pk=drop.pk).exists())
+        self.assertEqual(Task.objects.get(pk=foreign.pk).title, "No")
+        self.assertEqual(rebuild_task_stats([self.user.pk]), 0)
+        self.assertEqual(OutboxEmail.objects.get().subject, "[Smart Task] Task Completed")
+
+    def test_rejects_oversized_batches(self):
+        with self.settings(TASKS_BULK_MAX_ITEMS=2):
+            response = self.client.post("/api/tasks/bulk/", {"delete": [1, 2, 3]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskConditionalGetTests(TestCase):
+    def setUp(self):
+        # Cached dashboard responses outlive the test transaction; user ids are reused.
+        response_cache().clear()
+        self.user = User.objects.create_user(username="etag", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.task = self.client.post("/api/tasks/", {"title": "First"}, format="json").json()
+
+    def test_unchanged_reads_are_not_modified(self):
+        for url in ["/api/tasks/", "/api/tasks/all/", "/api/tasks/reminders/", "/api/tasks/insights/", "/api/tasks/analytics/"]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("no-cache", response["Cache-Control"])
+
+            # One lookup in the change log; no task queries and no serialization.
+            with self.assertNumQueries(1):
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(cached.status_code, 304, url)
+            self.assertEqual(cached.content, b"")
+
+    def test_etag_changes_with_writes_and_params(self):
+        etag = self.client.get("/api/tasks/")["ETag"]
+
+        self.assertNotEqual(self.client.get("/api/tasks/?status=pending")["ETag"], etag)
+        self.assertEqual(
+            self.client.get("/api/tasks/?status=pending&priority=low")["ETag"],
+            self.client.get("/api/tasks/?priority=low&status=pending")["ETag"],
+        )
+
+        self.client.patch(f"/api/tasks/{self.task['id']}/", {"title": "Renamed"}, format="json")
+        response = self.client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["title"], "Renamed")
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get("/api/tasks/")["ETag"]
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="secret-pass-123"))
+        self.assertEqual(other.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(TASKS_SYNC_PAGE_SIZE=2, TASKS_SYNC_SETTLE_SECONDS=0)
+class TaskSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="sync", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title):
+        return self.client.post("/api/tasks/", {"title": title}, format="json").json()
+
+    def sync(self, since=None):
+        params = {"since": since} if since else {}
+        return self.client.get("/api/tasks/changes/", params).json()
+
+    def test_snapshot_then_deltas_with_tombstones(self):
+        a, b, c = self.create("A"), self.create("B"), self.create("C")
+
+        first = self.sync()
+        self.assertTrue(first["has_more"])
+        self.assertEqual([t["id"] for t in first["tasks"]], [a["id"], b["id"]])
+        second = self.sync(first["cursor"])
+        self.assertFalse(second["has_more"])
+        self.assertEqual([t["id"] for t in second["tasks"]], [c["id"]])
+
+        unchanged = self.sync(second["cursor"])
+        self.assertEqual((unchanged["tasks"], unchanged["deleted"]), ([], []))
+
+        self.client.patch(f"/api/tasks/{a['id']}/", {"status": "completed"}, format="json")
+        self.client.delete(f"/api/tasks/{b['id']}/")
+        d = self.create("D")
+        self.client.patch(f"/api/tasks/{d['id']}/", {"title": "D2"}, format="json")
+
+        delta = self.sync(second["cursor"])
+        self.assertTrue(delta["has_more"])
+        self.assertEqual([t["status"] for t in delta["tasks"]], ["completed"])
+        self.assertEqual(delta["deleted"], [b["id"]])
+
+        rest = self.sync(delta["cursor"])
+        self.assertFalse(rest["has_more"])
+        self.assertEqual([t["title"] for t in rest["tasks"]], ["D2"])
+
+    def test_delta_work_does_not_depend_on_list_size(self):
+        for i in range(20):
+            self.create(f"Task {i}")
+        cursor = self.sync()["cursor"]
+        while True:
+            page = self.sync(cursor)
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+        task = self.create("New")
+
+        # The log, the changed rows and their tags.
+        with self.assertNumQueries(3):
+            page = self.client.get("/api/tasks/changes/", {"since": cursor}).json()
+        self.assertEqual([t["id"] for t in page["tasks"]], [task["id"]])
+
+    @override_settings(TASKS_SYNC_SETTLE_SECONDS=60)
+    def test_cursor_waits_for_recent_changes_to_settle(self):
+        cursor = self.sync()["cursor"]
+        task = self.create("Fresh")
+
+        page = self.sync(cursor)
+        self.assertEqual([t["id"] for t in page["tasks"]], [task["id"]])
+        self.assertEqual(page["cursor"], cursor)
+
+    def test_snapshot_cursor_stops_at_last_settled_change(self):
+        a = self.create("A")
+        TaskChange.objects.filter(task_id=a["id"]).update(created_at=timezone.now() - timedelta(minutes=5))
+        TaskChange.objects.create(id=1000, user=self.user, task_id=a["id"], op=TaskChange.Op.UPSERT)
+
+        with override_settings(TASKS_SYNC_SETTLE_SECONDS=60):
+            snapshot = self.sync()
+            self.assertFalse(snapshot["has_more"])
+
+            # Its log id was taken before id 1000's, but it commits after the snapshot was read.
+            late = Task.objects.create(user=self.user, title="Late")
+            TaskChange.objects.create(id=999, user=self.user, task_id=late.pk, op=TaskChange.Op.UPSERT)
+            delta = self.sync(snapshot["cursor"])
+        self.assertIn(late.pk, [t["id"] for t in delta["tasks"]])
+
+    def test_full_page_cursor_stops_at_last_settled_change(self):
+        cursor = self.sync()["cursor"]
+        a, b, c = self.create("A"), self.create("B"), self.create("C")
+        TaskChange.objects.filter(task_id=a["id"]).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        with override_settings(TASKS_SYNC_SETTLE_SECONDS=60):
+            page = self.sync(cursor)
+        self.assertEqual([t["id"] for t in page["tasks"]], [a["id"], b["id"]])
+        self.assertFalse(page["has_more"])
+
+        # B was not settled, so it is sent again along with C.
+        rest = self.sync(page["cursor"])
+        self.assertEqual([t["id"] for t in rest["tasks"]], [b["id"], c["id"]])
+
+    def test_rejects_bad_cursor(self):
+        response = self.client.get("/api/tasks/changes/", {"since": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        CACHE_STATS.clear()
+        self.user = User.objects.create_user(username="cached", password="secret-pass-123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.task = self.client.post("/api/tasks/", {"title": "Cached"}, format="json").json()
+
+    def test_repeat_reads_are_served_from_cache(self):
+        for url in ["/api/tasks/insights/", "/api/tasks/analytics/", "/api/tasks/reminders/"]:
+            first = self.client.get(url)
+            self.assertEqual(first["X-Cache"], "miss")
+
+            # Only the ETag lookup; the body comes from the cache.
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(second["X-Cache"], "hit")
+            self.assertEqual(second.content, first.content)
+
+        self.assertEqual(
+            CACHE_STATS,
+            {f"{name}:{result}": 1 for name in ["insights", "analytics", "reminders"] for result in ["hit", "miss"]},
+        )
+
+    def test_every_write_path_invalidates(self):
+        def completed():
+            return self.client.get("/api/tasks/analytics/").json()["by_status"]["completed"]
+
+        self.assertEqual(completed(), 0)
+        self.client.patch(f"/api/tasks/{self.task['id']}/", {"status": "completed"}, format="json")
+        self.assertEqual(completed(), 1)
+
+        self.client.post("/api/tasks/bulk/", {"create": [{"title": "Bulk", "status": "completed"}]}, format="json")
+        self.assertEqual(completed(), 2)
+
+        self.client.delete(f"/api/tasks/{self.task['id']}/")
+        self.assertEqual(completed(), 1)
+
+    def test_writes_seen_through_the_change_log_not_this_process(self):
+        self.assertEqual(self.client.get("/api/tasks/insights/")["X-Cache"], "miss")
+        # Another worker's write reaches this one only through the database.
+        TaskChange.objects.create(user=self.user, task_id=self.task["id"], op=TaskChange.Op.UPSERT)
+        self.assertEqual(self.client.get("/api/tasks/insights/")["X-Cache"], "miss")
+        self.assertEqual(self.client.get("/api/tasks/insights/")["X-Cache"], "hit")
+
+    def test_rollup_repair_drops_cached_answers(self):
+        UserTaskStats.objects.filter(user=self.user).update(total=5)
+        self.assertEqual(self.client.get("/api/tasks/analytics/").json()["total"], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rebuild_task_stats([self.user.pk]), 1)
+        response = self.client.get("/api/tasks/analytics/")
+        self.assertEqual((response["X-Cache"], response.json()["total"]), ("miss", 1))
+
+    def test_dated_entries_roll_over_at_midnight(self):
+        today = date.today()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {"n": len(builds)}
+
+        with mock.patch("tasks.cache.date") as fake_date:
+            fake_date.today.return_value = today
+            self.assertEqual(cached_response("insights", self.user.pk, build), ({"n": 1}, False))
+            self.assertEqual(cached_response("insights", self.user.pk, build), ({"n": 1}, True))
+            fake_date.today.return_value = today + timedelta(days=1)
+            self.assertEqual(cached_response("insights", self.user.pk, build), ({"n": 2}, False))
+
+    def test_users_do_not_share_entries(self):
+        self.client.get("/api/tasks/insights/")
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="secret-pass-123"))
+        response = other.get("/api/tasks/insights/")
+        self.assertEqual(response["X-Cache"], "miss")
+        self.assertEqual(response.json()["counts"]["total"], 0)
+
+
+class AsyncReadViewTests(TestCase):
+    """The ASGI profile's async reads must answer exactly like TaskViewSet."""
+
+    ASYNC_URLS = "smart_task_backend.asgi_urls"
+    COMPARED_HEADERS = ["Content-Type", "Allow", "Vary", "ETag", "Cache-Control"]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="async", password="secret-pass-123")
+        today = date.today()
+        for i in range(9):
+            Task.objects.create(
+                user=cls.user,
+                title=f"Task {i} ✓",
+                due_date=today + timedelta(days=i - 3) if i % 3 else None,
+                priority=[Task.Priority.HIGH, Task.Priority.MEDIUM, Task.Priority.LOW][i % 3],
+                status=[Task.Status.PENDING, Task.Status.IN_PROGRESS, Task.Status.COMPLETED][i % 3],
+                is_important=i % 4 == 0,
+            )
+        Task.objects.create(user=User.objects.create_user(username="other", password="x-secret-123"), title="Hidden")
+        cls.task_id = Task.objects.filter(user=cls.user).values_list("id", flat=True).first()
+
+    def setUp(self):
+        caches[AUTH_CACHE].clear()
+        self.client = APIClient()
+        access = self.client.post(
+            "/api/auth/login/", {"username": "async", "password": "secret-pass-123"}, format="json"
+        ).json()["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def fetch(self, url, **extra):
+        response_cache().clear()
+        return self.client.get(url, **extra)
+
+    def test_reads_match_the_viewset(self):
+        urls = [
+            "/api/tasks/",
+            "/api/tasks/?page=2&page_size=4&ordering=due_date",
+            "/api/tasks/?page=99",
+            "/api/tasks/?pagination=cursor&page_size=4&status=pending",
+            f"/api/tasks/{self.task_id}/",
+            "/api/tasks/999999/",
+            "/api/tasks/reminders/",
+            "/api/tasks/insights/",
+            "/api/tasks/analytics/",
+        ]
+        for url in urls:
+            expected = self.fetch(url)
+            with self.settings(ROOT_URLCONF=self.ASYNC_URLS):
+                actual = self.fetch(url)
+            self.assertEqual(actual.status_code, expected.status_code, url)
+            self.assertEqual(actual.content, expected.content, url)
+            for header in self.COMPARED_HEADERS:
+                self.assertEqual(actual.headers.get(header), expected.headers.get(header), f"{url} {header}")
+
+        cursor_page = self.fetch("/api/tasks/?pagination=cursor&page_size=4").json()
+        with self.settings(ROOT_URLCONF=self.ASYNC_URLS):
+            self.assertEqual(self.fetch(cursor_page["next"]).json(), self.client.get(cursor_page["next"]).json())
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLS)
+    def test_conditional_get_and_auth(self):
+        response = self.client.get("/api/tasks/insights/")
+        self.assertEqual(response.status_code, 200)
+        cached = self.client.get("/api/tasks/insights/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        anonymous = APIClient().get("/api/tasks/")
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(anonymous.json(), {"detail": "Authentication credentials were not provided."})
+        self.assertEqual(anonymous["WWW-Authenticate"], 'Bearer realm="api"')
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLS)
+    def test_writes_fall_through_to_the_viewset(self):
+        created = self.client.post("/api/tasks/", {"title": "Written"}, format="json")
+        self.assertEqual(created.status_code, 201)
+        task_id = created.json()["id"]
+
+        self.assertEqual(
+            self.client.patch(f"/api/tasks/{task_id}/", {"status": "completed"}, format="json").json()["status"],
+            "completed",
+        )
+        self.assertEqual(self.client.get(f"/api/tasks/{task_id}/").json()["status"], "completed")
+        self.assertEqual(self.client.delete(f"/api/tasks/{task_id}/").status_code, 204)
+        self.assertEqual(self.client.get(f"/api/tasks/{task_id}/").status_code, 404)
+
+
+class SeedAndBenchCommandTests(TestCase):
+    def test_seed_tasks_creates_consistent_data(self):
+        call_command("seed_tasks", users=3, tasks=40, prefix="seeded", seed=7, stdout=StringIO())
+
+        users = User.objects.filter(username__startswith="seeded-")
+        self.assertEqual(users.count(), 3)
+        tasks = Task.objects.filter(user__in=users)
+        self.assertEqual(tasks.count(), 120)
+        self.assertEqual(set(tasks.values_list("status", flat=True)), set(Task.Status.values))
+        self.assertEqual(TaskChange.objects.filter(user__in=users).count(), 120)
+        self.assertEqual(rebuild_task_stats(users.values_list("pk", flat=True)), 0)
+        self.assertTrue(self.client.login(username="seeded-0", password="seed-pass-123"))
+
+    def test_bench_api_reports_every_endpoint(self):
+        response_cache().clear()
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            call_command(
+                "bench_api", sizes="5", users=0, requests=2, slow_requests=1, output=output, stdout=StringIO()
+            )
+            with open(output, encoding="utf-8") as fh:
+                report = json.load(fh)
+
+        endpoints = {row["endpoint"]: row for row in report["results"]}
+        for name in ("list", "retrieve", "create", "destroy", "bulk", "changes", "analytics", "login", "refresh"):
+            self.assertIn(name, endpoints)
+        for row in report["results"]:
+            self.assertTrue(all(int(code) < 400 for code in row["statuses"]), row)
+            self.assertLessEqual(row["p50_ms"], row["p99_ms"])
+        self.assertEqual(endpoints["list 304"]["statuses"], {"304": 2})
+        self.assertFalse(User.objects.filter(username__startswith="bench-").exists())
+
+    def test_bench_tag_queries_reports_constant_query_counts(self):
+        out = StringIO()
+        call_command("bench_tag_queries", page_sizes="5,20", tags=2, repeat=1, stdout=out)
+        self.assertIn("Constant query count: serializer + Prefetch, values rows", out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith="bench-").exists())
+
+
+class QueryBudgetTests(TestCase):
+    """Query budgets for every endpoint and management command.
+
+    Each operation runs against a small and a large data set. It must stay
+    within its budget at both sizes, run no statement twice beyond its
+    duplicate allowance, and issue the same number of queries at each size, so
+    an N+1 fails here rather than in production.
+    """
+
+    SIZES = (4, 60)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [cls.make_user(f"budget{size}", size) for size in cls.SIZES]
+
+    @classmethod
+    def make_user(cls, username, size):
+        user = User.objects.create_user(username=username, email=f"{username}@example.com", password="secret-pass-123")
+        today = date.today()
+        statuses = Task.Status.values
+        priorities = Task.Priority.values
+        # Filler tasks stay off today and tomorrow, so every write below takes the same branches at each size.
+        tasks = [
+            Task(
+                user=user,
+                title=f"Filler {i}",
+                status=statuses[i % 3],
+                priority=priorities[i % 3],
+                is_important=i % 4 == 0,
+                category=("Work", "Home", "")[i % 3],
+                due_date=None
+                if i % 5 == 0
+                else today + timedelta(days=2 + i % 40)
+                if i % 3
+                else today - timedelta(days=1 + i % 20),
+            )
+            for i in range(size)
+        ]
+        assign_categories(tasks)
+        Task.objects.bulk_create(tasks)
+        rebuild_task_stats([user.pk])
+        return user
+
+    def setUp(self):
+        response_cache().clear()
+        caches[AUTH_CACHE].clear()
+        clear_suggestion_indexes()
+        self.clients = {}
+        for user in self.users:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}")
+            self.clients[user.pk] = client
+
+    def assertQueryBudget(self, runs, max_queries, max_duplicates=0):
+        """``runs`` yields the same operation once per data size, as a callable."""
+        counts = []
+        for run in runs:
+            with CaptureQueriesContext(connection) as captured:
+                run()
+            statements = [query["sql"] for query in captured.captured_queries]
+            listing = "\n".join(statements)
+            self.assertLessEqual(len(statements), max_queries, f"over budget:\n{listing}")
+            self.assertLessEqual(len(statements) - len(set(statements)), max_duplicates, f"repeated queries:\n{listing}")
+            counts.append(len(statements))
+        self.assertEqual(len(set(counts)), 1, f"query count changes with data size: {counts}")
+
+    def per_user(self, request, expected_status):
+        for user in self.users:
+            client = self.clients[user.pk]
+
+            def run(user=user, client=client):
+                response = request(client, user)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                self.assertEqual(response.status_code, expected_status, getattr(response, "content", b"")[:200])
+
+            yield run
+
+    def target(self, user, **fields):
+        return Task.objects.create(user=user, title="Target", **fields)
+
+    def test_read_endpoints(self):
+        budgets = [
+            # (path, queries): ETag version, then the page, its count and the page's tags.
+            ("/api/tasks/", 4),
+            ("/api/tasks/?status=pending&ordering=due_date&search=Filler", 4),
+            ("/api/tasks/?search=Filler", 4),
+            ("/api/tasks/?category=work", 4),
+            # ETag version, then one grouped count.
+            ("/api/tasks/facets/", 2),
+            # Cold: the change-log position, then the user's titles and categories.
+            ("/api/tasks/suggest/?q=fil", 2),
+            ("/api/tasks/?pagination=cursor", 3),
+            ("/api/tasks/all/", 3),
+            ("/api/tasks/export/", 2),
+            ("/api/tasks/export/?format=csv", 2),
+            ("/api/tasks/changes/", 3),
+            ("/api/tasks/reminders/", 4),
+            ("/api/tasks/insights/", 3),
+            ("/api/tasks/analytics/", 3),
+        ]
+        for path, max_queries in budgets:
+            with self.subTest(path=path):
+                self.assertQueryBudget(self.per_user(lambda client, user: client.get(path), 200), max_queries)
+
+        targets = {user.pk: self.target(user).pk for user in self.users}
+        self.assertQueryBudget(
+            self.per_user(lambda client, user: client.get(f"/api/tasks/{targets[user.pk]}/"), 200), 2
+        )
+
+    def test_write_endpoints(self):
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        urgent = {"title": "Urgent", "due_date": tomorrow, "priority": "high"}
+
+        with self.subTest("create"):
+            # Insert, stats row lock, stats, buckets, change log, owner's email (auth cache miss), outbox, tags for the response.
+            self.assertQueryBudget(
+                self.per_user(lambda client, user: client.post("/api/tasks/", urgent, format="json"), 201), 19
+            )
+
+        targets = {user.pk: self.target(user, due_date=date.today() + timedelta(days=90)) for user in self.users}
+        with self.subTest("update"):
+            self.assertQueryBudget(
+                self.per_user(
+                    lambda client, user: client.put(
+                        f"/api/tasks/{targets[user.pk].pk}/", {**urgent, "status": "completed"}, format="json"
+                    ),
+                    200,
+                ),
+                18,
+            )
+        with self.subTest("partial_update"):
+            self.assertQueryBudget(
+                self.per_user(
+                    lambda client, user: client.patch(
+                        f"/api/tasks/{targets[user.pk].pk}/", {"status": "in_progress"}, format="json"
+                    ),
+                    200,
+                ),
+                19,
+            )
+        with self.subTest("destroy"):
+            # Includes the cascade to the task's tags.
+            self.assertQueryBudget(
+                self.per_user(lambda client, user: client.delete(f"/api/tasks/{targets[user.pk].pk}/"), 204), 13
+            )
+
+        with self.subTest("bulk"):
+            doomed = {user.pk: [self.target(user).pk for _ in range(3)] for user in self.users}
+            updated = {user.pk: [self.target(user).pk for _ in range(3)] for user in self.users}
+            self.assertQueryBudget(
+                self.per_user(
+                    lambda client, user: client.post(
+                        "/api/tasks/bulk/",
+                        {
+                            "create": [urgent] * 5,
+                            "update": [{"id": pk, "status": "completed"} for pk in updated[user.pk]],
+                            "delete": doomed[user.pk],
+                        },
+                        format="json",
+                    ),
+                    200,
+                ),
+                20,
+            )
+
+    def test_auth_endpoints(self):
+        refresh_tokens = {user.pk: str(CustomTokenObtainPairSerializer.get_token(user)) for user in self.users}
+        # Budgets are for a cold token-version cache.
+        caches[AUTH_CACHE].clear()
+        anonymous = APIClient()
+
+        def post(path, data):
+            return lambda client, user: anonymous.post(path, data(user), format="json")
+
+        budgets = [
+            ("login", post("/api/auth/login/", lambda user: {"username": user.username, "password": "secret-pass-123"}), 200, 2),
+            ("refresh", post("/api/auth/refresh/", lambda user: {"refresh": refresh_tokens[user.pk]}), 200, 2),
+            ("forgot-password", post("/api/auth/forgot-password/", lambda user: {"email": user.email}), 200, 2),
+            (
+                "register",
+                post("/api/auth/register/", lambda user: {"username": f"new-{user.pk}", "password": "secret-pass-123"}),
+                201,
+                2,
+            ),
+            (
+                "reset-password",
+                post(
+                    "/api/auth/reset-password/",
+                    lambda user: {
+                        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+                        "token": PasswordResetTokenGenerator().make_token(user),
+                        "new_password": "another-pass-456",
+                    },
+                ),
+                200,
+                7,
+            ),
+        ]
+        for name, request, expected_status, max_queries in budgets:
+            with self.subTest(name):
+                self.assertQueryBudget(self.per_user(request, expected_status), max_queries)
+
+    def grow(self, command, *args, reset=None):
+        """Run ``command`` after adding one user with due tasks, then again after adding 25 more."""
+        today = date.today()
+        added = 0
+        for extra in (1, 25):
+            for i in range(added, added + extra):
+                user = User.objects.create(username=f"{command}-{i}", email=f"{command}-{i}@example.com")
+                Task.objects.bulk_create(
+                    [
+                        Task(user=user, title="Today", due_date=today),
+                        Task(user=user, title="Tomorrow", due_date=today + timedelta(days=1), priority=Task.Priority.HIGH),
+                        Task(user=user, title="Late", due_date=today - timedelta(days=2)),
+                    ]
+                )
+            added += extra
+            if reset is not None:
+                reset()
+            yield lambda: call_command(command, *args, stdout=StringIO(), stderr=StringIO())
+
+    # Commands see every user, so each gets a test (and a fresh database) of its own.
+    def test_send_due_date_reminders(self):
+        def forget_reminders():
+            ReminderDelivery.objects.all().delete()
+            ReminderCheckpoint.objects.all().delete()
+
+        self.assertQueryBudget(self.grow("send_due_date_reminders", "--include-overdue", reset=forget_reminders), 8)
+
+    def test_run_outbox_worker(self):
+        def queue_emails():
+            OutboxEmail.objects.all().delete()
+            OutboxEmail.objects.bulk_create(
+                [OutboxEmail(subject="Hi", body="Hi", to_email=user.email) for user in User.objects.exclude(email="")]
+            )
+
+        self.assertQueryBudget(self.grow("run_outbox_worker", "--once", reset=queue_emails), 8)
+
+    def test_rebuild_task_stats(self):
+        self.assertQueryBudget(self.grow("rebuild_task_stats"), 11)
+
+    def test_run_reminder_scheduler(self):
+        self.assertQueryBudget(
+            self.grow("run_reminder_scheduler", "--once", "--remind-at", "00:00", reset=OutboxEmail.objects.all().delete),
+            7,
+        )
+
+
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.user = User.objects.create_user(username="timed", email="timed@example.com", password="secret-pass-123")
+        Task.objects.create(user=self.user, title="Measured", due_date=date.today())
+
+    def timed_client(self, **overrides):
+        self.enterContext(
+            override_settings(
+                TASKS_REQUEST_TIMING=True,
+                MIDDLEWARE=["tasks.timing.RequestTimingMiddleware", *settings.MIDDLEWARE],
+                **overrides,
+            )
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def test_server_timing_header_and_log_line(self):
+        client = self.timed_client()
+
+        with self.assertLogs("tasks.timing", "INFO") as logs:
+            response = client.get("/api/tasks/reminders/")
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="3 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, ')
+        self.assertIn("total;dur=", timing)
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line["view"], line["action"], line["status"]), ("TaskViewSet", "reminders", 200))
+        self.assertEqual(line["db_queries"], 3)
+
+    def test_mail_time_is_reported(self):
+        client = self.timed_client()
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+
+        with self.assertLogs("tasks.timing", "INFO") as logs:
+            client.post("/api/tasks/", {"title": "Soon", "due_date": tomorrow, "priority": "high"}, format="json")
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line["action"], "create")
+        self.assertGreater(line["mail_ms"], 0)
+
+    def test_slow_queries_are_logged_normalized(self):
+        client = self.timed_client(TASKS_SLOW_QUERY_MS=0)
+
+        with self.assertLogs("tasks.timing", "INFO") as logs:
+            client.get("/api/tasks/")
+
+        entries = [json.loads(record.getMessage()) for record in logs.records if record.name == "tasks.timing.slow_sql"]
+        self.assertTrue(entries)
+        self.assertTrue(all(entry["path"] == "/api/tasks/" for entry in entries))
+        self.assertTrue(any('FROM "tasks_task"' in entry["sql"] for entry in entries))
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM \"t\" WHERE \"id\" IN (%s, %s, %s) AND name = 'it''s' LIMIT 21"),
+            'SELECT * FROM "t" WHERE "id" IN (...) AND name = ? LIMIT ?',
+        )
+
+    def test_off_by_default(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertNotIn("Server-Timing", client.get("/api/tasks/"))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.user = User.objects.create_user(username="scraped", email="scraped@example.com", password="secret-pass-123")
+        Task.objects.create(user=self.user, title="Counted", due_date=date.today())
+
+    def metrics_client(self, **overrides):
+        self.enterContext(
+            override_settings(
+                TASKS_METRICS=True,
+                MIDDLEWARE=["tasks.metrics.MetricsMiddleware", *settings.MIDDLEWARE],
+                **overrides,
+            )
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_measured_by_view_and_action(self):
+        client = self.metrics_client()
+        labels = {"view": "TaskViewSet", "action": "list"}
+        before = {
+            name: self.sample(name, **labels)
+            for name in ("tasks_http_db_queries_sum", "tasks_http_response_size_bytes_sum")
+        }
+
+        response = client.get("/api/tasks/")
+
+        self.assertEqual(self.sample("tasks_http_db_queries_sum", **labels) - before["tasks_http_db_queries_sum"], 4)
+        self.assertEqual(
+            self.sample("tasks_http_response_size_bytes_sum", **labels) - before["tasks_http_response_size_bytes_sum"],
+            len(response.content),
+        )
+
+        scraped = client.get("/metrics")
+        self.assertEqual(scraped.status_code, 200)
+        self.assertIn(
+            'tasks_http_request_duration_seconds_count{action="list",method="GET",status="200",view="TaskViewSet"}',
+            scraped.content.decode(),
+        )
+
+    def test_streamed_bodies_are_sized_after_sending(self):
+        client = self.metrics_client()
+        labels = {"view": "TaskViewSet", "action": "export"}
+        before = self.sample("tasks_http_response_size_bytes_sum", **labels)
+
+        response = client.get("/api/tasks/export/")
+        self.assertEqual(self.sample("tasks_http_response_size_bytes_sum", **labels), before)
+        body = b"".join(response.streaming_content)
+
+        self.assertEqual(self.sample("tasks_http_response_size_bytes_sum", **labels) - before, len(body))
+
+    def test_email_failures_and_reminders_are_counted(self):
+        failures = self.sample("tasks_email_send_failures_total", sender="outbox")
+        queued = self.sample("tasks_reminders_total", job="scheduler", outcome="queued")
+        tomorrow = date.today() + timedelta(days=1)
+        Task.objects.create(user=self.user, title="Soon", due_date=tomorrow, priority=Task.Priority.HIGH)
+        OutboxEmail.objects.all().delete()
+
+        scheduler = ReminderScheduler()
+        scheduler.resync(timezone.now())
+        self.assertEqual(scheduler.fire_due(scheduler.fire_time(tomorrow)), 1)
+
+        class BrokenBackend(LocMemEmailBackend):
+            def send_messages(self, messages):
+                raise OSError("mail server down")
+
+        deliver_outbox(connection=BrokenBackend())
+
+        self.assertEqual(self.sample("tasks_reminders_total", job="scheduler", outcome="queued") - queued, 1)
+        self.assertEqual(self.sample("tasks_email_send_failures_total", sender="outbox") - failures, 1)
+
+    def test_endpoint_is_off_by_default_and_can_require_a_token(self):
+        self.assertEqual(APIClient().get("/metrics").status_code, 404)
+
+        with override_settings(TASKS_METRICS=True, TASKS_METRICS_TOKEN="scrape-me"):
+            self.assertEqual(APIClient().get("/metrics").status_code, 401)
+            response = APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE_LATEST)
+
+    def test_samples_from_several_processes_are_added_up(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+        script = (
+            "import django; django.setup(); "
+            "from tasks.metrics import EMAIL_SEND_FAILURES; EMAIL_SEND_FAILURES.labels('outbox').inc(2)"
+        )
+        for _ in range(2):
+            subprocess.run([sys.executable, "-c", script], env=env, check=True, cwd=settings.BASE_DIR)
+
+        with override_settings(TASKS_METRICS=True), mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+            response = APIClient().get("/metrics")
+
+        self.assertIn('tasks_email_send_failures_total{sender="outbox"} 4.0', response.content.decode())
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.user = User.objects.create_user(username="profiled", email="profiled@example.com", password="secret-pass-123")
+        self.staff = User.objects.create_user(username="ops", email="ops@example.com", password="secret-pass-123", is_staff=True)
+
+    def profiling(self, every):
+        return override_settings(
+            TASKS_PROFILE_DIR=self.directory,
+            TASKS_PROFILE_EVERY=every,
+            MIDDLEWARE=["tasks.profiling.RequestProfilingMiddleware", *settings.MIDDLEWARE],
+        )
+
+    def saved(self):
+        return sorted(
+            (endpoint, len(os.listdir(os.path.join(self.directory, endpoint)))) for endpoint in os.listdir(self.directory)
+        )
+
+    def test_samples_one_in_n_requests_per_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.profiling(1):
+            client.get("/api/tasks/")
+            client.get("/api/tasks/")
+            client.get("/api/tasks/insights/")
+        with self.profiling(0):
+            client.get("/api/tasks/")
+
+        self.assertEqual(self.saved(), [("TaskViewSet.insights", 1), ("TaskViewSet.list", 2)])
+
+    def test_x_profile_header_is_honoured_for_staff_only(self):
+        client = APIClient()
+        with self.profiling(0):
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(self.user).access_token}")
+            ignored = client.get("/api/tasks/", HTTP_X_PROFILE="1")
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(self.staff).access_token}")
+            kept = client.get("/api/tasks/", HTTP_X_PROFILE="1")
+
+        self.assertNotIn("X-Profile-Saved", ignored)
+        self.assertTrue(kept["X-Profile-Saved"].startswith("TaskViewSet.list/"))
+        self.assertEqual(self.saved(), [("TaskViewSet.list", 1)])
+
+    def test_x_profile_header_without_credentials_is_not_profiled(self):
+        factory = RequestFactory()
+        with self.profiling(0):
+            middleware = RequestProfilingMiddleware(lambda request: HttpResponse())
+            self.assertIsNone(middleware.start(factory.get("/api/tasks/", HTTP_X_PROFILE="1")))
+            started = middleware.start(factory.get("/api/tasks/", HTTP_X_PROFILE="1", HTTP_AUTHORIZATION="Bearer x"))
+        started[0].disable()
+        self.assertEqual(started[1:], (False, True))
+
+    def test_async_chain_is_profiled_without_a_thread_hop(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        request = RequestFactory().get("/api/tasks/")
+        with self.profiling(0):
+            middleware = RequestProfilingMiddleware(get_response)
+            self.assertTrue(iscoroutinefunction(middleware))
+            self.assertEqual(async_to_sync(middleware)(request).status_code, 200)
+        self.assertEqual(self.saved(), [])
+        with self.profiling(1):
+            async_to_sync(RequestProfilingMiddleware(get_response))(request)
+        self.assertEqual(self.saved(), [("unresolved.none", 1)])
+
+    def test_report_merges_profiles_for_an_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.profiling(1):
+            for _ in range(3):
+                client.get("/api/tasks/")
+
+        out = StringIO()
+        call_command("profile_report", dir=self.directory, stdout=out)
+        self.assertIn("TaskViewSet.list", out.getvalue())
+        self.assertIn("3 profile(s)", out.getvalue())
+
+        out = StringIO()
+        merged = os.path.join(self.directory, "merged.prof")
+        call_command("profile_report", dir=self.directory, endpoint="TaskViewSet.list", limit=5, output=merged, stdout=out)
+        self.assertIn("function calls", out.getvalue())
+        self.assertIn("Done. Profiles: 3, Endpoint: TaskViewSet.list", out.getvalue())
+        self.assertTrue(os.path.getsize(merged))
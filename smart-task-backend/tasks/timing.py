@@ -0,0 +1,208 @@
+"""Opt-in per-request timings: SQL, serialization, rendering and mail.
+
+With ``TASKS_REQUEST_TIMING`` on, ``RequestTimingMiddleware`` adds a
+``Server-Timing`` header and logs one JSON line per request to
+``tasks.timing``. Queries slower than ``TASKS_SLOW_QUERY_MS`` are logged,
+normalized, to ``tasks.timing.slow_sql``. With it off the middleware is not
+installed, and each ``timed()`` block costs one context variable lookup.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger("tasks.timing")
+slow_sql_logger = logging.getLogger("tasks.timing.slow_sql")
+
+# Timings for the request being handled in this context; None outside a timed request.
+_current = ContextVar("tasks_request_timings", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, \?)*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with literals and placeholders replaced by ``?`` and IN lists collapsed, for grouping."""
+    sql = _STRING.sub("?", sql).replace("%s", "?")
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class RequestTimings:
+    """Milliseconds spent per category during one request, plus the query count."""
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.ms = {"db": 0.0, "serialize": 0.0, "render": 0.0, "mail": 0.0}
+        # Async views run their queries on worker threads.
+        self.lock = threading.Lock()
+
+    def add(self, category: str, seconds: float) -> None:
+        with self.lock:
+            self.ms[category] += seconds * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        parts = [f'db;dur={self.ms["db"]:.1f};desc="{self.queries} queries"']
+        parts.extend(f"{name};dur={self.ms[name]:.1f}" for name in ("serialize", "render", "mail"))
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+class timed:
+    """``with timed("serialize"):`` adds the block's duration to the current request, if it is timed."""
+
+    __slots__ = ("category", "timings", "started")
+
+    def __init__(self, category: str):
+        self.category = category
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.category, time.perf_counter() - self.started)
+        return False
+
+
+def _record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings = _current.get()
+        if timings is not None:
+            with timings.lock:
+                timings.queries += 1
+                timings.ms["db"] += elapsed * 1000
+        threshold = getattr(settings, "TASKS_SLOW_QUERY_MS", 100)
+        if elapsed * 1000 >= threshold:
+            slow_sql_logger.warning(
+                json.dumps(
+                    {
+                        "event": "slow_query",
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "sql": normalize_sql(sql),
+                        "many": many,
+                        "path": timings.path if timings is not None else None,
+                    }
+                )
+            )
+
+
+def _wrap_connection(sender=None, connection=None, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_hook() -> None:
+    """Time every query on every connection this process opens from now on."""
+    connection_created.connect(_wrap_connection, dispatch_uid="tasks.timing")
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection=connection)
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+def start_timings(path: str):
+    """Collect timings for the rest of this context; returns the token for ``stop_timings``."""
+    return _current.set(RequestTimings(path))
+
+
+def stop_timings(token) -> None:
+    _current.reset(token)
+
+
+def view_action(request) -> tuple[str | None, str | None]:
+    """The view class (or URL name) and viewset action ``request`` was routed to."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None, None
+    cls = getattr(match.func, "cls", None)
+    actions = getattr(match.func, "actions", None) or {}
+    method = request.method.lower()
+    action = actions.get(method) or (actions.get("get") if method == "head" else None)
+    return (cls.__name__ if cls is not None else match.view_name), action or match.url_name
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "TASKS_REQUEST_TIMING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_hook()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = start_timings(request.path)
+        timings = current_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timings(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        token = start_timings(request.path)
+        timings = current_timings()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timings(token)
+        return self.finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time from here to the end of rendering.
+        timings = _current.get()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.add("render", time.perf_counter() - started))
+        return response
+
+    def finish(self, request, response, timings):
+        total_ms = (time.perf_counter() - timings.started) * 1000
+        response["Server-Timing"] = timings.server_timing(total_ms)
+        view, action = view_action(request)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "request",
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "view": view,
+                    "action": action,
+                    "total_ms": round(total_ms, 2),
+                    "db_queries": timings.queries,
+                    **{f"{name}_ms": round(ms, 2) for name, ms in timings.ms.items()},
+                }
+            )
+        )
+        return response
@@ -1,243 +1,257 @@
-from datetime import date, timedelta
+from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db.models import Count, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Task
+from .bulk import BulkTaskSerializer, apply_bulk
+from .cache import cached_response
+from .categories import name_key
+from .changes import record_task_changes
+from .dashboard import analytics_data, facet_counts, insights_data, reminders_data
+from .etags import dated_task_etag, request_task_version, task_list_etag
+from .export import aiter_csv, aiter_ndjson, iter_csv, iter_ndjson
+from .models import Category, Task
+from .notifications import queue_high_priority_due_tomorrow_email, queue_task_completed_email
+from .pagination import TaskPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .rows import represent_tasks, task_values
+from .search import search_tasks
 from .serializers import TaskSerializer
+from .stats import get_task_counts, task_state
+from .suggest import suggestions
+from .sync import read_task_changes
+from .tags import TAG_MATCH_ALL, TAG_MATCH_ANY, filter_by_tags, tags_prefetch
+
+
+# Each ordering ends in ``id`` so that keyset cursors have a unique position.
+TASK_ORDERINGS = {
+    "due_date": ("due_date", "-is_important", "-created_at", "id"),
+    "-due_date": ("-due_date", "is_important", "created_at", "-id"),
+    "created_at": ("created_at", "id"),
+    "-created_at": ("-created_at", "-id"),
+}
+DEFAULT_TASK_ORDERING = ("-is_important", "status", "due_date", "-created_at", "id")
+
+
+def task_queryset(user, params):
+    """The tasks ``user`` may read, filtered and ordered by the list query params."""
+    all_users = user.is_staff or user.is_superuser
+    if all_users:
+        qs = Task.objects.all()
+    else:
+        qs = Task.objects.filter(user=user)
+
+    status_param = params.get("status")
+    if status_param:
+        qs = qs.filter(status=status_param)
+
+    priority_param = params.get("priority")
+    if priority_param:
+        qs = qs.filter(priority=priority_param)
+
+    category_param = params.get("category")
+    if category_param:
+        # Through the Category key, which an index can serve; category__iexact could not.
+        categories = Category.objects.filter(key=name_key(category_param))
+        if not all_users:
+            categories = categories.filter(user=user)
+        qs = qs.filter(category_ref__in=categories.values("pk"))
+
+    tags_param = params.get("tags")
+    if tags_param:
+        match = TAG_MATCH_ALL if params.get("tags_match") == TAG_MATCH_ALL else TAG_MATCH_ANY
+        qs = filter_by_tags(qs, tags_param.split(","), match, user=None if all_users else user)
+
+    important_param = params.get("important")
+    if important_param is not None:
+        important_param = important_param.strip().lower()
+        if important_param in {"1", "true", "yes"}:
+            qs = qs.filter(is_important=True)
+        elif important_param in {"0", "false", "no"}:
+            qs = qs.filter(is_important=False)
+
+    ordering = params.get("ordering")
+    search = params.get("search")
+    if search:
+        # Best match first, unless the client picked an order or pages by cursor, whose keys must be model fields.
+        ranked = ordering not in TASK_ORDERINGS and not TaskPagination.cursor_requested(params)
+        qs = search_tasks(qs, search, rank=ranked)
+        if ranked:
+            return qs.order_by("-search_rank", "id")
+
+    return qs.order_by(*TASK_ORDERINGS.get(ordering, DEFAULT_TASK_ORDERING))
+
+
+# Conditional GET: a matching If-None-Match gets a 304 before any task query or serialization runs.
+# The client must revalidate every time because the data is per user and changes on any write.
+revalidate = method_decorator(cache_control(private=True, no_cache=True))
+list_etag = method_decorator(etag(task_list_etag))
+dated_etag = method_decorator(etag(dated_task_etag))
 
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskPagination
+
+    @revalidate
+    @list_etag
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path: field dicts from .values(), same output as TaskSerializer.
+        page = self.paginate_queryset(task_values(self.get_queryset()))
+        return self.get_paginated_response(represent_tasks(page))
 
     @action(detail=False, methods=["get"], url_path="all")
+    @revalidate
+    @list_etag
     def all(self, request):
         qs = self.get_queryset()
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    def _send_high_priority_due_tomorrow_email(self, task: Task):
-        if task.due_date is None:
-            return
-
-        if task.priority != Task.Priority.HIGH:
-            return
-
-        if task.status not in {Task.Status.PENDING, Task.Status.IN_PROGRESS}:
-            return
-
-        tomorrow = date.today() + timedelta(days=1)
-        if task.due_date != tomorrow:
-            return
-
-        email = (getattr(task.user, "email", "") or "").strip()
-        if not email:
-            return
-
-        send_mail(
-            subject="[Smart Task] High Priority Task Due Tomorrow",
-            message=(
-                f"Hello {getattr(task.user, 'username', '')},\n\n"
-                f"High priority reminder: this task is due tomorrow ({tomorrow.isoformat()}).\n"
-                f"Recommended: complete it today.\n\n"
-                f"- {task.title}\n\n"
-                "Thanks,\nSmart Task Team"
-            ),
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list=[email],
-            fail_silently=True,
+
+        if TaskPagination.wants_cursor(request):
+            page = self.paginate_queryset(task_values(qs))
+            return self.get_paginated_response(represent_tasks(page))
+
+        limit = getattr(settings, "TASKS_ALL_MAX_RESULTS", 1000)
+        tasks = list(task_values(qs)[: limit + 1])
+        response = Response(represent_tasks(tasks[:limit]), status=status.HTTP_200_OK)
+        if len(tasks) > limit:
+            response["X-Results-Truncated"] = "true"
+        return response
+
+    @action(detail=False, methods=["get"], url_path="export", renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        qs = self.get_queryset()
+        # Under ASGI, Django reads a sync iterator into a list before sending any of it.
+        streamed = isinstance(request._request, ASGIRequest)
+
+        if request.accepted_renderer.format == "csv":
+            rows = aiter_csv(qs) if streamed else iter_csv(qs)
+            response = StreamingHttpResponse(rows, content_type="text/csv; charset=utf-8")
+            response["Content-Disposition"] = 'attachment; filename="tasks.csv"'
+        else:
+            rows = aiter_ndjson(qs) if streamed else iter_ndjson(qs)
+            response = StreamingHttpResponse(rows, content_type="application/x-ndjson; charset=utf-8")
+            response["Content-Disposition"] = 'attachment; filename="tasks.ndjson"'
+        return response
+
+    @action(detail=False, methods=["get"], url_path="facets")
+    @revalidate
+    @list_etag
+    def facets(self, request):
+        return Response(facet_counts(self.get_queryset()), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        payload = BulkTaskSerializer(
+            data=request.data,
+            context={"max_items": getattr(settings, "TASKS_BULK_MAX_ITEMS", 5000)},
+        )
+        payload.is_valid(raise_exception=True)
+        results = apply_bulk(request, self.get_queryset(), payload.validated_data)
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="suggest")
+    def suggest(self, request):
+        limit = getattr(settings, "TASKS_SUGGEST_LIMIT", 10)
+        try:
+            limit = min(max(1, int(request.query_params.get("limit", limit))), limit)
+        except ValueError:
+            pass
+        data = suggestions(request.user.pk, request.query_params.get("q", ""), limit)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="changes")
+    def changes(self, request):
+        page = read_task_changes(
+            request.user,
+            request.query_params.get("since"),
+            limit=getattr(settings, "TASKS_SYNC_PAGE_SIZE", 500),
+            settle=timedelta(seconds=getattr(settings, "TASKS_SYNC_SETTLE_SECONDS", 5)),
         )
+        return Response(page, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
-        task = serializer.save()
-        self._send_high_priority_due_tomorrow_email(task)
+        with transaction.atomic():
+            task = serializer.save()
+            queue_high_priority_due_tomorrow_email(task)
 
     def perform_update(self, serializer):
-        instance = self.get_object()
+        # update() has already fetched the task; fetching it again would cost a query.
+        instance = serializer.instance
+        if instance.user_id == self.request.user.pk:
+            # The request user already has the owner's fields, so the emails below do not load it again.
+            instance.user = self.request.user
         prev_status = instance.status
         prev_due_date = instance.due_date
         prev_priority = instance.priority
 
-        updated = serializer.save()
-
-        next_due_date = updated.due_date
-        next_priority = updated.priority
-        if prev_due_date != next_due_date or prev_priority != next_priority or prev_status != updated.status:
-            self._send_high_priority_due_tomorrow_email(updated)
-
-        next_status = updated.status
-        if prev_status != Task.Status.COMPLETED and next_status == Task.Status.COMPLETED:
-            email = (getattr(updated.user, "email", "") or "").strip()
-            if email:
-                send_mail(
-                    subject="[Smart Task] Task Completed",
-                    message=f"Hello {getattr(updated.user, 'username', '')},\n\nYour task is completed:\n- {updated.title}\n\nThanks,\nSmart Task Team",
-                    from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                    recipient_list=[email],
-                    fail_silently=True,
-                )
+        with transaction.atomic():
+            updated = serializer.save()
 
-    def get_queryset(self):
-        if self.request.user.is_staff or self.request.user.is_superuser:
-            qs = Task.objects.all()
-        else:
-            qs = Task.objects.filter(user=self.request.user)
-
-        status_param = self.request.query_params.get("status")
-        if status_param:
-            qs = qs.filter(status=status_param)
-
-        priority_param = self.request.query_params.get("priority")
-        if priority_param:
-            qs = qs.filter(priority=priority_param)
-
-        category_param = self.request.query_params.get("category")
-        if category_param:
-            qs = qs.filter(category__iexact=category_param)
-
-        important_param = self.request.query_params.get("important")
-        if important_param is not None:
-            important_param = important_param.strip().lower()
-            if important_param in {"1", "true", "yes"}:
-                qs = qs.filter(is_important=True)
-            elif important_param in {"0", "false", "no"}:
-                qs = qs.filter(is_important=False)
-
-        search = self.request.query_params.get("search")
-        if search:
-            qs = qs.filter(Q(title__icontains=search) | Q(description__icontains=search))
-
-        ordering = self.request.query_params.get("ordering")
-        allowed_ordering = {"due_date", "-due_date", "created_at", "-created_at"}
-        if ordering in allowed_ordering:
-            qs = qs.order_by(ordering)
-        else:
-            qs = qs.order_by("-is_important", "status", "due_date", "-created_at")
+            next_due_date = updated.due_date
+            next_priority = updated.priority
+            if prev_due_date != next_due_date or prev_priority != next_priority or prev_status != updated.status:
+                queue_high_priority_due_tomorrow_email(updated)
 
+            next_status = updated.status
+            if prev_status != Task.Status.COMPLETED and next_status == Task.Status.COMPLETED:
+                queue_task_completed_email(updated)
+
+    def perform_destroy(self, instance):
+        before = task_state(instance)
+        with transaction.atomic():
+            instance.delete()
+            record_task_changes([(before, None)])
+
+    def get_queryset(self):
+        qs = task_queryset(self.request.user, self.request.query_params)
+        if self.action == "retrieve":
+            # The list reads skip the serializer and read tags through tasks.rows instead.
+            qs = qs.prefetch_related(tags_prefetch())
         return qs
 
     @action(detail=False, methods=["get"], url_path="reminders")
+    @revalidate
+    @dated_etag
     def reminders(self, request):
-        qs = Task.objects.filter(user=request.user)
-
-        today = date.today()
-        tomorrow = today + timedelta(days=1)
-
-        active_statuses = [Task.Status.PENDING, Task.Status.IN_PROGRESS]
-
-        overdue_qs = qs.filter(status__in=active_statuses, due_date__lt=today).order_by("due_date", "-is_important", "-created_at")
-        due_tomorrow_qs = qs.filter(status__in=active_statuses, due_date=tomorrow).order_by("-is_important", "-created_at")
-
-        return Response(
-            {
-                "date": {
-                    "today": today.isoformat(),
-                    "tomorrow": tomorrow.isoformat(),
-                },
-                "counts": {
-                    "overdue": overdue_qs.count(),
-                    "due_tomorrow": due_tomorrow_qs.count(),
-                },
-                "overdue": TaskSerializer(overdue_qs, many=True).data,
-                "due_tomorrow": TaskSerializer(due_tomorrow_qs, many=True).data,
-            },
-            status=status.HTTP_200_OK,
-        )
+        return self._cached_response("reminders", request, self._reminders_data)
+
+    def _reminders_data(self, user) -> dict:
+        return reminders_data(user)
+
+    def _task_counts(self, user) -> dict:
+        return get_task_counts(user.pk)
+
+    def _cached_response(self, name, request, build):
+        user = request.user
+        data, hit = cached_response(name, user.pk, lambda: build(user), version=request_task_version(request))
+        response = Response(data, status=status.HTTP_200_OK)
+        response["X-Cache"] = "hit" if hit else "miss"
+        return response
 
     @action(detail=False, methods=["get"], url_path="insights")
+    @revalidate
+    @dated_etag
     def insights(self, request):
-        qs = Task.objects.filter(user=request.user)
-
-        total = qs.count()
-        completed = qs.filter(status=Task.Status.COMPLETED).count()
-        pending = qs.filter(status=Task.Status.PENDING).count()
-        in_progress = qs.filter(status=Task.Status.IN_PROGRESS).count()
-
-        progress_pct = 0
-        if total:
-            progress_pct = round((completed / total) * 100)
-
-        today = date.today()
-        tomorrow = today + timedelta(days=1)
-        next_7 = today + timedelta(days=7)
-
-        active_statuses = [Task.Status.PENDING, Task.Status.IN_PROGRESS]
-
-        overdue = qs.filter(status__in=active_statuses, due_date__lt=today).count()
-        due_tomorrow = qs.filter(status__in=active_statuses, due_date=tomorrow).count()
-        due_soon = qs.filter(status__in=active_statuses, due_date__gte=today, due_date__lte=next_7).count()
-
-        high_priority_active = qs.filter(status__in=active_statuses, priority=Task.Priority.HIGH).count()
-
-        suggestions = []
-        if overdue:
-            suggestions.append(f"You have {overdue} overdue tasks. Complete them first.")
-        if due_tomorrow:
-            suggestions.append(f"Reminder: {due_tomorrow} tasks are due tomorrow.")
-        if not overdue and high_priority_active:
-            suggestions.append(f"Today's focus: {high_priority_active} high priority tasks.")
-        if total and completed == total:
-            suggestions.append("Great job! All tasks are completed.")
-
-        return Response(
-            {
-                "counts": {
-                    "total": total,
-                    "completed": completed,
-                    "pending": pending,
-                    "in_progress": in_progress,
-                },
-                "progress_pct": progress_pct,
-                "reminders": {
-                    "overdue": overdue,
-                    "due_tomorrow": due_tomorrow,
-                    "due_soon_7_days": due_soon,
-                },
-                "suggestions": suggestions,
-            },
-            status=status.HTTP_200_OK,
-        )
+        return self._cached_response("insights", request, self._insights_data)
+
+    def _insights_data(self, user) -> dict:
+        return insights_data(self._task_counts(user))
 
     @action(detail=False, methods=["get"], url_path="analytics")
+    @revalidate
+    @dated_etag
     def analytics(self, request):
-        qs = Task.objects.filter(user=request.user)
-
-        by_status = dict(qs.values("status").annotate(count=Count("id")).values_list("status", "count"))
-        by_priority = dict(qs.values("priority").annotate(count=Count("id")).values_list("priority", "count"))
-
-        today = date.today()
-        next_7 = today + timedelta(days=7)
-
-        active_statuses = [Task.Status.PENDING, Task.Status.IN_PROGRESS]
-
-        overdue_count = qs.filter(status__in=active_statuses, due_date__lt=today).count()
-        due_soon_count = qs.filter(
-            status__in=active_statuses,
-            due_date__gte=today,
-            due_date__lte=next_7,
-        ).count()
-
-        return Response(
-            {
-                "total": qs.count(),
-                "by_status": {
-                    Task.Status.PENDING: by_status.get(Task.Status.PENDING, 0),
-                    Task.Status.IN_PROGRESS: by_status.get(Task.Status.IN_PROGRESS, 0),
-                    Task.Status.COMPLETED: by_status.get(Task.Status.COMPLETED, 0),
-                },
-                "by_priority": {
-                    Task.Priority.HIGH: by_priority.get(Task.Priority.HIGH, 0),
-                    Task.Priority.MEDIUM: by_priority.get(Task.Priority.MEDIUM, 0),
-                    Task.Priority.LOW: by_priority.get(Task.Priority.LOW, 0),
-                },
-                "overdue_pending": overdue_count,
-                "due_soon_pending": due_soon_count,
-            },
-            status=status.HTTP_200_OK,
-        )
+        return self._cached_response("analytics", request, self._analytics_data)
+
+    def _analytics_data(self, user) -> dict:
+        return analytics_data(self._task_counts(user))